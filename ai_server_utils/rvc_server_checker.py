@@ -1,26 +1,28 @@
-import requests
+import asyncio
+import aiohttp
 import logging
+from utils import http_client
 
 logger = logging.getLogger('PianoNicsMusic')
 
-def fetch_choices():
+async def fetch_choices():
     try:
         url = "http://localhost:7897/run/infer_refresh"
-        response = requests.post(url, json={"data": []})
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        data = response.json()
+        async with http_client.get_session().post(url, json={"data": []}) as response:
+            response.raise_for_status()  # Raise an exception for HTTP errors
+            data = await response.json()
         model_choices = [choice for choice in data["data"][0]["choices"]]
         index_choices = [choice.split("/")[-1] for choice in data["data"][1]["choices"]]
         return model_choices, index_choices
-    except requests.exceptions.RequestException as e:
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         raise RuntimeError("Error generating AI vocals:", e)
 
-def check_connection():
+async def check_connection():
     try:
         url = "http://localhost:7897"
-        response = requests.get(url)
-        response.raise_for_status()
+        async with http_client.get_session().get(url) as response:
+            response.raise_for_status()
         return True
     except:
         logger.warning("Server is not running. Please start the AI server.")
-        return False
\ No newline at end of file
+        return False
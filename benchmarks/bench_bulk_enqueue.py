@@ -0,0 +1,44 @@
+"""
+Measures adding a whole playlist to the queue with one add_to_queue call.
+
+Run from the repository root: python -m benchmarks.bench_bulk_enqueue
+"""
+import asyncio
+import time
+
+from peewee import SqliteDatabase
+
+from db_utils import db_utils
+from models.guild_music_information import Guild
+from models.queue_object import QueueEntry
+
+PLAYLIST_SIZES = (10_000, 100_000)
+GUILD_ID = 1
+
+async def _bench_playlist_size(playlist_size: int, deduplicate: bool) -> float:
+    # Shared cache, so this thread and the database writer thread see the same in-memory database
+    bench_db = SqliteDatabase(f'file:bench-bulk-{playlist_size}-{deduplicate}?mode=memory&cache=shared', uri=True)
+    with bench_db.bind_ctx([Guild, QueueEntry]):
+        bench_db.create_tables([Guild, QueueEntry])
+        await db_utils.create_new_guild(GUILD_ID)
+        # Some songs are already queued, as when a second playlist is added
+        await db_utils.add_to_queue(GUILD_ID, [f'https://youtu.be/{index}' for index in range(0, playlist_size, 10)])
+        song_urls = [f'https://youtu.be/{index}' for index in range(playlist_size)]
+
+        start = time.perf_counter()
+        positions = await db_utils.add_to_queue(GUILD_ID, song_urls, deduplicate=deduplicate)
+        elapsed = time.perf_counter() - start
+
+        await db_utils.delete_guild(GUILD_ID)
+        bench_db.close()
+        return len(positions) / elapsed
+
+async def main():
+    print(f"{'songs':>8} {'rows/s':>10} {'rows/s deduplicated':>20}")
+    for playlist_size in PLAYLIST_SIZES:
+        rows_per_second = await _bench_playlist_size(playlist_size, deduplicate=False)
+        deduplicated_rows_per_second = await _bench_playlist_size(playlist_size, deduplicate=True)
+        print(f"{playlist_size:>8} {rows_per_second:>10.0f} {deduplicated_rows_per_second:>20.0f}")
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Compares enqueue throughput of the in-memory database with the WAL file database, and measures how long a large
+playlist insert blocks the event loop.
+
+Run from the repository root: python -m benchmarks.bench_enqueue
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from peewee import SqliteDatabase
+
+from db_utils import db_executor, db_utils
+from db_utils.db import FILE_PRAGMAS
+from models.guild_music_information import Guild
+from models.queue_object import QueueEntry
+
+PLAYLIST_SIZE = 10_000
+PLAYLIST_BATCH_SIZE = 50  # Batches arrive like this from music_url_getter.iter_urls
+SINGLE_SONGS = 1_000
+LARGE_PLAYLIST_SIZE = 5_000
+GUILD_ID = 1
+
+async def _measure_event_loop_stall(coroutine) -> float:
+    """Run a coroutine and return the longest time in milliseconds the event loop could not run anything else"""
+    longest_gap = 0.0
+    finished = False
+
+    async def tick():
+        nonlocal longest_gap
+        last_tick = time.perf_counter()
+        while not finished:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            longest_gap = max(longest_gap, now - last_tick)
+            last_tick = now
+
+    ticker = asyncio.create_task(tick())
+    await asyncio.sleep(0)
+    await coroutine
+    finished = True
+    await ticker
+    return longest_gap * 1_000
+
+async def _bench_database(bench_db: SqliteDatabase) -> dict:
+    with bench_db.bind_ctx([Guild, QueueEntry]):
+        bench_db.create_tables([Guild, QueueEntry])
+        await db_utils.create_new_guild(GUILD_ID)
+
+        start = time.perf_counter()
+        for batch_start in range(0, PLAYLIST_SIZE, PLAYLIST_BATCH_SIZE):
+            await db_utils.add_to_queue(GUILD_ID, [f'https://youtu.be/{index}' for index in range(batch_start, batch_start + PLAYLIST_BATCH_SIZE)])
+        playlist_rows_per_second = PLAYLIST_SIZE / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for index in range(SINGLE_SONGS):
+            await db_utils.add_to_queue(GUILD_ID, [f'https://youtu.be/single{index}'])
+        single_rows_per_second = SINGLE_SONGS / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(SINGLE_SONGS):
+            await db_utils.get_queue_entry(GUILD_ID)
+        plays_per_second = SINGLE_SONGS / (time.perf_counter() - start)
+
+        large_playlist = [f'https://youtu.be/large{index}' for index in range(LARGE_PLAYLIST_SIZE)]
+        stall = await _measure_event_loop_stall(db_utils.add_to_queue(GUILD_ID, large_playlist))
+
+        await db_utils.delete_guild(GUILD_ID)
+        bench_db.close()
+        return {'playlist': playlist_rows_per_second, 'single': single_rows_per_second, 'next': plays_per_second, 'stall': stall}
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        databases = {
+            # Shared cache, so this thread and the database writer thread see the same in-memory database
+            'memory': SqliteDatabase('file:bench-enqueue?mode=memory&cache=shared', uri=True),
+            'file (WAL)': SqliteDatabase(os.path.join(directory, 'bench.db'), pragmas=FILE_PRAGMAS),
+        }
+        print(f"{'database':>12} {'playlist rows/s':>16} {'single songs/s':>15} {'next songs/s':>13} {f'{LARGE_PLAYLIST_SIZE} song stall (ms)':>22}")
+        for name, bench_db in databases.items():
+            results = await _bench_database(bench_db)
+            print(f"{name:>12} {results['playlist']:>16.0f} {results['single']:>15.0f} {results['next']:>13.0f} {results['stall']:>22.1f}")
+        print(f"Coalesced {db_executor.get_stats()['coalesced']} writes into {db_executor.get_stats()['batches']} transactions")
+
+if __name__ == '__main__':
+    asyncio.run(main())
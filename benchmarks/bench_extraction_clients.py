@@ -0,0 +1,54 @@
+"""
+Measures the per-call client setup that pooled YoutubeDL and YTMusic instances save.
+
+No network is needed: only what happens before the first request is timed, which is
+constructing the client and, for yt-dlp, creating the YouTube extractor.
+
+Run from the repository root: python -m benchmarks.bench_extraction_clients
+"""
+import asyncio
+import time
+
+import yt_dlp
+import ytmusicapi
+
+from utils import extraction_pool
+
+CALLS = 50
+YDL_OPTS = {'format': 'bestaudio', 'quiet': True}
+
+def _new_youtube_dl():
+    with yt_dlp.YoutubeDL(dict(YDL_OPTS)) as ydl:
+        ydl.get_info_extractor('Youtube')
+
+def _pooled_youtube_dl():
+    extraction_pool.get_youtube_dl(YDL_OPTS).get_info_extractor('Youtube')
+
+def _new_ytmusic():
+    ytmusicapi.YTMusic()
+
+def _pooled_ytmusic():
+    extraction_pool.get_ytmusic()
+
+async def _time_calls(func) -> float:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        await extraction_pool.run(func)
+    return (time.perf_counter() - start) / CALLS * 1000
+
+async def main():
+    await extraction_pool.warm_up([YDL_OPTS])
+
+    print(f"{'client':>10} {'new per call (ms)':>18} {'pooled (ms)':>12}")
+    for name, new_client, pooled_client in (
+        ('YoutubeDL', _new_youtube_dl, _pooled_youtube_dl),
+        ('YTMusic', _new_ytmusic, _pooled_ytmusic),
+    ):
+        new_ms = await _time_calls(new_client)
+        pooled_ms = await _time_calls(pooled_client)
+        print(f"{name:>10} {new_ms:>18.2f} {pooled_ms:>12.3f}")
+
+    print(extraction_pool.get_stats())
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+"""
+Measures the FFmpeg CPU time of one stream with single-pass loudnorm and with the static gain used for measured tracks,
+plus the one-off cost of measuring a track.
+
+Needs ffmpeg with libopus on the PATH. A test track is encoded to Opus in WebM first, like YouTube's audio streams,
+and every filter decodes it to the 48 kHz stereo PCM the player reads.
+
+Run from the repository root: python -m benchmarks.bench_loudness
+"""
+import os
+import resource
+import subprocess
+import tempfile
+
+from discord_utils import loudness_analyzer
+
+TRACK_SECONDS = 180
+
+def _children_cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def _run_ffmpeg(*args: str) -> float:
+    """CPU seconds an FFmpeg run took"""
+    start = _children_cpu_seconds()
+    subprocess.run(['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error', *args], check=True)
+    return _children_cpu_seconds() - start
+
+def _create_track(path: str):
+    # A loud tone with noise on top, so loudnorm has something to adjust
+    _run_ffmpeg(
+        '-f', 'lavfi', '-i', f'sine=frequency=220:duration={TRACK_SECONDS}',
+        '-f', 'lavfi', '-i', f'anoisesrc=color=pink:amplitude=0.3:duration={TRACK_SECONDS}',
+        '-filter_complex', 'amix=inputs=2,aformat=channel_layouts=stereo', '-c:a', 'libopus', '-b:a', '128k', '-y', path,
+    )
+
+def _play(path: str, filter_audio: str) -> float:
+    return _run_ffmpeg('-i', path, '-vn', '-filter:a', filter_audio, '-f', 's16le', '-ar', '48000', '-ac', '2', '-y', os.devnull)
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'track.webm')
+        _create_track(path)
+
+        analysis_cpu = _run_ffmpeg('-i', path, '-vn', '-af', f'{loudness_analyzer.LOUDNORM_FILTER}:print_format=summary', '-f', 'null', '-')
+        results = {
+            loudness_analyzer.LOUDNORM_FILTER: _play(path, loudness_analyzer.LOUDNORM_FILTER),
+            loudness_analyzer.get_filter(-10.8): _play(path, loudness_analyzer.get_filter(-10.8)),
+        }
+
+    print(f"{TRACK_SECONDS}s track, CPU of one stream as a share of one core while it plays in real time")
+    for filter_audio, cpu_seconds in results.items():
+        print(f"{filter_audio:<32} {cpu_seconds:>7.2f} CPU s {cpu_seconds / TRACK_SECONDS * 100:>7.2f}%")
+    print(f"{'one-off loudness analysis':<32} {analysis_cpu:>7.2f} CPU s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Measures the CPU one stream costs on the PCM path and with Opus passthrough.
+
+PCM path: FFmpeg decodes to PCM with the static loudness gain, the audio effects and volume stages run in Python
+and pycord encodes every frame to Opus. Passthrough: FFmpeg copies the Opus packets out of the WebM container.
+
+Needs ffmpeg with libopus on the PATH and the Opus library pycord loads (set OPUS_LIBRARY to its path if it isn't
+found). A test track is encoded to Opus in WebM first, like YouTube's audio streams. Frames are read as fast as
+possible, so CPU time relative to the track length is the share of a core one concurrent stream takes.
+
+The passthrough numbers only apply to tracks whose measured loudness gain is within MAX_PASSTHROUGH_GAIN_DB, in
+guilds at volume 100%, bass level 100% and without earrape. That is not what default guilds get: they start at
+bass level 0.0, and most tracks need several dB of gain, so nearly every track takes the PCM path, which then also
+runs the bass filter and costs more than measured here.
+
+Run from the repository root: python -m benchmarks.bench_opus_passthrough
+"""
+import os
+import resource
+import subprocess
+import tempfile
+
+import discord
+
+# db_utils has to be imported before the models, which discord_utils imports
+import db_utils
+from discord_utils.audio_effects import AudioEffectsTransformer
+from discord_utils.dynamic_bass_boost import register_bass_boost
+from discord_utils.dynamic_volume import DynamicVolumeTransformer
+
+TRACK_SECONDS = 180
+GUILD_ID = 1
+
+def _cpu_seconds() -> float:
+    """CPU time of this process and its finished FFmpeg children"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def _create_track(path: str):
+    subprocess.run([
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', f'sine=frequency=220:duration={TRACK_SECONDS}',
+        '-f', 'lavfi', '-i', f'anoisesrc=color=pink:amplitude=0.3:duration={TRACK_SECONDS}',
+        '-filter_complex', 'amix=inputs=2,aformat=channel_layouts=stereo', '-c:a', 'libopus', '-b:a', '128k', '-y', path,
+    ], check=True)
+
+def _play_pcm(path: str, volume: float) -> int:
+    source = discord.FFmpegPCMAudio(path, options='-vn -filter:a "volume=-10.80dB"')
+    source = DynamicVolumeTransformer(AudioEffectsTransformer(source, GUILD_ID), volume=volume)
+    encoder = discord.opus.Encoder()
+    frames = 0
+    while data := source.read():
+        encoder.encode(data, encoder.SAMPLES_PER_FRAME)
+        frames += 1
+    source.cleanup()
+    return frames
+
+def _play_passthrough(path: str) -> int:
+    source = discord.FFmpegOpusAudio(path, codec='opus', options='-vn', stderr=subprocess.DEVNULL)
+    frames = 0
+    while source.read():
+        frames += 1
+    source.cleanup()
+    return frames
+
+def _measure(play) -> tuple[float, int]:
+    start = _cpu_seconds()
+    # cleanup() reaps FFmpeg, so its CPU time is counted
+    frames = play()
+    return _cpu_seconds() - start, frames
+
+def main():
+    if not discord.opus.is_loaded():
+        discord.opus.load_opus(os.environ.get('OPUS_LIBRARY', 'libopus.so.0'))
+    register_bass_boost(GUILD_ID, 1.0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'track.webm')
+        _create_track(path)
+        results = {
+            'PCM path, volume 100%': _measure(lambda: _play_pcm(path, 1.0)),
+            'PCM path, volume 50%': _measure(lambda: _play_pcm(path, 0.5)),
+            'Opus passthrough': _measure(lambda: _play_passthrough(path)),
+        }
+
+    print(f"{TRACK_SECONDS}s track, CPU per concurrent stream as a share of one core")
+    for mode, (cpu_seconds, frames) in results.items():
+        print(f"{mode:<24} {frames:>6} frames {cpu_seconds:>7.2f} CPU s {cpu_seconds / TRACK_SECONDS * 100:>7.2f}%")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Measures the queue operations that run for every track, for growing queue sizes.
+
+Run from the repository root: python -m benchmarks.bench_queue
+"""
+import asyncio
+import time
+
+from peewee import SqliteDatabase
+
+from db_utils import db_executor, db_utils
+from models.guild_music_information import Guild
+from models.queue_object import QueueEntry
+
+QUEUE_SIZES = (10, 100, 1_000, 10_000, 100_000)
+ITERATIONS = 500
+GUILD_ID = 1
+
+async def _time_per_call(func, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await func(*args)
+    return (time.perf_counter() - start) / ITERATIONS * 1_000_000
+
+async def _bench_queue_size(queue_size: int) -> dict:
+    # Shared cache, so this thread and the database writer thread see the same in-memory database
+    bench_db = SqliteDatabase(f'file:bench-queue-{queue_size}?mode=memory&cache=shared', uri=True)
+    with bench_db.bind_ctx([Guild, QueueEntry]):
+        bench_db.create_tables([Guild, QueueEntry])
+        await db_utils.create_new_guild(GUILD_ID)
+        await db_utils.add_to_queue(GUILD_ID, [f'https://youtu.be/{index}' for index in range(queue_size)])
+        # Play half of the queue, so the next entry is not simply the first row
+        QueueEntry.update(already_played=True).where(QueueEntry.position < queue_size // 2).execute()
+        db_utils._queue_counters.pop(GUILD_ID, None)
+        await db_executor.write(db_utils._get_queue_counters, GUILD_ID)
+
+        results = {
+            'peek': await _time_per_call(db_utils.peek_queue_entry, GUILD_ID),
+            'is_empty': await _time_per_call(db_utils.is_queue_empty, GUILD_ID),
+            'total': await _time_per_call(db_utils.get_queue_total_entries, GUILD_ID),
+        }
+
+        start = time.perf_counter()
+        await db_utils.shuffle_playlist(GUILD_ID)
+        results['shuffle_toggle'] = (time.perf_counter() - start) * 1_000
+        results['shuffled_peek'] = await _time_per_call(db_utils.peek_queue_entry, GUILD_ID)
+
+        # get_queue_entry marks entries as played, so give it its own entries
+        await db_utils.add_to_queue(GUILD_ID, [f'https://youtu.be/extra{index}' for index in range(ITERATIONS)])
+        results['next'] = await _time_per_call(db_utils.get_queue_entry, GUILD_ID)
+
+        await db_utils.delete_guild(GUILD_ID)
+        bench_db.close()
+        return results
+
+async def main():
+    print(f"{'entries':>10} {'next (us)':>10} {'peek (us)':>10} {'empty (us)':>11} {'total (us)':>11} {'shuffled peek (us)':>19} {'shuffle on (ms)':>16}")
+    for queue_size in QUEUE_SIZES:
+        results = await _bench_queue_size(queue_size)
+        print(
+            f"{queue_size:>10} {results['next']:>10.1f} {results['peek']:>10.1f} {results['is_empty']:>11.2f} {results['total']:>11.2f}"
+            f" {results['shuffled_peek']:>19.1f} {results['shuffle_toggle']:>16.1f}"
+        )
+
+if __name__ == '__main__':
+    asyncio.run(main())
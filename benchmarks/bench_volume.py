@@ -0,0 +1,51 @@
+"""
+Measures the volume stage every guild's audio thread runs 50 times per second.
+
+Compares pycord's PCMVolumeTransformer, which scales sample by sample in Python, with DynamicVolumeTransformer
+at a steady volume, while ramping to a new volume and at full volume where frames pass through.
+
+Run from the repository root: python -m benchmarks.bench_volume
+"""
+import time
+
+import discord
+import numpy as np
+
+# db_utils has to be imported before the models, which discord_utils imports
+import db_utils
+from discord_utils.dynamic_volume import DynamicVolumeTransformer
+
+FRAMES = 500
+GUILDS = 100
+FRAMES_PER_SECOND = 50
+
+_FRAME = np.random.default_rng(0).integers(-20000, 20000, discord.opus.Encoder.FRAME_SIZE // 2, dtype=np.int16).tobytes()
+
+class _FrameSource(discord.AudioSource):
+    def read(self) -> bytes:
+        return _FRAME
+
+def _bench(source: discord.AudioSource, change_volume: bool = False) -> float:
+    """Nanoseconds per frame"""
+    volumes = (0.4, 0.6)
+    start = time.perf_counter_ns()
+    for index in range(FRAMES):
+        if change_volume:
+            source.volume = volumes[index % 2]
+        source.read()
+    return (time.perf_counter_ns() - start) / FRAMES
+
+def main():
+    results = {
+        'PCMVolumeTransformer': _bench(discord.PCMVolumeTransformer(_FrameSource(), volume=0.5)),
+        'DynamicVolumeTransformer': _bench(DynamicVolumeTransformer(_FrameSource(), volume=0.5)),
+        'DynamicVolumeTransformer ramping': _bench(DynamicVolumeTransformer(_FrameSource(), volume=0.5), change_volume=True),
+        'DynamicVolumeTransformer at 1.0': _bench(DynamicVolumeTransformer(_FrameSource(), volume=1.0)),
+    }
+    print(f"{'volume stage':<34} {'ns/frame':>12} {f'CPU % for {GUILDS} guilds':>22}")
+    for name, nanoseconds_per_frame in results.items():
+        cpu_percent = nanoseconds_per_frame * FRAMES_PER_SECOND * GUILDS / 1e9 * 100
+        print(f"{name:<34} {nanoseconds_per_frame:>12,.0f} {cpu_percent:>21.1f}%")
+
+if __name__ == '__main__':
+    main()
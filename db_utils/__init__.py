@@ -4,6 +4,7 @@ Contains database models, connections, and utility functions
 """
 
 from .db import db, setup_db
+from . import db_executor
 from . import db_utils
 
-__all__ = ['db', 'setup_db', 'db_utils']
+__all__ = ['db', 'setup_db', 'db_executor', 'db_utils']
@@ -1,23 +1,68 @@
 from peewee import SqliteDatabase
+from playhouse.migrate import SqliteMigrator, migrate
 import logging
+from db_utils import db_executor
 
 logger = logging.getLogger('PianoNicsMusic')
 
+# Used when the database lives in a file, so queues survive restarts
+FILE_PRAGMAS = {
+    'journal_mode': 'wal',
+    # With WAL, NORMAL only skips the fsync on commit: a crash can lose the last commits but never corrupts the file
+    'synchronous': 'normal',
+    'cache_size': -16 * 1024,  # 16 MiB page cache
+    'temp_store': 'memory',
+    'busy_timeout': 5000,
+}
+
 db = SqliteDatabase(':memory:')
 
-async def setup_db():
-    try:
-        from models.guild_music_information import Guild
-        from models.queue_object import QueueEntry
+def configure_db(path: str | None):
+    """Store the database in a file instead of memory. Must be called before setup_db."""
+    if path:
+        db.init(path, pragmas=FILE_PRAGMAS)
+        logger.info(f"Using database file {path}")
+
+def is_persistent() -> bool:
+    return db.database != ':memory:'
+
+def _add_missing_columns(database: SqliteDatabase, models):
+    """Add columns that were introduced after a database file was created"""
+    migrator = SqliteMigrator(database)
+    for model in models:
+        table_name = model._meta.table_name
+        if not database.table_exists(table_name):
+            continue
+        existing_columns = {column.name for column in database.get_columns(table_name)}
+        missing_fields = [field for field in model._meta.sorted_fields if field.column_name not in existing_columns]
+        if missing_fields:
+            logger.info(f"Adding columns {[field.column_name for field in missing_fields]} to {table_name}")
+            migrate(*[migrator.add_column(table_name, field.column_name, field) for field in missing_fields])
 
-        # Connect to database
-        if not db.is_connection_usable():
-            db.connect()
+def _setup_db():
+    from models.guild_music_information import Guild
+    from models.queue_object import QueueEntry
+    from models.spotify_track_mapping import SpotifyTrackMapping
+    from models.track_loudness import TrackLoudness
+    models = [Guild, QueueEntry, SpotifyTrackMapping, TrackLoudness]
 
-        # Create tables if they don't exist
-        db.create_tables([Guild, QueueEntry], safe=True)
+    # Connect to database
+    if not db.is_connection_usable():
+        db.connect()
+
+    # A new in-memory database is always empty, only database files can be behind the models
+    if is_persistent():
+        _add_missing_columns(db, models)
+
+    # Create tables if they don't exist
+    db.create_tables(models, safe=True)
+
+async def setup_db():
+    try:
+        # An in-memory database only exists on the connection of the writer thread, which does all database work
+        await db_executor.write(_setup_db)
 
-        logger.info("In-memory database setup completed successfully")
+        logger.info(f"{'File' if is_persistent() else 'In-memory'} database setup completed successfully")
     except Exception as e:
         logger.error(f"Error setting up database: {e}")
-        raise e
\ No newline at end of file
+        raise e
@@ -0,0 +1,134 @@
+"""
+Runs database work on dedicated threads so peewee never blocks the event loop.
+
+All writes go through one writer thread. Writes that queue up while it is busy are committed together in one
+transaction, each in its own savepoint. Reads can use a small reader pool, but only when the database is a file:
+an in-memory SQLite database only exists for the connection, and so the thread, that created it.
+"""
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+logger = logging.getLogger('PianoNicsMusic')
+
+# Most writes coalesced into one transaction
+MAX_WRITE_BATCH = 64
+
+@dataclass
+class _Job:
+    func: Callable
+    args: tuple
+    kwargs: dict
+    future: Future = field(default_factory=Future)
+
+_write_jobs: queue.SimpleQueue = queue.SimpleQueue()
+_writer_thread: threading.Thread | None = None
+_reader_pool: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+
+# Called when a coalesced transaction fails to commit, so in-memory caches can drop writes that did not persist
+_rollback_listeners: list[Callable[[], None]] = []
+
+_stats = {'writes': 0, 'reads': 0, 'batches': 0, 'coalesced': 0}
+
+def configure(reader_threads: int = 0):
+    """Use a pool of reader threads. Only safe for file databases."""
+    global _reader_pool
+    with _lock:
+        if _reader_pool:
+            _reader_pool.shutdown(wait=False)
+        _reader_pool = ThreadPoolExecutor(max_workers=reader_threads, thread_name_prefix='db-reader') if reader_threads > 0 else None
+
+def add_rollback_listener(listener: Callable[[], None]):
+    _rollback_listeners.append(listener)
+
+def _get_database():
+    from models.queue_object import QueueEntry
+    return QueueEntry._meta.database
+
+def _ensure_writer():
+    global _writer_thread
+    with _lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_writer_loop, name='db-writer', daemon=True)
+            _writer_thread.start()
+
+def _run_job(job: _Job):
+    try:
+        job.future.set_result(job.func(*job.args, **job.kwargs))
+    except BaseException as e:
+        job.future.set_exception(e)
+
+def _run_batch(jobs: list[_Job]):
+    database = _get_database()
+    outcomes = []
+    try:
+        with database.atomic():
+            for job in jobs:
+                try:
+                    with database.atomic():
+                        outcomes.append((job, True, job.func(*job.args, **job.kwargs)))
+                except Exception as e:
+                    outcomes.append((job, False, e))
+    except Exception as e:
+        logger.error(f"Error committing {len(jobs)} database writes: {e}")
+        for listener in _rollback_listeners:
+            listener()
+        for job in jobs:
+            job.future.set_exception(e)
+        return
+
+    # Results are only handed out after the commit, so readers on other connections see the writes
+    for job, succeeded, outcome in outcomes:
+        if succeeded:
+            job.future.set_result(outcome)
+        else:
+            job.future.set_exception(outcome)
+
+def _writer_loop():
+    while True:
+        jobs = [_write_jobs.get()]
+        while len(jobs) < MAX_WRITE_BATCH:
+            try:
+                jobs.append(_write_jobs.get_nowait())
+            except queue.Empty:
+                break
+
+        # Jobs whose caller stopped waiting are skipped
+        jobs = [job for job in jobs if job.future.set_running_or_notify_cancel()]
+        if len(jobs) == 1:
+            _run_job(jobs[0])
+        elif jobs:
+            _stats['batches'] += 1
+            _stats['coalesced'] += len(jobs)
+            _run_batch(jobs)
+
+def _submit_to_writer(func: Callable, *args, **kwargs) -> Future:
+    _ensure_writer()
+    job = _Job(func, args, kwargs)
+    _write_jobs.put(job)
+    return job.future
+
+async def write(func: Callable, *args, **kwargs) -> Any:
+    """Run func on the writer thread and wait for its result"""
+    _stats['writes'] += 1
+    return await asyncio.wrap_future(_submit_to_writer(func, *args, **kwargs))
+
+async def read(func: Callable, *args, **kwargs) -> Any:
+    """Run a read-only func on a reader thread, or on the writer thread when there is no reader pool"""
+    _stats['reads'] += 1
+    reader_pool = _reader_pool
+    if reader_pool is None:
+        return await asyncio.wrap_future(_submit_to_writer(func, *args, **kwargs))
+    return await asyncio.wrap_future(reader_pool.submit(func, *args, **kwargs))
+
+def get_stats() -> dict:
+    return {
+        'pending_writes': _write_jobs.qsize(),
+        'reader_threads': _reader_pool._max_workers if _reader_pool else 0,
+        **_stats,
+    }
@@ -1,15 +1,92 @@
 import random
 import logging
+import time
+from dataclasses import dataclass, replace
 from typing import List
+from peewee import fn, chunked
 from models.dtos.QueueEntryDto import QueueEntryDto
 from models.dtos.GuildDto import GuildDto
+from models.dtos.GuildSettingsDto import GuildSettingsDto
+from models.dtos.ResumableGuildDto import ResumableGuildDto
 from models.guild_music_information import Guild
 from models.queue_object import QueueEntry
+from models.spotify_track_mapping import SpotifyTrackMapping
+from models.track_loudness import TrackLoudness
 from models.mappers import guild_music_information_mapper
+from db_utils import db_executor
 
 logger = logging.getLogger('PianoNicsMusic')
 
-async def create_new_guild(discord_guild_id: int):
+# Rows per executemany call when adding songs to a queue
+ENQUEUE_CHUNK_SIZE = 5000
+
+@dataclass
+class _QueueCounters:
+    total: int
+    remaining: int
+    force_pending: int
+    next_position: int
+
+# Per-guild queue counters, kept in sync by every function that changes the queue
+_queue_counters: dict[int, _QueueCounters] = {}
+
+def _get_queue_counters(guild_id: int) -> _QueueCounters:
+    counters = _queue_counters.get(guild_id)
+    if counters is None:
+        guild_entries = QueueEntry.select().where(QueueEntry.guild == guild_id)
+        unplayed_entries = guild_entries.where(QueueEntry.already_played == False)
+        last_position = QueueEntry.select(fn.MAX(QueueEntry.position)).where(QueueEntry.guild == guild_id).scalar()
+        counters = _QueueCounters(
+            total=guild_entries.count(),
+            remaining=unplayed_entries.count(),
+            force_pending=unplayed_entries.where(QueueEntry.force_play == True).count(),
+            next_position=last_position + 1 if last_position is not None else 0
+        )
+        _queue_counters[guild_id] = counters
+    return counters
+
+def _invalidate_queue_counters(guild_id: int):
+    _queue_counters.pop(guild_id, None)
+
+# Per-guild settings, loaded once and updated whenever a setting is written
+_guild_settings_cache: dict[int, GuildSettingsDto] = {}
+
+def _get_cached_guild_settings(guild_id: int) -> GuildSettingsDto | None:
+    settings = _guild_settings_cache.get(guild_id)
+    if settings is None:
+        guild = Guild.get_or_none(Guild.id == guild_id)
+        if not guild:
+            return None
+        settings = guild_music_information_mapper.map_settings(guild)
+        _guild_settings_cache[guild_id] = settings
+    return settings
+
+# Measured loudness gains, filled on first read and written through whenever a track is measured
+_track_gain_cache: dict[str, float] = {}
+
+def _clear_caches():
+    _queue_counters.clear()
+    _guild_settings_cache.clear()
+    _track_gain_cache.clear()
+
+# A failed coalesced commit undoes writes the caches already contain
+db_executor.add_rollback_listener(_clear_caches)
+
+def _write_guild_settings(guild_id: int, **changes) -> GuildSettingsDto | None:
+    """Persist changed settings of a guild, then update the cached copy"""
+    settings = _get_cached_guild_settings(guild_id)
+    if not settings:
+        return None
+    Guild.update(**changes).where(Guild.id == guild_id).execute()
+    settings = replace(settings, **changes)
+    _guild_settings_cache[guild_id] = settings
+    return settings
+
+# The public functions below are awaitable wrappers: the peewee work runs in the private function of the same
+# name on the database threads (see db_executor). Everything that touches the caches above runs on the writer
+# thread; the cached fast paths only read them.
+
+def _create_new_guild(discord_guild_id: int):
     try:
         Guild.create(id=discord_guild_id, loop_queue=False, shuffle_queue=False, volume=1.0)
     except Exception as e:
@@ -19,7 +96,10 @@ async def create_new_guild(discord_guild_id: int):
         if not existing_guild:
             raise e
 
-async def get_guild(discord_guild_id: int) -> GuildDto | None: 
+async def create_new_guild(discord_guild_id: int):
+    await db_executor.write(_create_new_guild, discord_guild_id)
+
+def _get_guild(discord_guild_id: int) -> GuildDto | None:
     try:
         guild = Guild.get_or_none(Guild.id == discord_guild_id)
         if guild:
@@ -29,93 +109,300 @@ async def get_guild(discord_guild_id: int) -> GuildDto | None:
         logger.error(f"Error getting guild {discord_guild_id}: {e}")
         return None
 
-async def delete_queue(guild_id: int):
+async def get_guild(discord_guild_id: int) -> GuildDto | None: 
+    return await db_executor.read(_get_guild, discord_guild_id)
+
+def _get_guild_settings(discord_guild_id: int) -> GuildSettingsDto | None:
+    try:
+        return _get_cached_guild_settings(discord_guild_id)
+    except Exception as e:
+        logger.error(f"Error getting settings of guild {discord_guild_id}: {e}")
+        return None
+
+async def get_guild_settings(discord_guild_id: int) -> GuildSettingsDto | None:
+    """Get the settings of a guild without touching its queue. Served from memory after the first call."""
+    settings = _guild_settings_cache.get(discord_guild_id)
+    if settings:
+        return settings
+    return await db_executor.write(_get_guild_settings, discord_guild_id)
+
+def _guild_exists(discord_guild_id: int) -> bool:
+    try:
+        return Guild.select().where(Guild.id == discord_guild_id).exists()
+    except Exception as e:
+        logger.error(f"Error checking guild {discord_guild_id}: {e}")
+        return False
+
+async def guild_exists(discord_guild_id: int) -> bool:
+    return await db_executor.read(_guild_exists, discord_guild_id)
+
+def _delete_queue(guild_id: int):
     try:
         QueueEntry.delete().where(QueueEntry.guild == guild_id).execute()
+        _queue_counters[guild_id] = _QueueCounters(total=0, remaining=0, force_pending=0, next_position=0)
     except Exception as e:
+        _invalidate_queue_counters(guild_id)
         logger.error(f"Error deleting queue for guild {guild_id}: {e}")
         # Continue anyway, this is cleanup
 
-async def add_to_queue(guild_id: int, song_urls: List[str]):
+async def delete_queue(guild_id: int):
+    await db_executor.write(_delete_queue, guild_id)
+
+def _add_to_queue(guild_id: int, song_urls: List[str], deduplicate: bool) -> List[int]:
+    if deduplicate:
+        queued_urls = {url for url, in QueueEntry.select(QueueEntry.url).where(QueueEntry.guild == guild_id).tuples()}
+        # dict.fromkeys keeps the first occurrence of each URL in playlist order
+        song_urls = [url for url in dict.fromkeys(song_urls) if url not in queued_urls]
+    if not song_urls:
+        return []
+
+    counters = _get_queue_counters(guild_id)
+    positions = list(range(counters.next_position, counters.next_position + len(song_urls)))
+    rows = [
+        (guild_id, url, False, False, position, random.random())
+        for url, position in zip(song_urls, positions)
+    ]
+
+    # peewee builds a new query for every row; one prepared statement run with executemany is about 5x faster
+    insert_fields = [QueueEntry.guild, QueueEntry.url, QueueEntry.already_played, QueueEntry.force_play, QueueEntry.position, QueueEntry.shuffle_key]
+    insert_sql, _ = QueueEntry.insert({insert_field: None for insert_field in insert_fields}).sql()
+
+    database = QueueEntry._meta.database
+    start = time.perf_counter()
     try:
-        if not song_urls:
-            return
-        queue_entries = [QueueEntry(guild=guild_id, url=url, already_played=False, force_play=False) for url in song_urls]
-        QueueEntry.bulk_create(queue_entries)
+        # All or nothing: a failed chunk rolls back the whole batch
+        with database.atomic():
+            for chunk in chunked(rows, ENQUEUE_CHUNK_SIZE):
+                database.cursor().executemany(insert_sql, chunk)
     except Exception as e:
-        logger.error(f"Error adding songs to queue for guild {guild_id}: {e}")
-        # Try adding one by one if bulk create fails
-        try:
-            for url in song_urls:
-                QueueEntry.create(guild=guild_id, url=url, already_played=False, force_play=False)
-        except Exception as e2:
-            logger.error(f"Error adding songs individually: {e2}")
-            raise e2
+        _invalidate_queue_counters(guild_id)
+        logger.error(f"Error adding {len(rows)} songs to queue for guild {guild_id}: {e}")
+        raise
+
+    counters.total += len(rows)
+    counters.remaining += len(rows)
+    counters.next_position += len(rows)
+
+    elapsed = time.perf_counter() - start
+    log = logger.info if len(rows) >= ENQUEUE_CHUNK_SIZE else logger.debug
+    log(f"Added {len(rows)} songs to queue for guild {guild_id} in {elapsed * 1000:.1f} ms ({len(rows) / max(elapsed, 1e-9):.0f} rows/s)")
+    return positions
+
+async def add_to_queue(guild_id: int, song_urls: List[str], deduplicate: bool = False) -> List[int]:
+    """Append songs to the queue of a guild in one transaction and return their queue positions.
+
+    With deduplicate, URLs that are already queued, or repeated in song_urls, are skipped.
+    """
+    return await db_executor.write(_add_to_queue, guild_id, song_urls, deduplicate)
+
+def _add_force_next_play_to_queue(guild_id: int, song_url: str):
+    counters = _get_queue_counters(guild_id)
+    try:
+        QueueEntry.create(guild=guild_id, url=song_url, already_played=False, force_play=True, position=counters.next_position)
+    except Exception:
+        _invalidate_queue_counters(guild_id)
+        raise
+    counters.total += 1
+    counters.remaining += 1
+    counters.force_pending += 1
+    counters.next_position += 1
 
 async def add_force_next_play_to_queue(guild_id: int, song_url: str):
-    QueueEntry.create(guild=guild_id, url=song_url, already_played=False, force_play=True)
+    await db_executor.write(_add_force_next_play_to_queue, guild_id, song_url)
 
-async def delete_guild(discord_guild_id: int):
+def _set_guild_channels(guild_id: int, voice_channel_id: int, text_channel_id: int | None):
+    try:
+        Guild.update(voice_channel_id=voice_channel_id, text_channel_id=text_channel_id).where(Guild.id == guild_id).execute()
+    except Exception as e:
+        logger.error(f"Error saving channels for guild {guild_id}: {e}")
+
+async def set_guild_channels(guild_id: int, voice_channel_id: int, text_channel_id: int | None):
+    """Remember where a guild is playing, so playback can resume there after a restart"""
+    await db_executor.write(_set_guild_channels, guild_id, voice_channel_id, text_channel_id)
+
+def _get_resumable_guilds() -> List[ResumableGuildDto]:
+    try:
+        guilds = Guild.select(Guild.id, Guild.voice_channel_id, Guild.text_channel_id)
+        return [ResumableGuildDto(discord_guild_id=guild.id, voice_channel_id=guild.voice_channel_id, text_channel_id=guild.text_channel_id) for guild in guilds]
+    except Exception as e:
+        logger.error(f"Error getting resumable guilds: {e}")
+        return []
+
+async def get_resumable_guilds() -> List[ResumableGuildDto]:
+    """Get the guilds that were playing when the bot stopped"""
+    return await db_executor.read(_get_resumable_guilds)
+
+def _requeue_current_entry(guild_id: int):
+    try:
+        guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
+        if not guild or guild.current_entry_id is None:
+            return
+        QueueEntry.update(already_played=False, force_play=True).where(
+            (QueueEntry.id == guild.current_entry_id) & (QueueEntry.guild == guild_id)
+        ).execute()
+        _invalidate_queue_counters(guild_id)
+    except Exception as e:
+        logger.error(f"Error requeueing current song for guild {guild_id}: {e}")
+
+async def requeue_current_entry(guild_id: int):
+    """Put the song that was playing when the bot stopped back at the front of the queue"""
+    await db_executor.write(_requeue_current_entry, guild_id)
+
+def _delete_guild(discord_guild_id: int):
+    # Foreign keys are not enforced, so the queue does not go away with the guild on its own
+    _delete_queue(discord_guild_id)
     Guild.delete_by_id(discord_guild_id)
+    _guild_settings_cache.pop(discord_guild_id, None)
+    _invalidate_queue_counters(discord_guild_id)
 
-async def get_queue(guild_id: int) -> List[QueueEntryDto]:
-    queue_entries = QueueEntry.select().where(QueueEntry.guild == guild_id)
+async def delete_guild(discord_guild_id: int):
+    await db_executor.write(_delete_guild, discord_guild_id)
+
+def _get_queue(guild_id: int) -> List[QueueEntryDto]:
+    queue_entries = QueueEntry.select().where(QueueEntry.guild == guild_id).order_by(QueueEntry.position, QueueEntry.id)
     queue_dtos = [QueueEntryDto(url=entry.url, already_played=entry.already_played) for entry in queue_entries]
     return queue_dtos
 
-async def _get_random_queue_entry(guild_id: int) -> str | None:
-    queue_entries = QueueEntry.select().where((QueueEntry.guild == guild_id) & (QueueEntry.already_played == False))
-    if not queue_entries:
-        return None
-    return random.choice(list(queue_entries))
+async def get_queue(guild_id: int) -> List[QueueEntryDto]:
+    return await db_executor.read(_get_queue, guild_id)
+
+def _get_queue_page(guild_id: int, offset: int, limit: int, already_played: bool | None) -> List[QueueEntryDto]:
+    try:
+        condition = QueueEntry.guild == guild_id
+        if already_played is not None:
+            condition &= QueueEntry.already_played == already_played
+        queue_entries = (
+            QueueEntry.select(QueueEntry.url, QueueEntry.already_played)
+            .where(condition)
+            .order_by(QueueEntry.position, QueueEntry.id)
+            .offset(offset)
+            .limit(limit)
+        )
+        return [QueueEntryDto(url=entry.url, already_played=entry.already_played) for entry in queue_entries]
+    except Exception as e:
+        logger.error(f"Error getting queue page for guild {guild_id}: {e}")
+        return []
+
+async def get_queue_page(guild_id: int, offset: int, limit: int, already_played: bool | None = None) -> List[QueueEntryDto]:
+    """Get up to limit queue entries of a guild in queue order, starting at offset"""
+    return await db_executor.read(_get_queue_page, guild_id, offset, limit, already_played)
+
+def _reshuffle_queue(guild: Guild):
+    """Give the queue of a guild a new shuffle order, seeded by guild.shuffle_seed.
+
+    Entries added later get a random shuffle key, which splices them in at a random place of the order.
+    """
+    guild.shuffle_seed = random.getrandbits(32)
+    shuffle_random = random.Random(guild.shuffle_seed)
+
+    entry_ids = (
+        QueueEntry.select(QueueEntry.id)
+        .where(QueueEntry.guild == guild.id)
+        .order_by(QueueEntry.position, QueueEntry.id)
+        .tuples()
+    )
+    shuffle_keys = [(shuffle_random.random(), entry_id) for entry_id, in entry_ids]
+
+    database = QueueEntry._meta.database
+    with database.atomic():
+        # executemany keeps toggling shuffle on a 100,000 song queue well below a second
+        database.cursor().executemany(
+            f'UPDATE "{QueueEntry._meta.table_name}" SET "shuffle_key" = ? WHERE "id" = ?',
+            shuffle_keys
+        )
+        guild.save()
 
-async def _mark_entry_as_listened(entry: QueueEntry):
+def _mark_entry_as_listened(entry: QueueEntry):
+    guild_id = entry.guild_id
     try:
+        was_force_play = entry.force_play
         entry.already_played = True
         entry.force_play = False
         entry.save()
+
+        counters = _queue_counters.get(guild_id)
+        if counters:
+            counters.remaining -= 1
+            if was_force_play:
+                counters.force_pending -= 1
     except Exception as e:
+        _invalidate_queue_counters(guild_id)
         logger.error(f"Error marking entry as listened: {e}")
 
-async def get_queue_entry(guild_id: int) -> str | None:
+def _get_unplayed_entries(guild_id: int, force_play: bool, shuffled: bool = False):
+    # Matches the (guild, already_played, force_play, position/shuffle_key) indexes, so the first row is a single index lookup
+    order_key = QueueEntry.shuffle_key if shuffled else QueueEntry.position
+    return QueueEntry.select().where(
+        (QueueEntry.guild == guild_id) & 
+        (QueueEntry.already_played == False) & 
+        (QueueEntry.force_play == force_play)
+    ).order_by(order_key, QueueEntry.id)
+
+def _get_first_unplayed_entry(guild_id: int, force_play: bool, shuffled: bool = False) -> QueueEntry | None:
+    return _get_unplayed_entries(guild_id, force_play, shuffled).first()
+
+def _select_next_entry(settings: GuildSettingsDto) -> QueueEntry | None:
+    guild_id = settings.discord_guild_id
+    counters = _get_queue_counters(guild_id)
+    if counters.remaining <= 0:
+        return None
+
+    force_play_entry = _get_first_unplayed_entry(guild_id, force_play=True) if counters.force_pending > 0 else None
+
+    if force_play_entry:
+        return force_play_entry
+    
+    return _get_first_unplayed_entry(guild_id, force_play=False, shuffled=settings.shuffle_queue)
+
+def _play_entry(guild_id: int, entry: QueueEntry) -> str:
+    with QueueEntry._meta.database.atomic():
+        _mark_entry_as_listened(entry)
+        # Remembered so the song can be played again if the bot restarts while it plays
+        Guild.update(current_entry_id=entry.id).where(Guild.id == guild_id).execute()
+    return entry.resolved_url or entry.url
+
+def _peek_queue_entry(guild_id: int) -> str | None:
     try:
-        guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
-        if not guild:
+        settings = _get_cached_guild_settings(guild_id)
+        if not settings:
             return None
-        
-        force_play_entry = QueueEntry.get_or_none(
-            (QueueEntry.guild == guild_id) & 
-            (QueueEntry.already_played == False) & 
-            (QueueEntry.force_play == True)
-        )
 
-        if force_play_entry:
-            entry = force_play_entry
-        
-        elif guild.shuffle_queue:
-            entry = await _get_random_queue_entry(guild_id)
+        entry = _select_next_entry(settings)
+        return (entry.resolved_url or entry.url) if entry else None
+    except Exception as e:
+        logger.error(f"Error peeking queue entry for guild {guild_id}: {e}")
+        return None
+
+async def peek_queue_entry(guild_id: int) -> str | None:
+    """Get the URL that the next get_queue_entry call will return, without marking it as played"""
+    return await db_executor.write(_peek_queue_entry, guild_id)
 
-        else:
-            entry = QueueEntry.select().where(
-                (QueueEntry.guild == guild_id) & 
-                (QueueEntry.already_played == False)
-            ).order_by(QueueEntry.id).first()
+def _get_queue_entry(guild_id: int) -> str | None:
+    try:
+        settings = _get_cached_guild_settings(guild_id)
+        if not settings:
+            return None
+        
+        entry = _select_next_entry(settings)
 
         if entry:
-            await _mark_entry_as_listened(entry)
-            return entry.url
+            return _play_entry(guild_id, entry)
         
-        if guild.loop_queue:
+        if settings.loop_queue:
             try:
                 QueueEntry.update(already_played=False).where(QueueEntry.guild == guild_id).execute()
-                return await _get_entry_after_reset(guild_id)
+                counters = _get_queue_counters(guild_id)
+                counters.remaining = counters.total
+                if settings.shuffle_queue:
+                    _reshuffle_queue(Guild.get_by_id(guild_id))
+                return _get_entry_after_reset(guild_id)
             except Exception as e:
                 logger.error(f"Error resetting queue for guild {guild_id}: {e}")
                 return None
         
         # If we reach here, the queue is finished and not looping - clear it
         try:
-            await delete_queue(guild_id)
+            _delete_queue(guild_id)
             logger.info(f"Queue cleared for guild {guild_id} - all songs played")
         except Exception as e:
             logger.error(f"Error clearing finished queue for guild {guild_id}: {e}")
@@ -125,204 +412,288 @@ async def get_queue_entry(guild_id: int) -> str | None:
         logger.error(f"Error getting queue entry for guild {guild_id}: {e}")
         return None
 
-async def _get_entry_after_reset(guild_id: int) -> str | None:
-    guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
-    if not guild:
-        return None
-
-    force_play_entry = QueueEntry.get_or_none(
-        (QueueEntry.guild == guild_id) & 
-        (QueueEntry.already_played == False) & 
-        (QueueEntry.force_play == True)
-    )
+async def get_queue_entry(guild_id: int) -> str | None:
+    return await db_executor.write(_get_queue_entry, guild_id)
 
-    if force_play_entry:
-        entry = force_play_entry
-    
-    elif guild.shuffle_queue:
-        entry = await _get_random_queue_entry(guild_id)
+def _get_entry_after_reset(guild_id: int) -> str | None:
+    settings = _get_cached_guild_settings(guild_id)
+    if not settings:
+        return None
 
-    else:
-        entry = QueueEntry.select().where(
-            (QueueEntry.guild == guild_id) & 
-            (QueueEntry.already_played == False)
-        ).order_by(QueueEntry.id).first()
+    entry = _select_next_entry(settings)
 
     if entry:
-        await _mark_entry_as_listened(entry)
-        return entry.url
+        return _play_entry(guild_id, entry)
     
     return None
 
-async def shuffle_playlist(guild_id: int) -> bool:
+def _shuffle_playlist(guild_id: int) -> bool:
     guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
     if not guild:
         return None
     
     guild.shuffle_queue = not guild.shuffle_queue
-    guild.save()
+    if guild.shuffle_queue:
+        _reshuffle_queue(guild)
+    else:
+        guild.save()
+    _guild_settings_cache[guild_id] = guild_music_information_mapper.map_settings(guild)
     
     return guild.shuffle_queue
 
-async def toggle_loop(guild_id: int) -> bool:
-    guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
-    if not guild:
+async def shuffle_playlist(guild_id: int) -> bool:
+    return await db_executor.write(_shuffle_playlist, guild_id)
+
+def _get_upcoming_entries(guild_id: int, limit: int, shuffled: bool) -> List[QueueEntry]:
+    upcoming_entries = list(_get_unplayed_entries(guild_id, force_play=True).limit(limit))
+    if len(upcoming_entries) < limit:
+        upcoming_entries.extend(_get_unplayed_entries(guild_id, force_play=False, shuffled=shuffled).limit(limit - len(upcoming_entries)))
+    return upcoming_entries
+
+def _get_upcoming_queue_entries(guild_id: int, limit: int, shuffled: bool) -> List[QueueEntryDto]:
+    try:
+        upcoming_entries = _get_upcoming_entries(guild_id, limit, shuffled)
+        return [QueueEntryDto(url=entry.url, already_played=entry.already_played) for entry in upcoming_entries]
+    except Exception as e:
+        logger.error(f"Error getting upcoming queue entries for guild {guild_id}: {e}")
+        return []
+
+async def get_upcoming_queue_entries(guild_id: int, limit: int) -> List[QueueEntryDto]:
+    """Get the next songs of the queue in the order they will be played"""
+    settings = await get_guild_settings(guild_id)
+    if not settings:
+        return []
+    return await db_executor.read(_get_upcoming_queue_entries, guild_id, limit, settings.shuffle_queue)
+
+def _get_unresolved_upcoming_entries(guild_id: int, limit: int, shuffled: bool) -> List[tuple[int, str]]:
+    try:
+        upcoming_entries = _get_upcoming_entries(guild_id, limit, shuffled)
+        return [(entry.id, entry.url) for entry in upcoming_entries if entry.resolved_url is None]
+    except Exception as e:
+        logger.error(f"Error getting unresolved queue entries for guild {guild_id}: {e}")
+        return []
+
+async def get_unresolved_upcoming_entries(guild_id: int, limit: int) -> List[tuple[int, str]]:
+    """Get (entry ID, URL) of the entries among the next limit songs that have no resolved URL yet"""
+    settings = await get_guild_settings(guild_id)
+    if not settings:
+        return []
+    return await db_executor.read(_get_unresolved_upcoming_entries, guild_id, limit, settings.shuffle_queue)
+
+def _set_resolved_url(guild_id: int, entry_id: int, resolved_url: str):
+    try:
+        QueueEntry.update(resolved_url=resolved_url).where((QueueEntry.id == entry_id) & (QueueEntry.guild == guild_id)).execute()
+    except Exception as e:
+        logger.error(f"Error saving resolved URL of queue entry {entry_id} in guild {guild_id}: {e}")
+
+async def set_resolved_url(guild_id: int, entry_id: int, resolved_url: str):
+    """Store the URL a queue entry plays instead of its own, once it was matched ahead of its turn"""
+    await db_executor.write(_set_resolved_url, guild_id, entry_id, resolved_url)
+
+def _toggle_loop(guild_id: int) -> bool:
+    settings = _get_cached_guild_settings(guild_id)
+    if not settings:
         return None
     
-    guild.loop_queue = not guild.loop_queue
-    guild.save()
+    settings = _write_guild_settings(guild_id, loop_queue=not settings.loop_queue)
     
-    return guild.loop_queue
+    return settings.loop_queue
 
-async def is_queue_empty(guild_id: int) -> bool:
-    """Check if the queue has any remaining unplayed songs"""
+async def toggle_loop(guild_id: int) -> bool:
+    return await db_executor.write(_toggle_loop, guild_id)
+
+def _get_counter(guild_id: int, name: str, default: int) -> int:
     try:
-        remaining_entries = QueueEntry.select().where(
-            (QueueEntry.guild == guild_id) & 
-            (QueueEntry.already_played == False)
-        ).count()
-        return remaining_entries == 0
+        return getattr(_get_queue_counters(guild_id), name)
     except Exception as e:
-        logger.error(f"Error checking if queue is empty for guild {guild_id}: {e}")
-        return True
+        logger.error(f"Error getting queue {name} entries for guild {guild_id}: {e}")
+        return default
+
+async def _read_counter(guild_id: int, name: str, default: int) -> int:
+    counters = _queue_counters.get(guild_id)
+    if counters:
+        return getattr(counters, name)
+    return await db_executor.write(_get_counter, guild_id, name, default)
+
+async def is_queue_empty(guild_id: int) -> bool:
+    """Check if the queue has any remaining unplayed songs"""
+    return await _read_counter(guild_id, 'remaining', 0) <= 0
 
 async def get_queue_total_entries(guild_id: int) -> int:
     """Get the total number of entries in the queue for a guild."""
-    try:
-        total_entries = QueueEntry.select().where(QueueEntry.guild == guild_id).count()
-        return total_entries
-    except Exception as e:
-        logger.error(f"Error getting queue total entries for guild {guild_id}: {e}")
-        return 0
+    return await _read_counter(guild_id, 'total', 0)
 
-async def clear_finished_queue_if_needed(guild_id: int):
-    """Clear the queue if all songs have been played and loop is disabled"""
+async def get_queue_remaining_entries(guild_id: int) -> int:
+    """Get the number of songs in the queue of a guild that have not been played yet."""
+    return await _read_counter(guild_id, 'remaining', 0)
+
+def _clear_finished_queue_if_needed(guild_id: int):
     try:
-        guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
-        if not guild:
+        settings = _get_cached_guild_settings(guild_id)
+        if not settings:
             return
         
         # Only clear if not looping and queue is empty
-        if not guild.loop_queue and await is_queue_empty(guild_id):
-            await delete_queue(guild_id)
+        if not settings.loop_queue and _get_queue_counters(guild_id).remaining <= 0:
+            _delete_queue(guild_id)
             logger.info(f"Queue automatically cleared for guild {guild_id}")
     except Exception as e:
         logger.error(f"Error auto-clearing queue for guild {guild_id}: {e}")
 
-async def set_volume(guild_id: int, volume: float) -> bool:
-    """Set the volume for a guild. Volume should be between 0.0 and 1.0"""
+async def clear_finished_queue_if_needed(guild_id: int):
+    """Clear the queue if all songs have been played and loop is disabled"""
+    await db_executor.write(_clear_finished_queue_if_needed, guild_id)
+
+def _set_volume(guild_id: int, volume: float) -> bool:
     try:
         # Clamp volume between 0.0 and 1.0
         volume = max(0.0, min(1.0, volume))
-        
-        guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
-        if not guild:
-            return False
-        
-        guild.volume = volume
-        guild.save()
-        return True
+        return _write_guild_settings(guild_id, volume=volume) is not None
     except Exception as e:
         logger.error(f"Error setting volume for guild {guild_id}: {e}")
         return False
 
+async def set_volume(guild_id: int, volume: float) -> bool:
+    """Set the volume for a guild. Volume should be between 0.0 and 1.0"""
+    return await db_executor.write(_set_volume, guild_id, volume)
+
 async def get_volume(guild_id: int) -> float:
     """Get the current volume for a guild"""
-    try:
-        guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
-        if not guild:
-            return 1.0  # Default volume
-        return guild.volume
-    except Exception as e:
-        logger.error(f"Error getting volume for guild {guild_id}: {e}")
+    settings = await get_guild_settings(guild_id)
+    if not settings:
         return 1.0  # Default volume
+    return settings.volume
 
-async def adjust_volume(guild_id: int, adjustment: float) -> float:
-    """Adjust the volume by a certain amount. Returns the new volume level."""
+def _adjust_volume(guild_id: int, adjustment: float) -> float:
     try:
-        guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
-        if not guild:
+        settings = _get_cached_guild_settings(guild_id)
+        if not settings:
             return 1.0
 
-        new_volume = max(0.0, min(1.0, guild.volume + adjustment))
-        guild.volume = new_volume
-        guild.save()
+        new_volume = max(0.0, min(1.0, settings.volume + adjustment))
+        _write_guild_settings(guild_id, volume=new_volume)
         return new_volume
     except Exception as e:
         logger.error(f"Error adjusting volume for guild {guild_id}: {e}")
         return 1.0
 
-async def set_bass_boost(guild_id: int, bass_level: float) -> bool:
+async def adjust_volume(guild_id: int, adjustment: float) -> float:
+    """Adjust the volume by a certain amount. Returns the new volume level."""
+    return await db_executor.write(_adjust_volume, guild_id, adjustment)
+
+def _set_bass_boost(guild_id: int, bass_level: float) -> bool:
     try:
         bass_level = max(0.0, min(2.0, bass_level))
-
-        guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
-        if not guild:
-            return False
-
-        guild.bass_boost = bass_level
-        guild.save()
-        return True
+        return _write_guild_settings(guild_id, bass_boost=bass_level) is not None
     except Exception as e:
         logger.error(f"Error setting bass boost for guild {guild_id}: {e}")
         return False
 
+async def set_bass_boost(guild_id: int, bass_level: float) -> bool:
+    return await db_executor.write(_set_bass_boost, guild_id, bass_level)
+
 async def get_bass_boost(guild_id: int) -> float:
-    try:
-        guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
-        if not guild:
-            return 0.0
-        return guild.bass_boost
-    except Exception as e:
-        logger.error(f"Error getting bass boost for guild {guild_id}: {e}")
+    settings = await get_guild_settings(guild_id)
+    if not settings:
         return 0.0
+    return settings.bass_boost
 
-async def adjust_bass_boost(guild_id: int, adjustment: float) -> float:
+def _adjust_bass_boost(guild_id: int, adjustment: float) -> float:
     try:
-        guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
-        if not guild:
+        settings = _get_cached_guild_settings(guild_id)
+        if not settings:
             return 0.0
 
-        new_bass_boost = max(0.0, min(2.0, guild.bass_boost + adjustment))
-        guild.bass_boost = new_bass_boost
-        guild.save()
+        new_bass_boost = max(0.0, min(2.0, settings.bass_boost + adjustment))
+        _write_guild_settings(guild_id, bass_boost=new_bass_boost)
         return new_bass_boost
     except Exception as e:
         logger.error(f"Error adjusting bass boost for guild {guild_id}: {e}")
         return 0.0
 
-async def set_earrape(guild_id: int, enabled: bool) -> bool:
-    try:
-        guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
-        if not guild:
-            return False
+async def adjust_bass_boost(guild_id: int, adjustment: float) -> float:
+    return await db_executor.write(_adjust_bass_boost, guild_id, adjustment)
 
-        guild.earrape = enabled
-        guild.save()
-        return True
+def _set_earrape(guild_id: int, enabled: bool) -> bool:
+    try:
+        return _write_guild_settings(guild_id, earrape=enabled) is not None
     except Exception as e:
         logger.error(f"Error setting earrape for guild {guild_id}: {e}")
         return False
 
+async def set_earrape(guild_id: int, enabled: bool) -> bool:
+    return await db_executor.write(_set_earrape, guild_id, enabled)
+
 async def get_earrape(guild_id: int) -> bool:
+    settings = await get_guild_settings(guild_id)
+    if not settings:
+        return False
+    return settings.earrape
+
+def _toggle_earrape(guild_id: int) -> bool:
     try:
-        guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
-        if not guild:
+        settings = _get_cached_guild_settings(guild_id)
+        if not settings:
             return False
-        return guild.earrape
+
+        settings = _write_guild_settings(guild_id, earrape=not settings.earrape)
+        return settings.earrape
     except Exception as e:
-        logger.error(f"Error getting earrape for guild {guild_id}: {e}")
+        logger.error(f"Error toggling earrape for guild {guild_id}: {e}")
         return False
 
 async def toggle_earrape(guild_id: int) -> bool:
+    return await db_executor.write(_toggle_earrape, guild_id)
+
+def _get_spotify_mapping(spotify_track_id: str) -> str | None:
     try:
-        guild: Guild | None = Guild.get_or_none(Guild.id == guild_id)
-        if not guild:
-            return False
+        mapping = SpotifyTrackMapping.get_or_none(SpotifyTrackMapping.spotify_track_id == spotify_track_id)
+        return mapping.youtube_url if mapping else None
+    except Exception as e:
+        logger.error(f"Error getting YouTube match of Spotify track {spotify_track_id}: {e}")
+        return None
 
-        guild.earrape = not guild.earrape
-        guild.save()
-        return guild.earrape
+async def get_spotify_mapping(spotify_track_id: str) -> str | None:
+    """Get the YouTube URL a Spotify track was matched to before"""
+    return await db_executor.read(_get_spotify_mapping, spotify_track_id)
+
+def _store_spotify_mapping(spotify_track_id: str, youtube_url: str):
+    try:
+        SpotifyTrackMapping.replace(spotify_track_id=spotify_track_id, youtube_url=youtube_url, matched_at=time.time()).execute()
     except Exception as e:
-        logger.error(f"Error toggling earrape for guild {guild_id}: {e}")
-        return False
\ No newline at end of file
+        logger.error(f"Error saving YouTube match of Spotify track {spotify_track_id}: {e}")
+
+async def store_spotify_mapping(spotify_track_id: str, youtube_url: str):
+    """Remember the YouTube URL a Spotify track was matched to, replacing an earlier match"""
+    await db_executor.write(_store_spotify_mapping, spotify_track_id, youtube_url)
+
+def _get_track_gain(track_id: str) -> float | None:
+    try:
+        loudness = TrackLoudness.get_or_none(TrackLoudness.track_id == track_id)
+        return loudness.gain_db if loudness else None
+    except Exception as e:
+        logger.error(f"Error getting loudness gain of track {track_id}: {e}")
+        return None
+
+async def get_track_gain(track_id: str) -> float | None:
+    """Get the measured normalization gain of a track in dB, or None if it was not measured yet.
+    Served from memory once the gain is known."""
+    gain_db = _track_gain_cache.get(track_id)
+    if gain_db is not None:
+        return gain_db
+    gain_db = await db_executor.read(_get_track_gain, track_id)
+    if gain_db is None:
+        return None
+    # A measurement stored while the read was in flight is newer, so keep it
+    return _track_gain_cache.setdefault(track_id, gain_db)
+
+def _store_track_gain(track_id: str, gain_db: float):
+    try:
+        TrackLoudness.replace(track_id=track_id, gain_db=gain_db, measured_at=time.time()).execute()
+        _track_gain_cache[track_id] = gain_db
+    except Exception as e:
+        logger.error(f"Error saving loudness gain of track {track_id}: {e}")
+
+async def store_track_gain(track_id: str, gain_db: float):
+    """Remember the normalization gain of a track, replacing an earlier measurement"""
+    await db_executor.write(_store_track_gain, track_id, gain_db)
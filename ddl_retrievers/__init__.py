@@ -1,14 +1,19 @@
 """
 DDL Retrievers package
 Contains modules for downloading and streaming music from various platforms
-"""
 
-from . import spotify_ddl_retriever
-from . import tiktok_ddl_retriever  
-from . import universal_ddl_retriever
+The retrievers are imported on first access, so the heavy platform libraries
+they depend on are not loaded at startup.
+"""
+import importlib
 
 __all__ = [
     'spotify_ddl_retriever',
     'tiktok_ddl_retriever', 
     'universal_ddl_retriever'
 ]
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
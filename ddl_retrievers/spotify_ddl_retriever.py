@@ -1,59 +1,125 @@
 import os
+import threading
 from dotenv import load_dotenv
-from spotdl import Spotdl
-import yt_dlp as youtube_dl
 from ddl_retrievers import universal_ddl_retriever
 from models.music_information import MusicInformation
-import ytmusicapi
+from db_utils import db_utils
+from platform_handlers.track_identity import get_canonical_track_id
+from utils import extraction_pool
 import logging
 
 logger = logging.getLogger('PianoNicsMusic')
 
 load_dotenv()
 
-spotdl = Spotdl(client_id=os.getenv('SPOTIFY_CLIENT_ID'), client_secret=os.getenv('SPOTIFY_CLIENT_SECRET'))
+_spotdl = None
+_spotdl_lock = threading.Lock()
 
-async def get_streaming_url(spotify_url) -> MusicInformation:    
+def _get_spotdl():
+    """Get the shared spotdl client. spotdl takes over a second to import, so this only happens on first use."""
+    global _spotdl
+    with _spotdl_lock:
+        if _spotdl is None:
+            from spotdl import Spotdl
+            _spotdl = Spotdl(client_id=os.getenv('SPOTIFY_CLIENT_ID'), client_secret=os.getenv('SPOTIFY_CLIENT_SECRET'))
+        return _spotdl
+
+# Run on the extraction pool, so importing spotdl and creating the client never blocks the event loop
+def _search(spotify_url: str) -> list:
+    return _get_spotdl().search([spotify_url])
+
+def _get_download_urls(songs: list) -> list:
+    return _get_spotdl().get_download_urls(songs)
+
+async def warm_up():
+    """Import spotdl and create its client ahead of the first Spotify track"""
+    await extraction_pool.run(_get_spotdl)
+
+_SPOTIFY_TRACK_PREFIX = 'spotify:track:'
+
+def _get_spotify_track_id(spotify_url: str) -> str | None:
+    canonical_track_id = get_canonical_track_id(spotify_url)
+    if canonical_track_id.startswith(_SPOTIFY_TRACK_PREFIX):
+        return canonical_track_id[len(_SPOTIFY_TRACK_PREFIX):]
+    return None
+
+def is_spotify_track(url: str) -> bool:
+    return _get_spotify_track_id(url) is not None
+
+async def match_youtube_url(spotify_url: str) -> str | None:
+    """Find the YouTube URL of a Spotify track without resolving its stream. The match is not remembered, since
+    only a match whose stream resolved is stored (see _get_streaming_url_and_remember)."""
+    spotify_track_id = _get_spotify_track_id(spotify_url)
+    if not spotify_track_id:
+        return None
+
+    youtube_url = await db_utils.get_spotify_mapping(spotify_track_id)
+    if youtube_url:
+        return youtube_url
+
+    song = await extraction_pool.run(_search, spotify_url)
+    download_urls = await extraction_pool.run(_get_download_urls, song) if song else []
+    return download_urls[0] if download_urls else None
+
+async def _get_mapped_streaming_url(spotify_track_id: str) -> MusicInformation | None:
+    youtube_url = await db_utils.get_spotify_mapping(spotify_track_id)
+    if not youtube_url:
+        return None
+    try:
+        return await universal_ddl_retriever.get_streaming_url(youtube_url)
+    except universal_ddl_retriever.YouTubeError as e:
+        # The matched video may have been removed since, so the track is matched again
+        logger.info(f"Matched video {youtube_url} of Spotify track {spotify_track_id} failed: {e}")
+        return None
+
+async def _get_streaming_url_and_remember(spotify_track_id: str | None, youtube_url: str) -> MusicInformation:
+    music_information = await universal_ddl_retriever.get_streaming_url(youtube_url)
+    if spotify_track_id:
+        await db_utils.store_spotify_mapping(spotify_track_id, youtube_url)
+    return music_information
+
+async def get_streaming_url(spotify_url) -> MusicInformation:
+    # Tracks played before skip the spotdl matching
+    spotify_track_id = _get_spotify_track_id(spotify_url)
+    if spotify_track_id:
+        music_information = await _get_mapped_streaming_url(spotify_track_id)
+        if music_information:
+            return music_information
+
+    song = None
     try:
         # Try Spotify first
-        song = spotdl.search([spotify_url])
+        song = await extraction_pool.run(_search, spotify_url)
         if not song:
             raise Exception("No songs found from Spotify search")
         
-        download_urls = spotdl.get_download_urls(song)
+        download_urls = await extraction_pool.run(_get_download_urls, song)
         if not download_urls:
             raise Exception("No download URLs found from Spotify")
         
         youtube_url = download_urls[0]
-        return await universal_ddl_retriever.get_streaming_url(youtube_url)
+        return await _get_streaming_url_and_remember(spotify_track_id, youtube_url)
         
     except Exception as spotify_error:
         logger.error(f"Spotify search failed: {spotify_error}")
         
         # Extract song information for YouTube Music search
-        try:
-            song_info = spotdl.search([spotify_url])
-            if song_info and len(song_info) > 0:
-                song_name = song_info[0].name
-                artist_name = song_info[0].artist
-                search_query = f"{artist_name} - {song_name}"
-            else:
-                # If we can't get song info, extract from URL
-                url_parts = spotify_url.split('/')
-                track_id = url_parts[-1].split('?')[0]
-                search_query = f"spotify track {track_id}"
-        except Exception:
+        if song:
+            search_query = f"{song[0].artist} - {song[0].name}"
+        elif spotify_track_id:
+            # If we can't get song info, use the ID from the URL
+            search_query = f"spotify track {spotify_track_id}"
+        else:
             search_query = spotify_url
         
         # Try YouTube Music as fallback
         try:
             logger.info(f"Trying YouTube Music search for: {search_query}")
-            yt = ytmusicapi.YTMusic()
-            search_results = yt.search(search_query, filter="songs")
+            search_results = await extraction_pool.search_ytmusic(search_query, filter="songs")
             if search_results and len(search_results) > 0:
                 video_id = search_results[0]["videoId"]
                 yt_music_url = f"https://music.youtube.com/watch?v={video_id}"
-                return await universal_ddl_retriever.get_streaming_url(yt_music_url)
+                return await _get_streaming_url_and_remember(spotify_track_id, yt_music_url)
             else:
                 raise Exception("No results found on YouTube Music")
                 
@@ -1,27 +1,33 @@
-import requests
-from bs4 import BeautifulSoup
 from models.music_information import MusicInformation
+from utils import http_client
 
 async def get_streaming_url(downloadURL):
+    from bs4 import BeautifulSoup
+
     base_url = "https://tmate.cc"
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     }
 
+    session = http_client.get_session()
+
     # Get session token
-    response = requests.get(base_url, headers=headers)
-    soup = BeautifulSoup(response.content, 'html.parser')
-    sessionToken = response.cookies.get("session_data")
+    async with session.get(base_url, headers=headers) as response:
+        soup = BeautifulSoup(await response.read(), 'html.parser')
+        sessionCookie = response.cookies.get("session_data")
+    sessionToken = sessionCookie.value if sessionCookie else None
     token = soup.find('input', {'name': 'token'})['value']
 
     # Make POST request
     action_url = f"{base_url}/action"
     headers["cookie"] = f"session_data={sessionToken}"
     payload = {'url': downloadURL, 'token': token}
-    response = requests.post(action_url, data=payload, headers=headers)
+    async with session.post(action_url, data=payload, headers=headers) as response:
+        status = response.status
+        # tmate does not always send a JSON content type
+        data = await response.json(content_type=None) if status == 200 else None
 
-    if response.status_code == 200:
-        data = response.json()
+    if status == 200:
         key_value = data['data']
         soup = BeautifulSoup(key_value, 'html.parser')
         title = soup.find('h1').text.strip()
@@ -33,4 +39,4 @@ async def get_streaming_url(downloadURL):
         download_link = download_links[0]['href']
         return MusicInformation(streaming_url=download_link, song_name=title, author=author, image_url=image_url)
     else:
-        return Exception("Error:", response.status_code)
+        return Exception("Error:", status)
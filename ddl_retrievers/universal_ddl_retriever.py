@@ -1,46 +1,56 @@
-import yt_dlp
 from models.music_information import MusicInformation
+from utils import extraction_pool
+
+YDL_OPTS = {
+    'format': 'bestaudio',
+    'quiet': True,
+}
 
 class YouTubeError(Exception):
     """Custom exception for YouTube-specific errors"""
     pass
 
 async def get_streaming_url(url) -> MusicInformation:
-    
-    ydl_opts = {
-        'format': 'bestaudio',
-        'quiet': True,
-    }
-
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info_dict = ydl.extract_info(url, download=False)
+        info_dict = await extraction_pool.extract_info(url, YDL_OPTS)
 
-            # Get the best audio URL
-            if 'url' in info_dict:
-                track_link = info_dict['url']
+        # Get the best audio URL
+        if 'url' in info_dict:
+            track_link = info_dict['url']
+        else:
+            # Find the audio format with the highest bitrate
+            formats = info_dict.get('formats', [])
+            audio_formats = [f for f in formats if f.get('acodec') != 'none']
+            if audio_formats:
+                best_audio = max(audio_formats, key=lambda f: f.get('abr', 0) or 0)
+                track_link = best_audio['url']
             else:
-                # Find the audio format with the highest bitrate
-                formats = info_dict.get('formats', [])
-                audio_formats = [f for f in formats if f.get('acodec') != 'none']
-                if audio_formats:
-                    best_audio = max(audio_formats, key=lambda f: f.get('abr', 0) or 0)
-                    track_link = best_audio['url']
-                else:
-                    track_link = formats[0]['url'] if formats else None
-            track_name = info_dict['title']
-            track_author = info_dict['uploader']
-            try:
-                thumbnails = info_dict['thumbnails']
-                square_thumbnails = [thumb for thumb in thumbnails if 'width' in thumb and 'height' in thumb and thumb['width'] == thumb['height']]
-                largest_square = max(square_thumbnails, key=lambda t: t['width'])
-                thumbnail_url = largest_square['url']
-            except:
-                thumbnail_url = info_dict['thumbnail']
+                track_link = formats[0]['url'] if formats else None
+        track_name = info_dict['title']
+        track_author = info_dict['uploader']
+        try:
+            thumbnails = info_dict['thumbnails']
+            square_thumbnails = [thumb for thumb in thumbnails if 'width' in thumb and 'height' in thumb and thumb['width'] == thumb['height']]
+            largest_square = max(square_thumbnails, key=lambda t: t['width'])
+            thumbnail_url = largest_square['url']
+        except:
+            thumbnail_url = info_dict['thumbnail']
+
+        # Live streams have no end, yt-dlp may still report how long they have been running
+        duration = None if info_dict.get('is_live') else info_dict.get('duration')
 
-        return MusicInformation(streaming_url=track_link, song_name=track_name, author=track_author, image_url=thumbnail_url)
+        return MusicInformation(streaming_url=track_link, song_name=track_name, author=track_author, image_url=thumbnail_url, duration=duration)
     
-    except yt_dlp.DownloadError as e:
+    except extraction_pool.ExtractionTimeoutError:
+        raise YouTubeError("Loading this video took too long. Please try again later.")
+
+    except Exception as e:
+        # yt-dlp is already loaded by the extraction that raised, importing it here keeps it out of startup
+        import yt_dlp
+        if not isinstance(e, yt_dlp.DownloadError):
+            # Handle any other unexpected errors
+            raise YouTubeError(f"An unexpected error occurred: {str(e)}")
+
         error_message = str(e)
         
         # Handle age-restricted content
@@ -70,7 +80,3 @@ async def get_streaming_url(url) -> MusicInformation:
         # Generic yt-dlp error
         else:
             raise YouTubeError("Failed to process this video. It may be unavailable or restricted.")
-    
-    except Exception as e:
-        # Handle any other unexpected errors
-        raise YouTubeError(f"An unexpected error occurred: {str(e)}")
@@ -0,0 +1,122 @@
+"""
+Real-time bass boost and earrape for Discord audio playback, applied to the PCM frames FFmpeg produces
+"""
+import logging
+import math
+
+import discord
+import numpy as np
+
+from discord_utils.dynamic_bass_boost import get_bass_boost
+from discord_utils.dynamic_earrape import get_guild_earrape
+
+logger = logging.getLogger('PianoNicsMusic')
+
+SAMPLE_RATE = discord.opus.Encoder.SAMPLING_RATE
+CHANNELS = discord.opus.Encoder.CHANNELS
+FRAME_SAMPLES = discord.opus.Encoder.SAMPLES_PER_FRAME
+
+# Corner of the low shelf, the old FFmpeg equalizer boosted two octaves around 100 Hz
+SHELF_FREQUENCY = 150.0
+# dB of bass boost per bass level step, so level 1.0 is flat, 0.0 cuts and 2.0 boosts by 12 dB
+BASS_DB_PER_LEVEL = 12.0
+
+# Bit crusher settings, matching acrusher=level_in=8:level_out=8:bits=8:mode=log
+CRUSHER_DRIVE = 8.0
+CRUSHER_BITS = 8
+CRUSHER_MU = 255.0
+
+def bass_level_to_gain(bass_level: float) -> float:
+    """Linear gain of the low shelf for a bass level between 0.0 and 2.0"""
+    return 10 ** ((bass_level - 1.0) * BASS_DB_PER_LEVEL / 20)
+
+class _LowPass:
+    """
+    Two cascaded one-pole low-pass filters (a critically damped biquad), keeping their state between frames.
+
+    A one-pole filter y[n] = a*y[n-1] + b*x[n] unrolls to y[n] = a^(n+1)*y[-1] + b*a^n*sum(a^-k*x[k]),
+    which NumPy computes for a whole frame with one cumulative sum instead of a loop over the samples.
+    """
+
+    def __init__(self, cutoff: float = SHELF_FREQUENCY, sample_rate: int = SAMPLE_RATE, frame_samples: int = FRAME_SAMPLES):
+        pole = math.exp(-2 * math.pi * cutoff / sample_rate)
+        exponents = np.arange(frame_samples, dtype=np.float64)[:, None]
+        self._input_gain = 1.0 - pole
+        self._pole_powers = pole ** exponents
+        self._state_decay = pole ** (exponents + 1)
+        self._inverse_pole_powers = pole ** -exponents
+        self._state = np.zeros((2, CHANNELS))
+
+    def reset(self):
+        self._state[:] = 0.0
+
+    def _one_pole(self, samples: np.ndarray, stage: int) -> np.ndarray:
+        count = len(samples)
+        accumulated = np.cumsum(samples * self._inverse_pole_powers[:count], axis=0)
+        filtered = self._state_decay[:count] * self._state[stage] + self._input_gain * self._pole_powers[:count] * accumulated
+        self._state[stage] = filtered[-1]
+        return filtered
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Filter float samples shaped (samples, channels)"""
+        return self._one_pole(self._one_pole(samples, 0), 1)
+
+def crush(samples: np.ndarray) -> np.ndarray:
+    """Overdrive float samples and quantize them to CRUSHER_BITS on a logarithmic scale"""
+    driven = np.clip(samples * CRUSHER_DRIVE, -1.0, 1.0)
+    levels = 2 ** (CRUSHER_BITS - 1)
+    compressed = np.round(np.log1p(CRUSHER_MU * np.abs(driven)) / math.log1p(CRUSHER_MU) * levels) / levels
+    expanded = np.sign(driven) * np.expm1(compressed * math.log1p(CRUSHER_MU)) / CRUSHER_MU
+    return np.clip(expanded * CRUSHER_DRIVE, -1.0, 1.0)
+
+class AudioEffectsTransformer(discord.AudioSource):
+    """Applies the bass boost and earrape of a guild to every frame, so changes are heard on the next frame"""
+
+    def __init__(self, source: discord.AudioSource, guild_id: int):
+        if source.is_opus():
+            raise discord.ClientException("AudioSource must not be Opus encoded.")
+        self.original = source
+        self.guild_id = guild_id
+        self._low_pass = _LowPass()
+        self._shelf_gain = 1.0
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self):
+        self.original.cleanup()
+
+    def read(self) -> bytes:
+        data = self.original.read()
+        if not data:
+            return data
+        try:
+            return self._process(data)
+        except Exception as e:
+            logger.error(f"Error applying audio effects for guild {self.guild_id}: {e}")
+            return data
+
+    def _process(self, data: bytes) -> bytes:
+        shelf_gain = bass_level_to_gain(get_bass_boost(self.guild_id))
+        earrape = get_guild_earrape(self.guild_id)
+        previous_shelf_gain = self._shelf_gain
+        self._shelf_gain = shelf_gain
+
+        if shelf_gain == 1.0 and previous_shelf_gain == 1.0 and not earrape:
+            # Nothing to do at bass level 1.0, which guilds only reach with !bass 100 since they start at 0.0.
+            # The filter starts from silence when the bass is changed again
+            self._low_pass.reset()
+            return data
+
+        samples = np.frombuffer(data, dtype=np.int16).reshape(-1, CHANNELS) / 32768.0
+        # The shelf adds the low frequencies scaled by the gain, ramped over one frame when it changed to avoid clicks
+        if shelf_gain == previous_shelf_gain:
+            shelf_amount = shelf_gain - 1.0
+        else:
+            shelf_amount = np.linspace(previous_shelf_gain - 1.0, shelf_gain - 1.0, len(samples))[:, None]
+        samples = samples + shelf_amount * self._low_pass.process(samples)
+
+        if earrape:
+            samples = crush(samples)
+
+        return np.rint(np.clip(samples, -1.0, 32767 / 32768) * 32768.0).astype(np.int16).tobytes()
@@ -2,41 +2,80 @@
 Real-time volume control for Discord audio playback
 """
 import discord
+import numpy as np
 from typing import Optional
 import logging
-import threading
 
 logger = logging.getLogger('PianoNicsMusic')
 
-class DynamicVolumeTransformer(discord.PCMVolumeTransformer):
-    """A volume transformer that allows real-time volume changes"""
-    
-    def __init__(self, source, volume: float = 1.0):
-        self._lock = threading.Lock()
-        self._volume = volume
-        super().__init__(source, volume=volume)
-    
+FRAME_SAMPLES = discord.opus.Encoder.SAMPLES_PER_FRAME
+CHANNELS = discord.opus.Encoder.CHANNELS
+
+# Fraction of a volume change applied at each sample of the frame after the change, so it fades instead of clicking
+_RAMP = np.linspace(0.0, 1.0, FRAME_SAMPLES, dtype=np.float32)[:, None]
+
+def _clamp_volume(value: float) -> float:
+    return max(0.0, min(1.0, float(value)))
+
+class DynamicVolumeTransformer(discord.AudioSource):
+    """
+    A volume transformer that allows real-time volume changes.
+
+    The volume is a plain attribute: commands set it on the event loop and the audio thread picks it up on the next
+    frame, where the change is ramped over the frame. Assigning a float is atomic, so no lock is needed.
+    """
+
+    def __init__(self, source: discord.AudioSource, volume: float = 1.0):
+        if source.is_opus():
+            raise discord.ClientException("AudioSource must not be Opus encoded.")
+        self.original = source
+        self._volume = _clamp_volume(volume)
+        # Gain applied to the last frame, the start of the ramp when the volume changes
+        self._applied_volume = self._volume
+
     @property
     def volume(self) -> float:
         """Get the current volume level"""
-        with self._lock:
-            return self._volume
-    
+        return self._volume
+
     @volume.setter
     def volume(self, value: float):
         """Set the volume level (0.0 to 1.0)"""
-        with self._lock:
-            # Clamp volume between 0.0 and 1.0
-            self._volume = max(0.0, min(1.0, value))
-            # Update the underlying PCMVolumeTransformer volume
-            super(DynamicVolumeTransformer, self.__class__).volume.fset(self, self._volume)
-    
+        self._volume = _clamp_volume(value)
+
     def adjust_volume(self, adjustment: float) -> float:
         """Adjust volume by a certain amount and return the new volume"""
-        with self._lock:
-            new_volume = max(0.0, min(1.0, self._volume + adjustment))
-            self.volume = new_volume
-            return new_volume
+        self.volume = self._volume + adjustment
+        return self._volume
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self):
+        # Also called on garbage collection of a transformer whose constructor raised
+        original = getattr(self, 'original', None)
+        if original:
+            original.cleanup()
+
+    def read(self) -> bytes:
+        data = self.original.read()
+        volume = self._volume
+        previous_volume = self._applied_volume
+        self._applied_volume = volume
+        if not data or (volume == previous_volume == 1.0):
+            return data
+        if volume == previous_volume == 0.0:
+            return bytes(len(data))
+
+        samples = np.frombuffer(data, dtype=np.int16).reshape(-1, CHANNELS)
+        if volume == previous_volume:
+            gain = np.float32(volume)
+        elif len(samples) == FRAME_SAMPLES:
+            gain = previous_volume + (volume - previous_volume) * _RAMP
+        else:
+            gain = np.linspace(previous_volume, volume, len(samples), dtype=np.float32)[:, None]
+        # A volume of at most 1.0 can't push samples out of the int16 range
+        return (samples * gain).astype(np.int16).tobytes()
 
 # Global dictionary to store audio sources by guild ID
 _guild_audio_sources: dict[int, DynamicVolumeTransformer] = {}
@@ -0,0 +1,109 @@
+"""
+Measures the loudness of played tracks once in the background, so later plays use a static gain instead of loudnorm
+"""
+import asyncio
+import json
+import logging
+import math
+
+from db_utils import db_utils
+from utils import ffmpeg_runner
+
+logger = logging.getLogger('PianoNicsMusic')
+
+# Loudness target, also used by loudnorm for tracks that were not measured yet
+TARGET_LOUDNESS = -25.0
+TRUE_PEAK = -1.5
+LOUDNESS_RANGE = 11
+LOUDNORM_FILTER = f'loudnorm=I={TARGET_LOUDNESS:g}:TP={TRUE_PEAK:g}:LRA={LOUDNESS_RANGE}'
+
+# Quiet tracks are not raised further than this, so noise in a near-silent track isn't blown up
+MAX_GAIN_DB = 20.0
+# Decoding a whole track takes a few seconds of CPU, so only one runs at a time
+MAX_CONCURRENT_ANALYSES = 1
+ANALYSIS_TIMEOUT = 600
+# Only the start of long tracks is measured, so a multi-hour mix doesn't hold the analysis slot until it times out
+MAX_ANALYSIS_SECONDS = 1200
+
+_semaphore = ffmpeg_runner.LoopSemaphore(MAX_CONCURRENT_ANALYSES)
+# track ID -> running analysis
+_analyses: dict[str, asyncio.Task] = {}
+
+def get_filter(gain_db: float | None) -> str:
+    """FFmpeg filter for a track: a static gain when it was measured, single-pass loudnorm otherwise"""
+    if gain_db is None:
+        return LOUDNORM_FILTER
+    return f'volume={gain_db:.2f}dB'
+
+def parse_measurement(ffmpeg_output: str) -> dict | None:
+    """Get the JSON loudnorm prints at the end of an analysis"""
+    start = ffmpeg_output.rfind('{')
+    end = ffmpeg_output.rfind('}')
+    if start == -1 or end < start:
+        return None
+    try:
+        return json.loads(ffmpeg_output[start:end + 1])
+    except ValueError:
+        return None
+
+def compute_gain(measurement: dict) -> float | None:
+    """Gain in dB that brings a track to the target loudness without pushing its peaks over the true peak limit"""
+    try:
+        integrated_loudness = float(measurement['input_i'])
+        true_peak = float(measurement['input_tp'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not math.isfinite(integrated_loudness):
+        # Silence
+        return 0.0
+
+    gain_db = TARGET_LOUDNESS - integrated_loudness
+    if math.isfinite(true_peak):
+        gain_db = min(gain_db, TRUE_PEAK - true_peak)
+    return round(max(-MAX_GAIN_DB, min(MAX_GAIN_DB, gain_db)), 2)
+
+async def _measure(streaming_url: str) -> dict | None:
+    returncode, output = await ffmpeg_runner.run([
+        '-hide_banner', '-nostats', *ffmpeg_runner.get_reconnect_options(streaming_url),
+        '-i', streaming_url, '-t', str(MAX_ANALYSIS_SECONDS), '-vn', '-af', f'{LOUDNORM_FILTER}:print_format=json', '-f', 'null', '-',
+    ], ANALYSIS_TIMEOUT)
+    if returncode != 0:
+        logger.debug(f"Loudness analysis exited with code {returncode}")
+        return None
+    return parse_measurement(output)
+
+async def _analyze(track_id: str, streaming_url: str):
+    try:
+        async with _semaphore.get():
+            measurement = await _measure(streaming_url)
+        gain_db = compute_gain(measurement) if measurement else None
+        if gain_db is None:
+            logger.debug(f"Could not measure the loudness of {track_id}")
+            return
+        await db_utils.store_track_gain(track_id, gain_db)
+        logger.debug(f"Measured loudness of {track_id}: {measurement['input_i']} LUFS, gain {gain_db} dB")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Error measuring the loudness of {track_id}: {e}")
+    finally:
+        if _analyses.get(track_id) is asyncio.current_task():
+            del _analyses[track_id]
+
+def schedule(track_id: str, streaming_url: str, duration: float | None):
+    """
+    Measure the loudness of a track in the background, unless it is already being measured.
+    Live streams and streams of unknown length are not measured, they keep playing with loudnorm.
+    """
+    if duration is None:
+        return
+    task = _analyses.get(track_id)
+    if task and not task.done():
+        return
+    _analyses[track_id] = asyncio.create_task(_analyze(track_id, streaming_url), name=f'loudness-{track_id}')
+
+def stop():
+    """Cancel all running analyses"""
+    for task in _analyses.values():
+        task.cancel()
+    _analyses.clear()
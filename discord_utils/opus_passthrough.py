@@ -0,0 +1,162 @@
+"""
+Sends Opus streams to Discord as they are, without decoding and re-encoding them, while no volume or effect is applied
+"""
+import logging
+import threading
+from typing import Callable, Optional
+from urllib.parse import urlsplit, parse_qs
+
+import discord
+
+from discord_utils.audio_effects import bass_level_to_gain
+from discord_utils.dynamic_bass_boost import get_bass_boost
+from discord_utils.dynamic_earrape import get_guild_earrape
+from platform_handlers import audio_file_cache
+
+logger = logging.getLogger('PianoNicsMusic')
+
+FRAME_SECONDS = discord.opus.Encoder.FRAME_LENGTH / 1000
+# Loudness gains up to this size are not audible, so a track measured that close to the target needs no filter
+MAX_PASSTHROUGH_GAIN_DB = 0.5
+
+_enabled = False
+
+def configure(enabled: bool):
+    """
+    Allow passthrough. Loudness normalization is an FFmpeg filter, so only tracks whose measured gain is within
+    MAX_PASSTHROUGH_GAIN_DB pass through, and they sound the same as on the PCM path.
+
+    Only the bass level 1.0 is neutral, and guilds start at 0.0 (a 12 dB cut), so a guild with default settings
+    keeps decoding until its bass is set to 100%.
+    """
+    global _enabled
+    _enabled = enabled
+
+def is_opus_stream(streaming_url: str) -> bool:
+    """YouTube serves its WebM audio streams in Opus, and the audio file cache stores Opus"""
+    if audio_file_cache.is_cached_file(streaming_url):
+        return True
+    split_url = urlsplit(streaming_url)
+    if not (split_url.hostname or '').endswith('googlevideo.com'):
+        return False
+    return parse_qs(split_url.query).get('mime', [''])[0] == 'audio/webm'
+
+def _effects_are_neutral(guild_id: int, volume: float) -> bool:
+    # Bass level 1.0 is flat, not the 0.0 guilds start with
+    return volume == 1.0 and bass_level_to_gain(get_bass_boost(guild_id)) == 1.0 and not get_guild_earrape(guild_id)
+
+def _loudness_is_neutral(gain_db: float | None) -> bool:
+    # Unmeasured tracks play with loudnorm
+    return gain_db is not None and abs(gain_db) <= MAX_PASSTHROUGH_GAIN_DB
+
+def can_pass_through(guild_id: int, streaming_url: str, volume: float, gain_db: float | None) -> bool:
+    """Whether a stream can play without decoding, given its measured loudness gain and the volume and effects of the guild"""
+    return _enabled and _loudness_is_neutral(gain_db) and _effects_are_neutral(guild_id, volume) and is_opus_stream(streaming_url)
+
+# Quoted, the voice client is only importable with the voice dependencies installed
+def ensure_encoder(voice_client: 'discord.VoiceClient'):
+    """
+    Create the Opus encoder of a voice client before it plays a passthrough source. pycord only creates it when the
+    first source played isn't Opus, without one the switch to PCM would fail to encode and stop the player.
+    """
+    if not voice_client.encoder:
+        voice_client.encoder = discord.opus.Encoder()
+
+class PassthroughSource(discord.AudioSource):
+    """
+    Plays the Opus packets of a stream as they are. Once the volume or an effect changes, the PCM path built by
+    create_pcm_source continues the stream from the same position, started on a separate thread so playback
+    doesn't stall while FFmpeg connects.
+
+    Has the volume interface of DynamicVolumeTransformer, so it is registered as the audio source of the guild.
+    """
+
+    def __init__(self, streaming_url: str, guild_id: int, create_pcm_source: Callable[[float], discord.AudioSource], before_options: Optional[str] = None):
+        self.guild_id = guild_id
+        self._create_pcm_source = create_pcm_source
+        self._opus = discord.FFmpegOpusAudio(streaming_url, codec='opus', before_options=before_options, options='-vn')
+        self._volume = 1.0
+        self._frames_read = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._preparing = False
+        # (PCM source, frame it starts at) once it is ready
+        self._prepared: Optional[tuple[discord.AudioSource, int]] = None
+        self._pcm: Optional[discord.AudioSource] = None
+
+    @property
+    def volume(self) -> float:
+        pcm = self._pcm
+        return pcm.volume if pcm else self._volume
+
+    @volume.setter
+    def volume(self, value: float):
+        pcm = self._pcm
+        if pcm:
+            pcm.volume = value
+        else:
+            self._volume = max(0.0, min(1.0, value))
+
+    def adjust_volume(self, adjustment: float) -> float:
+        self.volume = self.volume + adjustment
+        return self.volume
+
+    def is_opus(self) -> bool:
+        # Only changes inside read(), so it always describes the last packet read
+        return self._pcm is None
+
+    def _prepare_pcm_source(self, start_frame: int):
+        try:
+            pcm_source = self._create_pcm_source(start_frame * FRAME_SECONDS)
+            # Wait for FFmpeg to connect and seek here, instead of on the audio thread
+            first_frame = pcm_source.read()
+        except Exception as e:
+            logger.error(f"Error switching guild {self.guild_id} from Opus passthrough to PCM: {e}")
+            return
+
+        with self._lock:
+            if self._closed:
+                pcm_source.cleanup()
+                return
+            # The first frame was read, so the source now stands one frame later
+            self._prepared = (pcm_source, start_frame + 1 if first_frame else start_frame)
+
+    def _switch_to_pcm(self, pcm_source: discord.AudioSource, start_frame: int):
+        # Skip what the passthrough played while the PCM source was started
+        for _ in range(self._frames_read - start_frame):
+            pcm_source.read()
+        # The volume ramps from 1.0 to the new volume over the first frame
+        pcm_source.volume = self._volume
+        self._pcm = pcm_source
+        self._opus.cleanup()
+        logger.debug(f"Switched guild {self.guild_id} from Opus passthrough to PCM after {self._frames_read * FRAME_SECONDS:.1f}s")
+
+    def read(self) -> bytes:
+        if self._pcm:
+            return self._pcm.read()
+
+        with self._lock:
+            prepared = self._prepared
+        if prepared:
+            self._switch_to_pcm(*prepared)
+            return self._pcm.read()
+
+        if not self._preparing and not _effects_are_neutral(self.guild_id, self._volume):
+            self._preparing = True
+            threading.Thread(target=self._prepare_pcm_source, args=(self._frames_read,), name=f'pcm-switch-{self.guild_id}', daemon=True).start()
+
+        data = self._opus.read()
+        if data:
+            self._frames_read += 1
+        return data
+
+    def cleanup(self):
+        with self._lock:
+            self._closed = True
+            prepared = self._prepared
+            self._prepared = None
+        self._opus.cleanup()
+        if self._pcm:
+            self._pcm.cleanup()
+        elif prepared:
+            prepared[0].cleanup()
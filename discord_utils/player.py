@@ -1,41 +1,79 @@
 import asyncio
 import discord
 import logging
+from typing import Optional
 
 from discord_utils import embed_generator
+from discord_utils import loudness_analyzer, opus_passthrough
+from discord_utils.audio_effects import AudioEffectsTransformer
 from discord_utils.dynamic_volume import DynamicVolumeTransformer, register_audio_source, unregister_audio_source
 from discord_utils.dynamic_bass_boost import register_bass_boost, unregister_bass_boost
 from discord_utils.dynamic_earrape import register_earrape, unregister_earrape
-from platform_handlers import music_url_getter
+from platform_handlers import audio_file_cache, music_url_getter
+from platform_handlers.track_identity import get_canonical_track_id
 from ddl_retrievers.universal_ddl_retriever import YouTubeError
 from db_utils import db_utils
+from models.music_information import MusicInformation
+from utils import ffmpeg_runner
 
 logger = logging.getLogger('PianoNicsMusic')
 
-async def play(ctx: discord.ApplicationContext, queue_url: str):
+
+class _PlaybackFuture:
+    """Bridges the after= callback of voice_client.play, which runs on the audio thread, into an asyncio future"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self.future: asyncio.Future = loop.create_future()
+
+    def on_finished(self, error: Optional[Exception]):
+        try:
+            self._loop.call_soon_threadsafe(self._set_result, error)
+        except RuntimeError:
+            pass  # Event loop already closed during shutdown
+
+    def _set_result(self, error: Optional[Exception]):
+        if not self.future.done():
+            self.future.set_result(error)
+
+async def play(ctx: discord.ApplicationContext, queue_url: str, music_information: Optional[MusicInformation] = None):
+    """
+    Play a queue URL. Pass music_information when the song was already resolved, e.g. by the prefetcher, which hands
+    over its pin of a cached file.
+    """
     loading_message = None
     try:
-        try:
-            loading_message = await ctx.respond(embed=await embed_generator.create_embed("Please Wait", "Searching song..."))
-        except:
-            loading_message = await ctx.send(embed=await embed_generator.create_embed("Please Wait", "Searching song..."))
+        if music_information is None:
+            try:
+                loading_message = await ctx.respond(embed=await embed_generator.create_embed("Please Wait", "Searching song..."))
+            except:
+                loading_message = await ctx.send(embed=await embed_generator.create_embed("Please Wait", "Searching song..."))
 
-        try:
-            music_information = await music_url_getter.get_streaming_url(queue_url)
-        except YouTubeError as e:
-            # Handle YouTube-specific errors with user-friendly messages
-            logger.error(f"YouTube error for {queue_url}: {e}")
-            if loading_message:
-                await loading_message.edit(embed=await embed_generator.create_embed("⚠️ Video Error", str(e)))
-            raise YouTubeError(str(e))  # Keep as YouTubeError to preserve error type
-        except Exception as e:
-            logger.error(f"Error getting streaming URL for {queue_url}: {e}")
-            if loading_message:
-                await loading_message.edit(embed=await embed_generator.create_embed("Error", "Failed to get song information. Skipping..."))
-            raise Exception(f"Failed to get streaming URL: {e}")
+            try:
+                music_information = await music_url_getter.get_streaming_url(queue_url)
+                # Keeps a cached file from being evicted before FFmpeg opens it
+                audio_file_cache.pin(music_information.streaming_url)
+            except YouTubeError as e:
+                # Handle YouTube-specific errors with user-friendly messages
+                logger.error(f"YouTube error for {queue_url}: {e}")
+                if loading_message:
+                    await loading_message.edit(embed=await embed_generator.create_embed("⚠️ Video Error", str(e)))
+                raise YouTubeError(str(e))  # Keep as YouTubeError to preserve error type
+            except Exception as e:
+                logger.error(f"Error getting streaming URL for {queue_url}: {e}")
+                if loading_message:
+                    await loading_message.edit(embed=await embed_generator.create_embed("Error", "Failed to get song information. Skipping..."))
+                raise Exception(f"Failed to get streaming URL: {e}")
 
+        now_playing_embed = await embed_generator.create_embed("Now Playing", f"**{music_information.song_name}**\nBy **{music_information.author}**", music_information.image_url)
         try:
-            await loading_message.edit(embed=await embed_generator.create_embed("Now Playing", f"**{music_information.song_name}**\nBy **{music_information.author}**", music_information.image_url))
+            if loading_message:
+                await loading_message.edit(embed=now_playing_embed)
+            else:
+                try:
+                    loading_message = await ctx.respond(embed=now_playing_embed)
+                except:
+                    loading_message = await ctx.send(embed=now_playing_embed)
         except Exception as e:
             logger.error(f"Error updating loading message: {e}")
         
@@ -56,30 +94,45 @@ async def play(ctx: discord.ApplicationContext, queue_url: str):
                 raise Exception("Not connected to voice.")
             
         try:
-            volume = await db_utils.get_volume(ctx.guild.id)
-            bass_boost = await db_utils.get_bass_boost(ctx.guild.id)
-            earrape_enabled = await db_utils.get_earrape(ctx.guild.id)
-
-            # loudnorm: normalize volume levels (I=-25:TP=-1.5:LRA=11)
-            # equalizer: boost bass at 100Hz with gain adjustment based on bass_boost
-            bass_db = (bass_boost - 1.0) * 12
-            filter_audio = f'loudnorm=I=-25:TP=-1.5:LRA=11,equalizer=f=100:t=h:width_type=o:width=2:g={bass_db:.1f}'
+            settings = await db_utils.get_guild_settings(ctx.guild.id)
+            volume = settings.volume if settings else 1.0
+            bass_boost = settings.bass_boost if settings else 0.0
+            earrape_enabled = settings.earrape if settings else False
 
-            # acrusher: aggressive distortion filter for earrape effect
-            if earrape_enabled:
-                filter_audio += ',acrusher=level_in=8:level_out=8:bits=8:mode=log'
+            # Normalize volume levels with the gain measured on an earlier play, or with loudnorm (I=-25:TP=-1.5:LRA=11)
+            # while the track is measured in the background
+            # Bass boost and earrape are applied per frame by AudioEffectsTransformer, so changes don't restart FFmpeg
+            track_id = get_canonical_track_id(queue_url)
+            gain_db = await db_utils.get_track_gain(track_id)
+            if gain_db is None:
+                loudness_analyzer.schedule(track_id, music_information.streaming_url, music_information.duration)
+            filter_audio = loudness_analyzer.get_filter(gain_db)
 
-            audio_source = discord.FFmpegPCMAudio(
-                music_information.streaming_url,
-                options=f'-vn -filter:a "{filter_audio}"',
-                before_options="-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5"
-            )
+            # Cached tracks play from a local file, which gets no reconnect options
+            is_stream = ffmpeg_runner.is_stream(music_information.streaming_url)
+            before_options = ' '.join(ffmpeg_runner.get_reconnect_options(music_information.streaming_url))
 
-            audio_source = DynamicVolumeTransformer(audio_source, volume=volume)
+            def create_pcm_source(start_seconds: float = 0.0) -> DynamicVolumeTransformer:
+                seek_options = f'-ss {start_seconds:.2f} ' if start_seconds else ''
+                pcm_source = discord.FFmpegPCMAudio(
+                    music_information.streaming_url,
+                    options=f'-vn -filter:a "{filter_audio}"',
+                    before_options=seek_options + before_options
+                )
+                pcm_source = AudioEffectsTransformer(pcm_source, ctx.guild.id)
+                return DynamicVolumeTransformer(pcm_source, volume=volume)
 
-            register_audio_source(ctx.guild.id, audio_source)
             register_bass_boost(ctx.guild.id, bass_boost)
             register_earrape(ctx.guild.id, earrape_enabled)
+
+            # Opus streams that need no loudness gain skip decoding and re-encoding until the volume or an effect is changed
+            if opus_passthrough.can_pass_through(ctx.guild.id, music_information.streaming_url, volume, gain_db):
+                audio_source = opus_passthrough.PassthroughSource(music_information.streaming_url, ctx.guild.id, create_pcm_source, before_options=before_options)
+                opus_passthrough.ensure_encoder(voice_client)
+            else:
+                audio_source = create_pcm_source()
+
+            register_audio_source(ctx.guild.id, audio_source)
             
             # Stop any currently playing audio before starting new playback
             if voice_client.is_playing():
@@ -87,16 +140,22 @@ async def play(ctx: discord.ApplicationContext, queue_url: str):
                 # Wait a moment for the stop to take effect
                 await asyncio.sleep(0.5)
 
-            voice_client.play(audio_source)
+            playback_finished = _PlaybackFuture(asyncio.get_running_loop())
+            voice_client.play(audio_source, after=playback_finished.on_finished)
+
+            # Tracks that are played often are stored on disk in the background
+            if is_stream:
+                audio_file_cache.record_play(queue_url, music_information, is_opus=opus_passthrough.is_opus_stream(music_information.streaming_url))
             
         except Exception as e:
             logger.error(f"Error starting playback: {e}")
             raise Exception(f"Failed to start audio playback: {e}")
             
-        # Wait for playback to finish with better error handling
+        # Wait for the player thread to report the end of the song (finished, skipped, stopped or disconnected)
         try:
-            while voice_client.is_connected() and (voice_client.is_playing() or voice_client.is_paused()):
-                await asyncio.sleep(1)
+            playback_error = await playback_finished.future
+            if playback_error:
+                logger.error(f"Error during playback: {playback_error}")
         except Exception as e:
             logger.error(f"Error during playback monitoring: {e}")
             # Don't raise here, just log the error
@@ -116,4 +175,7 @@ async def play(ctx: discord.ApplicationContext, queue_url: str):
                 await loading_message.edit(embed=await embed_generator.create_embed("Error", "An error occurred while playing this song."))
             except:
                 pass  # Ignore message edit errors
-        raise e  # Re-raise the exception so the main loop can handle it
\ No newline at end of file
+        raise e  # Re-raise the exception so the main loop can handle it
+    finally:
+        if music_information:
+            audio_file_cache.unpin(music_information.streaming_url)
@@ -0,0 +1,20 @@
+import discord
+
+class ResumeContext:
+    """Stands in for a command context when the bot continues a queue on its own, e.g. after a restart"""
+
+    def __init__(self, bot: discord.Bot, guild: discord.Guild, channel: discord.abc.Messageable | None):
+        self.bot = bot
+        self.guild = guild
+        self.channel = channel
+        self.message = None
+        self.author = None
+
+    async def send(self, *args, **kwargs):
+        if self.channel is None:
+            return None
+        return await self.channel.send(*args, **kwargs)
+
+    async def respond(self, *args, **kwargs):
+        # There is no interaction to respond to
+        return await self.send(*args, **kwargs)
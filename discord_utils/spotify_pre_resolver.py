@@ -0,0 +1,84 @@
+"""
+Matches the upcoming Spotify tracks of a queue to YouTube videos in the background, before their turn to play
+"""
+import asyncio
+import logging
+
+from db_utils import db_utils
+from ddl_retrievers import spotify_ddl_retriever
+
+logger = logging.getLogger('PianoNicsMusic')
+
+# Number of upcoming queue entries that are matched ahead of time
+LOOKAHEAD = 10
+MAX_CONCURRENT_MATCHES = 3
+
+_guild_tasks: dict[int, asyncio.Task] = {}
+# Guilds whose queue changed while a pass was running, so another pass follows it
+_rerun_guilds: set[int] = set()
+# guild_id -> queue entry IDs that could not be matched, so they are not retried on every pass
+_failed_entries: dict[int, set[int]] = {}
+
+def schedule(guild_id: int):
+    """Match the upcoming Spotify tracks of a guild in the background"""
+    task = _guild_tasks.get(guild_id)
+    if task and not task.done():
+        _rerun_guilds.add(guild_id)
+        return
+    _guild_tasks[guild_id] = asyncio.create_task(_run(guild_id), name=f'spotify-pre-resolve-{guild_id}')
+
+def stop(guild_id: int):
+    """Stop matching for a guild"""
+    _rerun_guilds.discard(guild_id)
+    _failed_entries.pop(guild_id, None)
+    task = _guild_tasks.pop(guild_id, None)
+    if task:
+        task.cancel()
+
+async def _match(guild_id: int, entry_id: int, spotify_url: str, semaphore: asyncio.Semaphore):
+    try:
+        async with semaphore:
+            youtube_url = await spotify_ddl_retriever.match_youtube_url(spotify_url)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # The track is matched again when it plays, which reports the error to the user
+        logger.debug(f"Pre-resolving {spotify_url} failed: {e}")
+        youtube_url = None
+
+    if youtube_url:
+        await db_utils.set_resolved_url(guild_id, entry_id, youtube_url)
+        # The queue now returns the YouTube URL for this entry, so a prefetch of its Spotify URL would be discarded
+        # when it plays. Imported here since the prefetcher imports this module.
+        from discord_utils import track_prefetcher
+        await track_prefetcher.refresh(guild_id)
+    else:
+        _failed_entries.setdefault(guild_id, set()).add(entry_id)
+
+async def _resolve_upcoming(guild_id: int):
+    failed_entries = _failed_entries.get(guild_id, set())
+    spotify_entries = [
+        (entry_id, url) for entry_id, url in await db_utils.get_unresolved_upcoming_entries(guild_id, LOOKAHEAD)
+        if entry_id not in failed_entries and spotify_ddl_retriever.is_spotify_track(url)
+    ]
+    if not spotify_entries:
+        return
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_MATCHES)
+    await asyncio.gather(*(_match(guild_id, entry_id, url, semaphore) for entry_id, url in spotify_entries))
+    logger.debug(f"Pre-resolved {len(spotify_entries)} Spotify tracks for guild {guild_id}")
+
+async def _run(guild_id: int):
+    try:
+        while True:
+            await _resolve_upcoming(guild_id)
+            if guild_id not in _rerun_guilds:
+                break
+            _rerun_guilds.discard(guild_id)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Error pre-resolving Spotify tracks for guild {guild_id}: {e}")
+    finally:
+        if _guild_tasks.get(guild_id) is asyncio.current_task():
+            del _guild_tasks[guild_id]
@@ -0,0 +1,98 @@
+"""
+Resolves the next queued song in the background while the current one plays
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from db_utils import db_utils
+from discord_utils import spotify_pre_resolver
+from models.music_information import MusicInformation
+from platform_handlers import audio_file_cache, music_url_getter
+
+logger = logging.getLogger('PianoNicsMusic')
+
+# guild_id -> (queue URL being resolved, resolving task)
+_guild_prefetches: dict[int, tuple[str, asyncio.Task]] = {}
+_active_guilds: set[int] = set()
+
+def start(guild_id: int):
+    """Enable prefetching for a guild whose play loop is running"""
+    _active_guilds.add(guild_id)
+
+def stop(guild_id: int):
+    """Disable prefetching for a guild and drop any pending prefetch"""
+    _active_guilds.discard(guild_id)
+    cancel(guild_id)
+    spotify_pre_resolver.stop(guild_id)
+
+def _discard(task: asyncio.Task):
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled() and task.result():
+        audio_file_cache.unpin(task.result().streaming_url)
+
+def cancel(guild_id: int):
+    """Drop the pending prefetch for a guild"""
+    prefetch = _guild_prefetches.pop(guild_id, None)
+    if prefetch:
+        _, task = prefetch
+        _discard(task)
+
+async def _resolve(queue_url: str) -> Optional[MusicInformation]:
+    try:
+        music_information = await music_url_getter.get_streaming_url(queue_url)
+        # A cached file stays on disk until the prefetch is discarded or taken over by the player
+        audio_file_cache.pin(music_information.streaming_url)
+        return music_information
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # player.play resolves the song again and reports the error to the user
+        logger.debug(f"Prefetch failed for {queue_url}: {e}")
+        return None
+
+async def prefetch_next(guild_id: int):
+    """Start resolving the song that will play after the current one"""
+    if guild_id not in _active_guilds:
+        cancel(guild_id)
+        return
+
+    # Spotify tracks further ahead are matched to YouTube videos in the background
+    spotify_pre_resolver.schedule(guild_id)
+
+    next_url = await db_utils.peek_queue_entry(guild_id)
+
+    current_prefetch = _guild_prefetches.get(guild_id)
+    if current_prefetch and current_prefetch[0] == next_url and not current_prefetch[1].cancelled():
+        return  # Already resolving the right song
+    cancel(guild_id)
+
+    if not next_url:
+        return
+
+    task = asyncio.create_task(_resolve(next_url), name=f'prefetch-{guild_id}')
+    _guild_prefetches[guild_id] = (next_url, task)
+
+async def refresh(guild_id: int):
+    """Re-run the prefetch after the queue changed, if the guild is playing"""
+    if guild_id in _active_guilds:
+        await prefetch_next(guild_id)
+
+async def take(guild_id: int, queue_url: str) -> Optional[MusicInformation]:
+    """
+    Get the prefetched song information for a queue URL, waiting for it if it is still resolving.
+    The pin of a cached file passes to the caller, player.play releases it.
+    """
+    prefetch = _guild_prefetches.pop(guild_id, None)
+    if not prefetch:
+        return None
+
+    prefetched_url, task = prefetch
+    if prefetched_url != queue_url:
+        _discard(task)
+        return None
+
+    if task.cancelled():
+        return None
+    return await task
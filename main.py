@@ -5,9 +5,13 @@ import io
 import json
 import os
 import sys
+import time
 import logging
 import logging.handlers
 
+# Start of the startup time report
+_startup_started = time.perf_counter()
+
 # Third-party imports
 import discord
 import websockets
@@ -17,17 +21,24 @@ from dotenv import load_dotenv
 import configparser
 
 # Local application imports
-from db_utils.db import setup_db
+from db_utils.db import setup_db, configure_db, is_persistent
 import db_utils.db_utils as db_utils
-from discord_utils import embed_generator, player
+from db_utils import db_executor
+from discord_utils import embed_generator, loudness_analyzer, opus_passthrough, player, track_prefetcher
+from discord_utils.resume_context import ResumeContext
 from discord_utils.dynamic_volume import set_guild_volume, adjust_guild_volume, get_guild_current_volume
 from discord_utils.dynamic_bass_boost import set_guild_bass_boost, adjust_guild_bass_boost, get_guild_current_bass_boost
 from discord_utils.dynamic_earrape import set_guild_earrape, toggle_guild_earrape, get_guild_earrape
 from ai_server_utils import rvc_server_checker
-from platform_handlers import music_url_getter
+from platform_handlers import audio_file_cache, music_url_getter, query_cache, spotify_playlist_expander
+from ddl_retrievers import spotify_ddl_retriever, universal_ddl_retriever
 from ddl_retrievers.universal_ddl_retriever import YouTubeError
 from utils import get_version, get_full_version_info, get_version_info
 from utils.yt_dlp_updater import scheduled_update_check
+from utils import extraction_pool, http_client
+
+# Platform libraries (spotdl, yt-dlp, spotipy, ytmusicapi) are imported on first use or by the eager warm-up
+_imports_finished = time.perf_counter()
 
 load_dotenv()
 
@@ -35,6 +46,35 @@ load_dotenv()
 config = configparser.ConfigParser()
 config.read('config.ini')
 
+extraction_pool.configure(
+    max_workers=config.getint('Performance', 'ExtractionWorkers', fallback=extraction_pool.DEFAULT_MAX_WORKERS),
+    timeout=config.getfloat('Performance', 'ExtractionTimeout', fallback=extraction_pool.DEFAULT_TIMEOUT)
+)
+http_client.configure(
+    limit_per_host=config.getint('Performance', 'HttpConnectionsPerHost', fallback=http_client.DEFAULT_LIMIT_PER_HOST),
+    timeout=config.getfloat('Performance', 'HttpTimeout', fallback=http_client.DEFAULT_TIMEOUT)
+)
+# Passed through tracks skip loudness normalization, so it is opt-in
+opus_passthrough.configure(config.getboolean('Performance', 'OpusPassthrough', fallback=False))
+
+# Without a path search results are only cached until the bot stops
+query_cache_path = config.get('Cache', 'QueryCachePath', fallback='').strip() or None
+if query_cache_path:
+    query_cache.load(query_cache_path)
+
+# Without a path tracks are always streamed
+audio_file_cache.configure(
+    config.get('Cache', 'AudioCachePath', fallback='').strip() or None,
+    max_bytes=config.getint('Cache', 'AudioCacheMaxSizeMB', fallback=audio_file_cache.DEFAULT_MAX_BYTES // 1024 // 1024) * 1024 * 1024,
+    min_plays=config.getint('Cache', 'AudioCacheMinPlays', fallback=audio_file_cache.DEFAULT_MIN_PLAYS)
+)
+
+# Without a path the database lives in memory and queues are lost on restart
+configure_db(config.get('Database', 'Path', fallback='').strip() or None)
+if is_persistent():
+    # Readers need their own connections, which only see the same data when the database is a file
+    db_executor.configure(reader_threads=config.getint('Database', 'ReaderThreads', fallback=2))
+
 class ColoredFormatter(logging.Formatter):
     """Custom formatter with colors for console output"""
     
@@ -101,6 +141,7 @@ def setup_logging():
 
 # Initialize logging
 app_logger = setup_logging()
+app_logger.info(f"Imported modules in {_imports_finished - _startup_started:.2f}s")
 
 model_choices = []
 
@@ -110,11 +151,79 @@ model_choices = []
 
 intents = discord.Intents.all()
 
-bot = commands.Bot(command_prefix=[".", "!", "$"], intents=intents, help_command=None)
+class PianoNicsBot(commands.Bot):
+    async def close(self):
+        await super().close()
+        loudness_analyzer.stop()
+        audio_file_cache.stop()
+        # Close the pooled HTTP connections while the event loop still runs
+        await http_client.close()
+        if query_cache_path:
+            query_cache.save(query_cache_path)
+
+bot = PianoNicsBot(command_prefix=[".", "!", "$"], intents=intents, help_command=None)
+
+# on_ready runs again after every gateway reconnect, but the database setup and resume must only happen once
+_startup_completed = False
+
+async def resume_guilds():
+    """Continue the queues that were playing when the bot stopped"""
+    for resumable_guild in await db_utils.get_resumable_guilds():
+        guild_id = resumable_guild.discord_guild_id
+        guild = bot.get_guild(guild_id)
+        voice_channel = bot.get_channel(resumable_guild.voice_channel_id) if resumable_guild.voice_channel_id else None
+        listeners = [member for member in getattr(voice_channel, 'members', []) if not member.bot]
+
+        if not guild or not voice_channel or not listeners or await db_utils.is_queue_empty(guild_id):
+            app_logger.info(f"Not resuming queue of guild {guild_id}")
+            await db_utils.delete_guild(guild_id)
+            continue
+
+        text_channel = bot.get_channel(resumable_guild.text_channel_id) if resumable_guild.text_channel_id else None
+        try:
+            await db_utils.requeue_current_entry(guild_id)
+            await voice_channel.connect()
+            ctx = ResumeContext(bot, guild, text_channel)
+            await ctx.send(embed=await embed_generator.create_embed("Queue Resumed", "The bot restarted, continuing the queue."))
+            bot.loop.create_task(run_play_loop(ctx), name=f'resume-{guild_id}')
+            app_logger.info(f"Resumed queue of guild {guild_id} in {voice_channel.name}")
+        except Exception as e:
+            app_logger.error(f"Error resuming queue of guild {guild_id}: {e}")
+            await db_utils.delete_guild(guild_id)
+
+async def warm_up_platforms():
+    """Load the platform libraries and create their clients before the first song needs them"""
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        extraction_pool.warm_up([
+            universal_ddl_retriever.YDL_OPTS,
+            music_url_getter.FLAT_YDL_OPTS,
+            music_url_getter.SEARCH_YDL_OPTS,
+        ]),
+        spotify_ddl_retriever.warm_up(),
+        extraction_pool.run(spotify_playlist_expander.get_client),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            app_logger.warning(f"Platform warm-up step failed: {result}")
+    app_logger.info(f"Platform warm-up finished in {time.perf_counter() - start:.2f}s")
 
 @bot.event
 async def on_ready():
-    await setup_db()
+    global _startup_completed
+    if not _startup_completed:
+        _startup_completed = True
+        app_logger.info(f"Connected to Discord {time.perf_counter() - _startup_started:.2f}s after start")
+        if config.getboolean('Performance', 'EagerWarmup', fallback=False):
+            # Runs in the background and holds no worker longer than its own job, requests that arrive first load what
+            # they need themselves
+            bot.loop.create_task(warm_up_platforms(), name='platform-warm-up')
+        await setup_db()
+        if is_persistent():
+            await resume_guilds()
+        app_logger.info(f"Startup completed {time.perf_counter() - _startup_started:.2f}s after start")
+
     await bot.change_presence(status=discord.Status.do_not_disturb, activity=discord.Activity(type=discord.ActivityType.listening, name="to da kuhle songs"))
     if bot.user:
         app_logger.info(f"Bot is ready and logged in as {bot.user.name}")
@@ -215,6 +324,8 @@ async def leave(ctx):
                 return
 
         if voice_client:
+            track_prefetcher.cancel(ctx.guild.id)
+            cancel_queue_ingestion(ctx.guild.id)
             try:
                 await db_utils.delete_queue(ctx.guild.id)
             except Exception as e:
@@ -289,7 +400,7 @@ async def resume(ctx):
 async def volume(ctx, *, level=None):
     """Set or get the current volume level (0-100)"""
     try:
-        guild = await db_utils.get_guild(ctx.guild.id)
+        guild = await db_utils.get_guild_settings(ctx.guild.id)
         if not guild:
             if ctx.message:
                 await ctx.send(embed=await embed_generator.create_error_embed("Error", "Bot is not connected to a Voice channel"))
@@ -360,7 +471,7 @@ async def volume(ctx, *, level=None):
 async def volume_up(ctx):
     """Increase volume by 10%"""
     try:
-        guild = await db_utils.get_guild(ctx.guild.id)
+        guild = await db_utils.get_guild_settings(ctx.guild.id)
         if not guild:
             if ctx.message:
                 await ctx.send(embed=await embed_generator.create_error_embed("Error", "Bot is not connected to a Voice channel"))
@@ -401,7 +512,7 @@ async def volume_up(ctx):
 async def volume_down(ctx):
     """Decrease volume by 10%"""
     try:
-        guild = await db_utils.get_guild(ctx.guild.id)
+        guild = await db_utils.get_guild_settings(ctx.guild.id)
         if not guild:
             if ctx.message:
                 await ctx.send(embed=await embed_generator.create_error_embed("Error", "Bot is not connected to a Voice channel"))
@@ -441,7 +552,7 @@ async def volume_down(ctx):
 @bot.command(aliases=['bass', 'b', 'lowend'])
 async def bass_boost(ctx, *, level=None):
     try:
-        guild = await db_utils.get_guild(ctx.guild.id)
+        guild = await db_utils.get_guild_settings(ctx.guild.id)
         if not guild:
             if ctx.message:
                 await ctx.send(embed=await embed_generator.create_error_embed("Error", "Bot is not connected to a Voice channel"))
@@ -511,7 +622,7 @@ async def bass_boost(ctx, *, level=None):
 @bot.command(aliases=['bass+', 'bassup', 'more_bass'])
 async def bass_boost_up(ctx):
     try:
-        guild = await db_utils.get_guild(ctx.guild.id)
+        guild = await db_utils.get_guild_settings(ctx.guild.id)
         if not guild:
             if ctx.message:
                 await ctx.send(embed=await embed_generator.create_error_embed("Error", "Bot is not connected to a Voice channel"))
@@ -551,7 +662,7 @@ async def bass_boost_up(ctx):
 @bot.command(aliases=['bass-', 'bassdown', 'less_bass'])
 async def bass_boost_down(ctx):
     try:
-        guild = await db_utils.get_guild(ctx.guild.id)
+        guild = await db_utils.get_guild_settings(ctx.guild.id)
         if not guild:
             if ctx.message:
                 await ctx.send(embed=await embed_generator.create_error_embed("Error", "Bot is not connected to a Voice channel"))
@@ -591,7 +702,7 @@ async def bass_boost_down(ctx):
 @bot.command(aliases=['ear', 'rape', 'er'])
 async def earrape(ctx):
     try:
-        guild = await db_utils.get_guild(ctx.guild.id)
+        guild = await db_utils.get_guild_settings(ctx.guild.id)
         if not guild:
             if ctx.message:
                 await ctx.send(embed=await embed_generator.create_error_embed("Error", "Bot is not connected to a Voice channel"))
@@ -630,7 +741,7 @@ async def stop(ctx):
 
 @bot.command(aliases=['lp', 'repeat', 'cycle', 'toggle_loop', 'toggle_repeat'])
 async def loop(ctx):
-    guild = await db_utils.get_guild(ctx.guild.id)
+    guild = await db_utils.get_guild_settings(ctx.guild.id)
 
     if not guild:
         if ctx.message:
@@ -640,6 +751,7 @@ async def loop(ctx):
         return
     
     is_looping = await db_utils.toggle_loop(ctx.guild.id)
+    await track_prefetcher.refresh(ctx.guild.id)
 
     if is_looping:
         if ctx.message:
@@ -654,7 +766,7 @@ async def loop(ctx):
 
 @bot.command(aliases=['fp', 'forceplay', 'playforce'])
 async def force_play(ctx, *, query=None, insta_skip=False):
-    guild = await db_utils.get_guild(ctx.guild.id)
+    guild = await db_utils.get_guild_settings(ctx.guild.id)
     voice_client = discord.utils.get(bot.voice_clients, guild=ctx.guild)
 
     if not guild:
@@ -664,8 +776,9 @@ async def force_play(ctx, *, query=None, insta_skip=False):
             await ctx.respond(embed=await embed_generator.create_error_embed("Error", "Bot is not connected to a Voice channel"))
         return
 
-    if (len(guild.queue) != 0) and voice_client and query:
+    if (await db_utils.get_queue_total_entries(ctx.guild.id) != 0) and voice_client and query:
         await db_utils.add_force_next_play_to_queue(ctx.guild.id, query)
+        await track_prefetcher.refresh(ctx.guild.id)
     else:
         await ctx.send(embed=await embed_generator.create_error_embed("Error", "No song is currently playing"))
     
@@ -685,7 +798,7 @@ async def force_play(ctx, *, query=None, insta_skip=False):
 
 @bot.command()
 async def shuffle(ctx):
-    guild = await db_utils.get_guild(ctx.guild.id)
+    guild = await db_utils.get_guild_settings(ctx.guild.id)
 
     if not guild:
         if ctx.message:
@@ -695,6 +808,7 @@ async def shuffle(ctx):
         return
 
     shuffle_enabled = await db_utils.shuffle_playlist(ctx.guild.id)
+    await track_prefetcher.refresh(ctx.guild.id)
 
     if ctx.message:
         if shuffle_enabled:
@@ -752,6 +866,98 @@ async def help(ctx):
     else:
         await ctx.respond(embed=embed)
 
+# Background tasks that keep adding the remaining batches of large playlists to the queue
+_queue_ingestion_tasks: dict[int, set[asyncio.Task]] = {}
+# Set whenever a background task added songs, so a play loop waiting on an empty queue wakes up
+_queue_batch_added: dict[int, asyncio.Event] = {}
+
+# Minimum number of seconds between two edits of the playlist progress embed
+QUEUE_PROGRESS_EDIT_INTERVAL = 3.0
+
+def start_queue_ingestion(ctx, url_batches, queue_message, added_count: int):
+    guild_id = ctx.guild.id
+    task = asyncio.create_task(_ingest_remaining_batches(ctx, url_batches, queue_message, added_count), name=f'queue-ingestion-{guild_id}')
+    _queue_ingestion_tasks.setdefault(guild_id, set()).add(task)
+
+async def get_next_queue_entry(guild_id: int):
+    """
+    Get the next queue entry, waiting for it while the rest of a playlist is still being added.
+    Returns None only once the queue is empty and nothing is being added to it anymore.
+    """
+    batch_added = _queue_batch_added.setdefault(guild_id, asyncio.Event())
+    while True:
+        # Both taken before reading the queue: when no ingestion was running the read saw all of its songs, and a
+        # batch added after the read sets the event again
+        tasks = set(_queue_ingestion_tasks.get(guild_id, ()))
+        batch_added.clear()
+        url = await db_utils.get_queue_entry(guild_id)
+        if url or not tasks:
+            return url
+
+        batch_waiter = asyncio.ensure_future(batch_added.wait())
+        try:
+            await asyncio.wait({*tasks, batch_waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            batch_waiter.cancel()
+
+def cancel_queue_ingestion(guild_id: int):
+    _queue_batch_added.pop(guild_id, None)
+    for task in _queue_ingestion_tasks.pop(guild_id, set()):
+        task.cancel()
+
+async def _show_queue_progress(ctx, queue_message, text: str):
+    """Edit the playlist progress embed, or send it if there is none yet. Returns the message."""
+    embed = await embed_generator.create_embed("Queue", text)
+    try:
+        if queue_message:
+            await queue_message.edit(embed=embed)
+            return queue_message
+        try:
+            return await ctx.respond(embed=embed)
+        except:
+            return await ctx.send(embed=embed)
+    except Exception as e:
+        app_logger.error(f"Error updating queue progress message: {e}")
+        return queue_message
+
+async def _ingest_remaining_batches(ctx, url_batches, queue_message, added_count: int):
+    guild_id = ctx.guild.id
+    first_batch_count = added_count
+    last_progress_edit = time.monotonic()
+    try:
+        async for song_urls in url_batches:
+            # Stop if the bot left the channel in the meantime
+            if not await db_utils.guild_exists(guild_id):
+                break
+
+            await db_utils.add_to_queue(guild_id, song_urls)
+            batch_added = _queue_batch_added.get(guild_id)
+            if batch_added:
+                batch_added.set()
+            await track_prefetcher.refresh(guild_id)
+            added_count += len(song_urls)
+
+            if time.monotonic() - last_progress_edit >= QUEUE_PROGRESS_EDIT_INTERVAL:
+                queue_message = await _show_queue_progress(ctx, queue_message, f"Loading playlist... Added **{added_count}** Songs to the Queue so far")
+                last_progress_edit = time.monotonic()
+
+        # The progress embed said the playlist was still loading
+        if queue_message or added_count != first_batch_count:
+            await _show_queue_progress(ctx, queue_message, f"Added **{added_count}** Songs to the Queue")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        app_logger.error(f"Error adding remaining songs to the queue for guild {guild_id}: {e}")
+        if queue_message or added_count != first_batch_count:
+            await _show_queue_progress(ctx, queue_message, f"Added **{added_count}** Songs to the Queue (could not load the rest of the playlist)")
+    finally:
+        await url_batches.aclose()
+        tasks = _queue_ingestion_tasks.get(guild_id)
+        if tasks:
+            tasks.discard(asyncio.current_task())
+            if not tasks:
+                del _queue_ingestion_tasks[guild_id]
+
 @bot.command(name='play', aliases=['p', 'pl', 'play_song', 'add', 'enqueue'])
 async def play_command(ctx, *, query=None):
 
@@ -765,7 +971,10 @@ async def play_command(ctx, *, query=None):
 
     if query is not None:
         try:
-            song_urls = await music_url_getter.get_urls(query)
+            # Large playlists arrive in batches: queue the first one now and the rest in the background
+            is_playlist = await music_url_getter.is_playlist(query)
+            url_batches = music_url_getter.iter_urls(query)
+            song_urls = await anext(url_batches, [])
         except YouTubeError as e:
             if ctx.message:
                 await ctx.send(embed=await embed_generator.create_error_embed("YouTube Playlist Error", str(e)))
@@ -801,10 +1010,10 @@ async def play_command(ctx, *, query=None):
                 await ctx.respond(embed=await embed_generator.create_error_embed("Channel Conflict", error_msg))
             return
 
-    guild = await db_utils.get_guild(ctx.guild.id)
+    guild = await db_utils.get_guild_settings(ctx.guild.id)
     if not guild:
         await db_utils.create_new_guild(ctx.guild.id)
-        guild = await db_utils.get_guild(ctx.guild.id)
+        guild = await db_utils.get_guild_settings(ctx.guild.id)
         # Enhanced voice connection with error handling
         try:
             author_voice = getattr(ctx.author, 'voice', None)
@@ -819,6 +1028,7 @@ async def play_command(ctx, *, query=None):
             await author_voice.channel.connect()
             if hasattr(author_voice.channel, 'name'):
                 app_logger.info(f"Successfully connected to voice channel: {author_voice.channel.name}")
+            await db_utils.set_guild_channels(ctx.guild.id, author_voice.channel.id, getattr(ctx.channel, 'id', None))
 
         except discord.errors.ClientException as e:
             error_msg = "Failed to connect to voice channel. The bot might already be connected elsewhere."
@@ -840,14 +1050,20 @@ async def play_command(ctx, *, query=None):
         
     isQueueEmpty = (await db_utils.get_queue_total_entries(ctx.guild.id)) == 0
     await db_utils.add_to_queue(ctx.guild.id, song_urls)
+    await track_prefetcher.refresh(ctx.guild.id)
     
     queue_length = len(song_urls)
-    if queue_length > 1:
+    queue_message = None
+    # The first batch of a playlist may hold a single song, the progress embed still shows up right away
+    if is_playlist or queue_length > 1:
         if ctx.message:
-            await ctx.send(embed=await embed_generator.create_embed("Queue", f"Added **{queue_length}** Songs to the Queue"))
+            queue_message = await ctx.send(embed=await embed_generator.create_embed("Queue", f"Loading playlist... Added **{queue_length}** Songs to the Queue so far"))
         else:
-            await ctx.respond(embed=await embed_generator.create_embed("Queue", f"Added **{queue_length}** Songs to the Queue"))
+            queue_message = await ctx.respond(embed=await embed_generator.create_embed("Queue", f"Loading playlist... Added **{queue_length}** Songs to the Queue so far"))
+
+    start_queue_ingestion(ctx, url_batches, queue_message, queue_length)
 
+    if queue_message:
         if not isQueueEmpty:
             return
         
@@ -861,16 +1077,27 @@ async def play_command(ctx, *, query=None):
                 await ctx.send(embed=await embed_generator.create_success_embed("📥 Added", "Added to the queue"))
 
         return
-    
+
+    await run_play_loop(ctx)
+
+async def run_play_loop(ctx):
+    """Play the guild's queue until it is empty, then leave the voice channel"""
+    shutting_down = False
+    track_prefetcher.start(ctx.guild.id)
     try:
         while True:
-            url = await db_utils.get_queue_entry(ctx.guild.id)
+            # An empty queue only ends playback once the playlist that is being added is complete
+            url = await get_next_queue_entry(ctx.guild.id)
 
             if not url:
                 break
 
+            # Use the background resolution of this song if there is one, and start on the next
+            music_information = await track_prefetcher.take(ctx.guild.id, url)
+            await track_prefetcher.prefetch_next(ctx.guild.id)
+
             try:
-                await player.play(ctx, url)
+                await player.play(ctx, url, music_information)
             except Exception as e:
                 app_logger.error(f"Error playing song {url}: {e}")
                 # Send error message to user and continue with next song
@@ -884,22 +1111,30 @@ async def play_command(ctx, *, query=None):
                     app_logger.error(f"Failed to send error message: {send_error}")
                 continue  # Continue to next song instead of breaking
                 
+    except asyncio.CancelledError:
+        # The bot is shutting down: keep the queue so it can be resumed after the restart
+        shutting_down = True
+        raise
     except Exception as e:
         app_logger.critical(f"Critical error in play loop: {e}")
     finally:
         # Always cleanup, even if there was an error
-        voice_client = discord.utils.get(bot.voice_clients, guild=ctx.guild)
-        
-        if voice_client and hasattr(voice_client, 'disconnect'):
+        track_prefetcher.stop(ctx.guild.id)
+        cancel_queue_ingestion(ctx.guild.id)
+
+        if not shutting_down:
+            voice_client = discord.utils.get(bot.voice_clients, guild=ctx.guild)
+            
+            if voice_client and hasattr(voice_client, 'disconnect'):
+                try:
+                    await voice_client.disconnect()  # type: ignore
+                except Exception as e:
+                    app_logger.error(f"Error disconnecting voice client: {e}")
+                
             try:
-                await voice_client.disconnect()  # type: ignore
+                await db_utils.delete_guild(ctx.guild.id)
             except Exception as e:
-                app_logger.error(f"Error disconnecting voice client: {e}")
-            
-        try:
-            await db_utils.delete_guild(ctx.guild.id)
-        except Exception as e:
-            app_logger.error(f"Error cleaning up guild data: {e}")
+                app_logger.error(f"Error cleaning up guild data: {e}")
             
 @bot.command(name="information", aliases=['ver', 'version'])
 async def information(ctx):
@@ -1169,7 +1404,7 @@ async def earrape_slash(ctx):
 async def bot_status(ctx):
     try:
         voice_client = discord.utils.get(bot.voice_clients, guild=ctx.guild)
-        guild = await db_utils.get_guild(ctx.guild.id)
+        guild = await db_utils.get_guild_settings(ctx.guild.id)
         
         status_embed = discord.Embed(
             title="🎵 Bot Status",
@@ -1198,8 +1433,8 @@ async def bot_status(ctx):
         
         # Queue information
         if guild:
-            queue_count = len([entry for entry in guild.queue if not entry.already_played])
-            total_queue = len(guild.queue)
+            queue_count = await db_utils.get_queue_remaining_entries(ctx.guild.id)
+            total_queue = await db_utils.get_queue_total_entries(ctx.guild.id)
             
             status_embed.add_field(
                 name="📝 Queue", 
@@ -1238,6 +1473,13 @@ async def bot_status(ctx):
           # Server info
         latency = round(bot.latency * 1000)
         status_embed.add_field(name="📡 Latency", value=f"{latency}ms", inline=True)
+
+        extraction_stats = extraction_pool.get_stats()
+        status_embed.add_field(
+            name="⚙️ Song Lookups",
+            value=f"{extraction_stats['running']} running / {extraction_stats['queued']} waiting",
+            inline=True
+        )
         
         status_embed.set_footer(text=get_full_version_info())
         
@@ -1260,15 +1502,16 @@ async def bot_status(ctx):
 async def queue(ctx):
     try:
         guild = await db_utils.get_guild(ctx.guild.id)
-        if not guild or not guild.queue:
+        if not guild or await guild.queue.count() == 0:
             embed = discord.Embed(
                 title="🎶 Queue",
                 description="The queue is currently empty.",
                 color=0x282841
             )
         else:
-            queue_entries = [entry for entry in guild.queue if not getattr(entry, 'already_played', False)]
-            now_playing = next((entry for entry in guild.queue if getattr(entry, 'already_played', False)), None)
+            queue_entries = await guild.queue.upcoming(10)
+            remaining_entries = await guild.queue.remaining()
+            now_playing = next(iter(await guild.queue.page(limit=1, already_played=True)), None)
             embed = discord.Embed(
                 title="🎶 Current Queue",
                 color=0x282841
@@ -1276,14 +1519,14 @@ async def queue(ctx):
             if now_playing:
                 embed.add_field(name="Now Playing", value=f"[{getattr(now_playing, 'title', 'Unknown')}]({getattr(now_playing, 'url', 'N/A')})", inline=False)
             if queue_entries:
-                for idx, entry in enumerate(queue_entries[:10], start=1):
+                for idx, entry in enumerate(queue_entries, start=1):
                     embed.add_field(
                         name=f"#{idx}",
                         value=f"[{getattr(entry, 'title', 'Unknown')}]({getattr(entry, 'url', 'N/A')})",
                         inline=False
                     )
-                if len(queue_entries) > 10:
-                    embed.add_field(name="...", value=f"And {len(queue_entries) - 10} more...", inline=False)
+                if remaining_entries > len(queue_entries):
+                    embed.add_field(name="...", value=f"And {remaining_entries - len(queue_entries)} more...", inline=False)
             else:
                 embed.add_field(name="Up Next", value="No more songs in the queue.", inline=False)
             embed.set_footer(text=get_full_version_info())
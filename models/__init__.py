@@ -6,5 +6,7 @@ Contains data models, DTOs, and mappers
 from .guild_music_information import Guild
 from .music_information import MusicInformation
 from .queue_object import QueueEntry
+from .spotify_track_mapping import SpotifyTrackMapping
+from .track_loudness import TrackLoudness
 
-__all__ = ['Guild', 'MusicInformation', 'QueueEntry']
+__all__ = ['Guild', 'MusicInformation', 'QueueEntry', 'SpotifyTrackMapping', 'TrackLoudness']
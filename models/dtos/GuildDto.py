@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from models.dtos.QueueEntryDto import QueueEntryDto
+from models.dtos.QueueView import QueueView
 
 @dataclass
 class GuildDto:
@@ -7,4 +7,6 @@ class GuildDto:
     loop_queue: bool
     shuffle_queue: bool
     volume: float  # Volume level (0.0 to 1.0)
-    queue: list[QueueEntryDto]
\ No newline at end of file
+    bass_boost: float  # Bass boost level (0.0 to 2.0)
+    earrape: bool
+    queue: QueueView
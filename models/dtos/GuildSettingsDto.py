@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+
+@dataclass
+class GuildSettingsDto:
+    discord_guild_id: int
+    loop_queue: bool
+    shuffle_queue: bool
+    volume: float  # Volume level (0.0 to 1.0)
+    bass_boost: float  # Bass boost level (0.0 to 2.0)
+    earrape: bool
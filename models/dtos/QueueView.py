@@ -0,0 +1,26 @@
+from typing import List, Optional
+from models.dtos.QueueEntryDto import QueueEntryDto
+
+class QueueView:
+    """Read-only view of a guild's queue. Nothing is loaded until one of the methods is awaited."""
+
+    def __init__(self, discord_guild_id: int):
+        self.discord_guild_id = discord_guild_id
+
+    async def count(self) -> int:
+        from db_utils import db_utils
+        return await db_utils.get_queue_total_entries(self.discord_guild_id)
+
+    async def remaining(self) -> int:
+        from db_utils import db_utils
+        return await db_utils.get_queue_remaining_entries(self.discord_guild_id)
+
+    async def page(self, offset: int = 0, limit: int = 10, already_played: Optional[bool] = None) -> List[QueueEntryDto]:
+        """Get up to limit entries in queue order, starting at offset"""
+        from db_utils import db_utils
+        return await db_utils.get_queue_page(self.discord_guild_id, offset, limit, already_played)
+
+    async def upcoming(self, limit: int = 10) -> List[QueueEntryDto]:
+        """Get the next entries in the order they will be played"""
+        from db_utils import db_utils
+        return await db_utils.get_upcoming_queue_entries(self.discord_guild_id, limit)
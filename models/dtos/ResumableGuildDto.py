@@ -0,0 +1,8 @@
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass
+class ResumableGuildDto:
+    discord_guild_id: int
+    voice_channel_id: Optional[int]
+    text_channel_id: Optional[int]
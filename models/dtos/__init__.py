@@ -4,6 +4,9 @@ Contains data transfer objects for clean data exchange
 """
 
 from .GuildDto import GuildDto
+from .GuildSettingsDto import GuildSettingsDto
 from .QueueEntryDto import QueueEntryDto
+from .QueueView import QueueView
+from .ResumableGuildDto import ResumableGuildDto
 
-__all__ = ['GuildDto', 'QueueEntryDto']
+__all__ = ['GuildDto', 'GuildSettingsDto', 'QueueEntryDto', 'QueueView', 'ResumableGuildDto']
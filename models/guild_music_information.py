@@ -8,6 +8,10 @@ class Guild(Model):
     volume = FloatField(default=1.0, null=False)
     bass_boost = FloatField(default=0.0, null=False)
     earrape = BooleanField(default=False, null=False)
+    shuffle_seed = IntegerField(null=True)  # Seed of the current shuffle order of the queue
+    voice_channel_id = IntegerField(null=True)  # Where playback resumes after a restart
+    text_channel_id = IntegerField(null=True)
+    current_entry_id = IntegerField(null=True)  # Queue entry that is playing, replayed after a restart
 
     class Meta:
         database = db
@@ -6,3 +6,5 @@ class MusicInformation:
     song_name: str
     author: str
     image_url: str
+    # Length in seconds, None for live streams and when the source doesn't tell
+    duration: float | None = None
@@ -1,4 +1,4 @@
-from peewee import Model, IntegerField, CharField, BooleanField, ForeignKeyField
+from peewee import Model, IntegerField, CharField, BooleanField, ForeignKeyField, FloatField
 from db_utils.db import db
 from models.guild_music_information import Guild
 
@@ -8,7 +8,18 @@ class QueueEntry(Model):
     url = CharField(null=False)
     already_played = BooleanField(null=False)
     force_play = BooleanField(null=False)
+    position = IntegerField(null=False, default=0)  # Order of the entry within its guild's queue
+    shuffle_key = FloatField(null=False, default=0.0)  # Order of the entry when the queue is shuffled
+    resolved_url = CharField(null=True)  # YouTube URL a Spotify entry was matched to before its turn, played instead of url
 
     class Meta:
         database = db
-        table_name = 'queue_entry'
\ No newline at end of file
+        table_name = 'queue_entry'
+        indexes = (
+            # Next unplayed (force play) entry of a guild in queue order
+            (('guild', 'already_played', 'force_play', 'position'), False),
+            # Next unplayed entry of a guild in shuffle order
+            (('guild', 'already_played', 'force_play', 'shuffle_key'), False),
+            # Whole queue of a guild in queue order
+            (('guild', 'position'), False),
+        )
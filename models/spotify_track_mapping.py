@@ -0,0 +1,11 @@
+from peewee import Model, CharField, FloatField
+from db_utils.db import db
+
+class SpotifyTrackMapping(Model):
+    spotify_track_id = CharField(primary_key=True)
+    youtube_url = CharField(null=False)  # Video spotdl or the YouTube Music search matched the track to
+    matched_at = FloatField(null=False)  # Epoch seconds
+
+    class Meta:
+        database = db
+        table_name = 'spotify_track_mapping'
@@ -0,0 +1,11 @@
+from peewee import Model, CharField, FloatField
+from db_utils.db import db
+
+class TrackLoudness(Model):
+    track_id = CharField(primary_key=True)  # Canonical track ID
+    gain_db = FloatField(null=False)  # Static gain that brings the track to the loudness target
+    measured_at = FloatField(null=False)  # Epoch seconds
+
+    class Meta:
+        database = db
+        table_name = 'track_loudness'
@@ -6,9 +6,15 @@ Contains handlers for different music platforms and content types
 from . import audio_content_type_finder
 from . import music_platform_finder
 from . import music_url_getter
+from . import query_cache
+from . import resolution_cache
+from . import track_identity
 
 __all__ = [
     'audio_content_type_finder',
     'music_platform_finder', 
-    'music_url_getter'
+    'music_url_getter',
+    'query_cache',
+    'resolution_cache',
+    'track_identity'
 ]
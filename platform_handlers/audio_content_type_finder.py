@@ -1,10 +1,95 @@
+import asyncio
+import logging
+
+import aiohttp
+
 from enums.audio_content_type import AudioContentType
 from enums.platform import Platform
-import requests
+from utils import http_client
+from utils.ttl_cache import TTLCache
 
 from urllib.parse import urlparse
 from urllib.parse import parse_qs
 
+logger = logging.getLogger('PianoNicsMusic')
+
+# Bytes requested when the headers do not tell what a URL is
+SNIFF_BYTES = 64
+PROBE_CACHE_TTL = 60 * 60
+PROBE_CACHE_MAX_ENTRIES = 1024
+
+# Content types servers send for any file, which say nothing about the media
+_GENERIC_CONTENT_TYPES = ('', 'application/octet-stream', 'binary/octet-stream', 'application/binary')
+
+# URL -> AudioContentType of generic URLs that were already probed
+_probe_cache = TTLCache(max_entries=PROBE_CACHE_MAX_ENTRIES, default_ttl=PROBE_CACHE_TTL)
+
+_ASF_HEADER_GUID = bytes.fromhex('3026b2758e66cf11a6d900aa0062ce6c')  # WMA, WMV
+
+def _get_content_type_verdict(content_type: str) -> AudioContentType:
+    if "audio" in content_type or "video" in content_type:
+        return AudioContentType.SINGLE_SONG
+    else:
+        return AudioContentType.YT_DLP
+
+def _is_generic_content_type(content_type: str) -> bool:
+    return content_type.split(';')[0].strip().lower() in _GENERIC_CONTENT_TYPES
+
+def _is_media_file(head: bytes) -> bool:
+    """Recognize audio and video files by their first bytes"""
+    return (
+        head.startswith((b'ID3', b'fLaC', b'OggS', b'\x1aE\xdf\xa3', b'.snd', b'#!AMR', b'MThd'))
+        or (head[:4] == b'RIFF' and head[8:12] in (b'WAVE', b'AVI '))
+        or (head[:4] == b'FORM' and head[8:12] in (b'AIFF', b'AIFC'))
+        or head[4:8] == b'ftyp'  # MP4, M4A, MOV
+        or head[:16] == _ASF_HEADER_GUID
+        # MPEG audio or ADTS AAC frame sync, but not a UTF-16 byte order mark
+        or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0 and head[1] not in (0xFE, 0xFF))
+    )
+
+async def _sniff_content_type(query_url: str) -> AudioContentType:
+    """Request only the first bytes of a URL and look at the header and magic bytes"""
+    async with http_client.get_session().get(query_url, headers={'Range': f'bytes=0-{SNIFF_BYTES - 1}'}) as response:
+        content_type = response.headers.get('content-type', '')
+        if not _is_generic_content_type(content_type):
+            return _get_content_type_verdict(content_type)
+
+        # Servers that ignore the range send the whole file, so never read past the sniffed bytes
+        head = b''
+        while len(head) < SNIFF_BYTES:
+            chunk = await response.content.read(SNIFF_BYTES - len(head))
+            if not chunk:
+                break
+            head += chunk
+    return AudioContentType.SINGLE_SONG if _is_media_file(head) else AudioContentType.YT_DLP
+
+async def _probe_content_type(query_url: str) -> AudioContentType:
+    try:
+        async with http_client.get_session().head(query_url, allow_redirects=True) as response:
+            content_type = response.headers.get('content-type', '') if response.ok else ''
+        if not _is_generic_content_type(content_type):
+            return _get_content_type_verdict(content_type)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        # Some servers reject HEAD, the ranged GET below still works for them
+        logger.debug(f"HEAD request failed for {query_url}: {e}")
+
+    return await _sniff_content_type(query_url)
+
+async def _get_generic_content_type(query_url: str) -> AudioContentType:
+    cached_content_type = _probe_cache.get(query_url)
+    if cached_content_type:
+        return cached_content_type
+
+    try:
+        audio_content_type = await _probe_content_type(query_url)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        # yt-dlp gets the URL and reports the actual problem, the verdict is not cached so the next try probes again
+        logger.warning(f"Could not probe {query_url}: {e}")
+        return AudioContentType.YT_DLP
+
+    _probe_cache.set(query_url, audio_content_type)
+    return audio_content_type
+
 async def get_audio_content_type(query_url: str, platform: Platform) -> AudioContentType:
     if platform is Platform.YOUTUBE:
         parse_result = urlparse(query_url)
@@ -47,13 +132,7 @@ async def get_audio_content_type(query_url: str, platform: Platform) -> AudioCon
         return AudioContentType.QUERY
     
     elif platform is Platform.ANYTHING_ELSE:
-        response = requests.get(query_url)
-        contentType = response.headers['content-type']
-
-        if "audio" in contentType or "video" in contentType:
-            return AudioContentType.SINGLE_SONG
-        else:
-            return AudioContentType.YT_DLP
+        return await _get_generic_content_type(query_url)
     
     elif platform is Platform.TIK_TOK:
         return AudioContentType.SINGLE_SONG
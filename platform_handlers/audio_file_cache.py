@@ -0,0 +1,273 @@
+"""
+On-disk cache of frequently played tracks as Ogg Opus files, so they play without any network requests.
+
+Each track is stored as <hash>.opus with a <hash>.json sidecar holding its track ID and song information. The least
+recently played files are evicted once the cache grows past its size limit; the modification time of a file is
+its last play, so the order survives restarts. Files that are playing or prefetched are pinned and not evicted.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from models.music_information import MusicInformation
+from platform_handlers.track_identity import get_canonical_track_id
+from utils import ffmpeg_runner
+
+logger = logging.getLogger('PianoNicsMusic')
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# Plays after which a track is stored
+DEFAULT_MIN_PLAYS = 3
+# Tracks whose plays are counted, the ones counted longest ago are forgotten first
+MAX_COUNTED_TRACKS = 10000
+MAX_CONCURRENT_DOWNLOADS = 1
+DOWNLOAD_TIMEOUT = 600
+# Longer tracks (mixes, full albums) are not stored, a few of them would push most other tracks out of the cache
+MAX_TRACK_SECONDS = 30 * 60
+# FFmpeg stops writing at this size, a file that reaches it is discarded
+MAX_FILE_BYTES = 64 * 1024 * 1024
+OPUS_BITRATE = '128k'
+
+AUDIO_EXTENSION = '.opus'
+SIDECAR_EXTENSION = '.json'
+
+@dataclass
+class _CachedTrack:
+    file_path: str
+    size: int
+    music_information: MusicInformation
+
+_directory: str | None = None
+_max_bytes = DEFAULT_MAX_BYTES
+_min_plays = DEFAULT_MIN_PLAYS
+
+# track ID -> cached file, least recently played first
+_tracks: OrderedDict[str, _CachedTrack] = OrderedDict()
+_total_bytes = 0
+_play_counts: dict[str, int] = {}
+# file path -> number of players and prefetches using it
+_pins: dict[str, int] = {}
+# track ID -> running download
+_downloads: dict[str, asyncio.Task] = {}
+_semaphore = ffmpeg_runner.LoopSemaphore(MAX_CONCURRENT_DOWNLOADS)
+
+_stats = {'hits': 0, 'stored': 0, 'evicted': 0}
+
+def configure(directory: str | None, max_bytes: int = DEFAULT_MAX_BYTES, min_plays: int = DEFAULT_MIN_PLAYS):
+    """Store tracks in a directory, loading the files already in it. Without a directory nothing is cached."""
+    global _directory, _max_bytes, _min_plays, _total_bytes
+    _tracks.clear()
+    _play_counts.clear()
+    _total_bytes = 0
+    _directory = os.path.abspath(directory) if directory else None
+    _max_bytes = max(0, max_bytes)
+    _min_plays = max(1, min_plays)
+    if _directory:
+        os.makedirs(_directory, exist_ok=True)
+        _load_index()
+        _evict()
+
+def is_enabled() -> bool:
+    return _directory is not None
+
+def _paths(track_id: str) -> tuple[str, str]:
+    name = hashlib.sha1(track_id.encode('utf-8')).hexdigest()
+    return os.path.join(_directory, name + AUDIO_EXTENSION), os.path.join(_directory, name + SIDECAR_EXTENSION)
+
+def _remove_files(*paths: str):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Error removing cached audio file {path}: {e}")
+
+def _load_index():
+    global _total_bytes
+    loaded = []
+    for name in os.listdir(_directory):
+        path = os.path.join(_directory, name)
+        if name.endswith('.tmp'):
+            # Left behind by a download that was interrupted
+            _remove_files(path)
+            continue
+        if not name.endswith(SIDECAR_EXTENSION):
+            continue
+
+        audio_path = path[:-len(SIDECAR_EXTENSION)] + AUDIO_EXTENSION
+        try:
+            with open(path, encoding='utf-8') as file:
+                sidecar = json.load(file)
+            stat = os.stat(audio_path)
+            music_information = MusicInformation(audio_path, sidecar['song_name'], sidecar['author'], sidecar['image_url'], sidecar.get('duration'))
+            loaded.append((stat.st_mtime, sidecar['track_id'], _CachedTrack(audio_path, stat.st_size, music_information)))
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Dropping broken cached track {path}: {e}")
+            _remove_files(path, audio_path)
+
+    for _, track_id, cached_track in sorted(loaded, key=lambda item: item[0]):
+        _tracks[track_id] = cached_track
+    _total_bytes = sum(cached_track.size for cached_track in _tracks.values())
+    logger.info(f"Loaded {len(_tracks)} cached tracks ({_total_bytes / 1024 / 1024:.1f} MiB) from {_directory}")
+
+def _evict():
+    global _total_bytes
+    for track_id, cached_track in list(_tracks.items()):
+        if _total_bytes <= _max_bytes:
+            break
+        # A pinned file is about to be opened by FFmpeg, it is evicted once it is unpinned
+        if cached_track.file_path in _pins:
+            continue
+        del _tracks[track_id]
+        _total_bytes -= cached_track.size
+        _stats['evicted'] += 1
+        _remove_files(cached_track.file_path, cached_track.file_path[:-len(AUDIO_EXTENSION)] + SIDECAR_EXTENSION)
+        logger.debug(f"Evicted cached track {track_id}")
+
+def pin(streaming_url: str):
+    """Keep a cached file from being evicted while it is prefetched or playing. Other streaming URLs are ignored."""
+    if is_cached_file(streaming_url):
+        _pins[streaming_url] = _pins.get(streaming_url, 0) + 1
+
+def unpin(streaming_url: str):
+    """Release a pin taken with pin()"""
+    pins = _pins.get(streaming_url)
+    if pins is None:
+        return
+    if pins > 1:
+        _pins[streaming_url] = pins - 1
+        return
+    del _pins[streaming_url]
+    # The cache may have grown past its limit while the file was pinned
+    if _directory is not None:
+        _evict()
+
+def get(query_url: str) -> MusicInformation | None:
+    """Get the song information of a cached track, with the path of its file as streaming URL"""
+    global _total_bytes
+    if _directory is None:
+        return None
+    track_id = get_canonical_track_id(query_url)
+    cached_track = _tracks.get(track_id)
+    if cached_track is None:
+        return None
+    if not os.path.exists(cached_track.file_path):
+        del _tracks[track_id]
+        _total_bytes -= cached_track.size
+        return None
+
+    _tracks.move_to_end(track_id)
+    try:
+        os.utime(cached_track.file_path)
+    except OSError:
+        pass
+    _stats['hits'] += 1
+    return cached_track.music_information
+
+def is_cached_file(streaming_url: str) -> bool:
+    return _directory is not None and os.path.dirname(streaming_url) == _directory and streaming_url.endswith(AUDIO_EXTENSION)
+
+def record_play(query_url: str, music_information: MusicInformation, is_opus: bool = False):
+    """
+    Count a play of a track, and store it in the background once it was played often enough.
+    Pass is_opus when the stream already is Opus, so it is copied instead of encoded.
+    Live streams, streams of unknown length and tracks longer than MAX_TRACK_SECONDS are not stored.
+    """
+    if _directory is None or is_cached_file(music_information.streaming_url):
+        return
+    if music_information.duration is None or music_information.duration > MAX_TRACK_SECONDS:
+        return
+    track_id = get_canonical_track_id(query_url)
+    if track_id in _tracks:
+        return
+
+    play_count = _play_counts.pop(track_id, 0) + 1
+    _play_counts[track_id] = play_count
+    while len(_play_counts) > MAX_COUNTED_TRACKS:
+        del _play_counts[next(iter(_play_counts))]
+
+    if play_count < _min_plays:
+        return
+    task = _downloads.get(track_id)
+    if task and not task.done():
+        return
+    _downloads[track_id] = asyncio.create_task(_store(track_id, music_information, is_opus), name=f'audio-cache-{track_id}')
+
+async def _download(streaming_url: str, output_path: str, is_opus: bool) -> bool:
+    """Write a stream to an Ogg Opus file, copying the audio when it already is Opus"""
+    codec_options = ['-c:a', 'copy'] if is_opus else ['-c:a', 'libopus', '-b:a', OPUS_BITRATE, '-ar', '48000', '-ac', '2']
+    returncode, output = await ffmpeg_runner.run([
+        '-hide_banner', '-nostats', '-loglevel', 'error', *ffmpeg_runner.get_reconnect_options(streaming_url),
+        '-i', streaming_url, '-vn', '-map_metadata', '-1', *codec_options, '-fs', str(MAX_FILE_BYTES), '-f', 'ogg', '-y', output_path,
+    ], DOWNLOAD_TIMEOUT)
+    if returncode != 0:
+        logger.debug(f"Storing {streaming_url} failed: {output.strip()}")
+        return False
+    return True
+
+async def _store(track_id: str, music_information: MusicInformation, is_opus: bool):
+    global _total_bytes
+    audio_path, sidecar_path = _paths(track_id)
+    temporary_path = f"{audio_path}.tmp"
+    try:
+        async with _semaphore.get():
+            stored = await _download(music_information.streaming_url, temporary_path, is_opus)
+        if not stored or _directory is None:
+            _remove_files(temporary_path)
+            return
+        if os.path.getsize(temporary_path) >= MAX_FILE_BYTES:
+            # Cut off by -fs
+            logger.debug(f"Not caching {track_id}, it is larger than {MAX_FILE_BYTES} bytes")
+            _remove_files(temporary_path)
+            return
+
+        cached_information = MusicInformation(audio_path, music_information.song_name, music_information.author, music_information.image_url, music_information.duration)
+        with open(sidecar_path, 'w', encoding='utf-8') as file:
+            json.dump({
+                'track_id': track_id,
+                'song_name': cached_information.song_name,
+                'author': cached_information.author,
+                'image_url': cached_information.image_url,
+                'duration': cached_information.duration,
+                'stored_at': time.time(),
+            }, file, ensure_ascii=False)
+        # The audio file appears last and complete, so a file next to a sidecar is always playable
+        os.replace(temporary_path, audio_path)
+
+        size = os.path.getsize(audio_path)
+        _tracks[track_id] = _CachedTrack(audio_path, size, cached_information)
+        _total_bytes += size
+        _play_counts.pop(track_id, None)
+        _stats['stored'] += 1
+        logger.info(f"Cached {music_information.song_name} ({size / 1024 / 1024:.1f} MiB)")
+        _evict()
+    except asyncio.CancelledError:
+        _remove_files(temporary_path)
+        raise
+    except Exception as e:
+        logger.error(f"Error caching track {track_id}: {e}")
+        _remove_files(temporary_path, sidecar_path)
+    finally:
+        if _downloads.get(track_id) is asyncio.current_task():
+            del _downloads[track_id]
+
+def stop():
+    """Cancel all running downloads"""
+    for task in _downloads.values():
+        task.cancel()
+    _downloads.clear()
+
+def get_stats() -> dict:
+    return {
+        'tracks': len(_tracks),
+        'bytes': _total_bytes,
+        'downloading': len(_downloads),
+        'pinned': len(_pins),
+        **_stats,
+    }
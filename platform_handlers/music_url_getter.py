@@ -1,29 +1,51 @@
-from typing import List
+from typing import AsyncIterator, List
 from urllib.parse import urlparse, parse_qs
 
-from bs4 import BeautifulSoup
-import requests
-import ddl_retrievers.spotify_ddl_retriever
-import ddl_retrievers.tiktok_ddl_retriever
-import ddl_retrievers.universal_ddl_retriever
 from models.music_information import MusicInformation
 import ddl_retrievers
 from platform_handlers.audio_content_type_finder import get_audio_content_type
 from platform_handlers.music_platform_finder import find_platform
 from enums.audio_content_type import AudioContentType
 from enums.platform import Platform
-import yt_dlp
-import ytmusicapi
 from ddl_retrievers.universal_ddl_retriever import YouTubeError
+from utils import extraction_pool, http_client
+from platform_handlers import audio_file_cache, resolution_cache, query_cache
 
-from spotipy import SpotifyClientCredentials
-import spotipy
+from platform_handlers import spotify_playlist_expander
 import os
 import logging
 
 logger = logging.getLogger('PianoNicsMusic')
 
+# Number of playlist entries added to the queue at a time while a playlist is still being listed
+PLAYLIST_BATCH_SIZE = 50
+
+FLAT_YDL_OPTS = {
+    'extract_flat': True,
+    'quiet': True,
+    'skip_download': True,
+}
+SEARCH_YDL_OPTS = {
+    'quiet': True,
+    'skip_download': True,
+    'noplaylist': True,
+}
+
 async def get_streaming_url(query_url: str) -> MusicInformation:
+    # Tracks stored on disk play without resolving or streaming them
+    stored_music_information = audio_file_cache.get(query_url)
+    if stored_music_information:
+        return stored_music_information
+
+    cached_music_information = resolution_cache.get(query_url)
+    if cached_music_information:
+        return cached_music_information
+
+    music_information = await _resolve_streaming_url(query_url)
+    resolution_cache.store(query_url, music_information)
+    return music_information
+
+async def _resolve_streaming_url(query_url: str) -> MusicInformation:
     platform = await find_platform(query_url)
 
     try:
@@ -39,9 +61,10 @@ async def get_streaming_url(query_url: str) -> MusicInformation:
             subdomain = parsed_url.hostname.split('.')[0]
 
             if "api" in subdomain:
-                response = requests.get(f"https://w.soundcloud.com/player/?url={query_url}")
-                html_content = response.text
+                async with http_client.get_session().get("https://w.soundcloud.com/player/", params={'url': query_url}) as response:
+                    html_content = await response.text()
 
+                from bs4 import BeautifulSoup
                 soup = BeautifulSoup(html_content, 'html.parser')
 
                 canonical_link = soup.find('link', rel='canonical')
@@ -73,10 +96,85 @@ async def get_streaming_url(query_url: str) -> MusicInformation:
             logger.error(f"Error getting streaming URL for {query_url}: {e}")
         raise e
 
+def _get_spotify_id(query: str) -> str:
+    parse_result = urlparse(query)
+    path = parse_result.path
+    path_segments = path.strip("/").split("/")
+    return path_segments[-1]
+
+def _is_spotify_collection(platform: Platform, audio_content_type: AudioContentType) -> bool:
+    return platform is Platform.SPOTIFY and (audio_content_type is AudioContentType.PLAYLIST or audio_content_type is AudioContentType.ALBUM)
+
+def _is_listed_playlist(platform: Platform, audio_content_type: AudioContentType) -> bool:
+    return platform is not Platform.SPOTIFY and (audio_content_type is AudioContentType.PLAYLIST or audio_content_type is AudioContentType.RADIO)
+
+async def is_playlist(query: str) -> bool:
+    """Whether iter_urls lists a playlist, album or radio for a query, however many songs its first batch holds"""
+    platform = await find_platform(query)
+    audio_content_type = await get_audio_content_type(query, platform)
+    return _is_spotify_collection(platform, audio_content_type) or _is_listed_playlist(platform, audio_content_type)
+
+async def iter_urls(query: str) -> AsyncIterator[List[str]]:
+    """Yield the song URLs for a query in batches, so playback can start before a large playlist is fully listed"""
+    platform = await find_platform(query)
+    audio_content_type = await get_audio_content_type(query, platform)
+
+    if _is_spotify_collection(platform, audio_content_type):
+        async for batch in spotify_playlist_expander.iter_track_url_batches(audio_content_type, _get_spotify_id(query)):
+            yield batch
+    elif _is_listed_playlist(platform, audio_content_type):
+        async for batch in _iter_playlist_urls(query, platform):
+            yield batch
+    else:
+        yield await _get_urls(query, platform, audio_content_type)
+
+async def _iter_playlist_urls(query: str, platform: Platform) -> AsyncIterator[List[str]]:
+    # Format YouTube playlist URLs to use proper playlist format
+    if platform is Platform.YOUTUBE:
+        parsed_url = urlparse(query)
+        query_params = parse_qs(parsed_url.query)
+        if 'list' in query_params:
+            playlist_id = query_params['list'][0]
+            query = f"https://www.youtube.com/playlist?list={playlist_id}"
+    
+    try:
+        async for entries in extraction_pool.iter_entries(query, FLAT_YDL_OPTS, batch_size=PLAYLIST_BATCH_SIZE):
+            yield [entry['url'] for entry in entries if entry.get('url')]
+
+    except Exception as e:
+        # yt-dlp is already loaded by the listing that raised
+        import yt_dlp
+        error_message = str(e)
+        if isinstance(e, yt_dlp.DownloadError) and "This playlist type is unviewable" in error_message:
+            raise YouTubeError("This playlist type is unviewable. This often happens with auto-generated YouTube topic playlists. Please try a different playlist or individual songs.")
+        else:
+            raise e
+
+async def _search_query(query: str) -> str | None:
+    """Find the URL of the best match for a text query. Returns None if the searches found nothing and raises if they failed."""
+    # Try YouTube Music first
+    ytmusic_error = None
+    try:
+        search_results = await extraction_pool.search_ytmusic(query, filter="songs")
+        if search_results:
+            return f"https://music.youtube.com/watch?v={search_results[0]['videoId']}"
+    except Exception as e:
+        ytmusic_error = e
+
+    # Fall back to regular YouTube search
+    search_results = await extraction_pool.extract_info(f"ytsearch:{query}", SEARCH_YDL_OPTS)
+    if search_results and search_results.get("entries"):
+        return f"https://www.youtube.com/watch?v={search_results['entries'][0]['id']}"
+    if ytmusic_error:
+        raise ytmusic_error
+    return None
+
 async def get_urls(query: str) -> List[str]:
     platform = await find_platform(query)
     audio_content_type = await get_audio_content_type(query, platform)
+    return await _get_urls(query, platform, audio_content_type)
 
+async def _get_urls(query: str, platform: Platform, audio_content_type: AudioContentType) -> List[str]:
     if audio_content_type is AudioContentType.NOT_SUPPORTED:
         return []
     
@@ -85,103 +183,49 @@ async def get_urls(query: str) -> List[str]:
         return [query]
     
     elif audio_content_type is AudioContentType.QUERY:
-        # Try YouTube Music first
+        cached_url = query_cache.get(query)
+        if cached_url is not None:
+            return [cached_url] if cached_url else []
+
         try:
-            yt = ytmusicapi.YTMusic()
-            search_results = yt.search(query, filter="songs")
-            if search_results and len(search_results) > 0:
-                video_id = search_results[0]["videoId"]
-                yt_music_url = f"https://music.youtube.com/watch?v={video_id}"
-                return [yt_music_url]
-            else:
-                raise Exception("No results found on YouTube Music")
+            url = await _search_query(query)
         except Exception:
-            # Fall back to regular YouTube search
-            try:
-                ydl_opts = {
-                    'quiet': True,
-                    'skip_download': True,
-                    'noplaylist': True,
-                }
-
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    search_results = ydl.extract_info(f"ytsearch:{query}", download=False)
-                    if search_results and "entries" in search_results and len(search_results["entries"]) > 0:
-                        video_url = f"https://www.youtube.com/watch?v={search_results['entries'][0]['id']}"
-                        return [video_url]
-                    else:
-                        raise Exception("No results found on YouTube")
-            except Exception:
-                logger.warning(f"Could not find: {query}")
-                return []
+            # Failed searches are not cached, so the next request searches again
+            logger.warning(f"Could not find: {query}")
+            return []
+
+        query_cache.store(query, url)
+        if not url:
+            logger.warning(f"Could not find: {query}")
+            return []
+        return [url]
     
     elif audio_content_type is AudioContentType.SINGLE_SONG:
         return [query]
     
     # Spotify
     elif (audio_content_type is AudioContentType.PLAYLIST or audio_content_type is AudioContentType.ALBUM) and platform is Platform.SPOTIFY:
-        client_credentials_manager = SpotifyClientCredentials(client_id=os.getenv('SPOTIFY_CLIENT_ID'), client_secret=os.getenv('SPOTIFY_CLIENT_SECRET'))
-        sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
-
-        parse_result = urlparse(query)
-        path = parse_result.path
-        path_segments = path.strip("/").split("/")
-        playlist_or_album_id = path_segments[-1]
-
-        if audio_content_type is AudioContentType.PLAYLIST:
-            playlist_or_album = sp.playlist(playlist_or_album_id)
-            return [item['track']['external_urls']['spotify'] for item in playlist_or_album['tracks']['items']]
-
-        elif audio_content_type is AudioContentType.ALBUM:
-            playlist_or_album = sp.album(playlist_or_album_id)
-            return [item['external_urls']['spotify'] for item in playlist_or_album['tracks']['items']]
-
-        else:
-            raise NotImplementedError("This type of Spotify content is not implemented.")
+        track_urls = []
+        async for batch in spotify_playlist_expander.iter_track_url_batches(audio_content_type, _get_spotify_id(query)):
+            track_urls.extend(batch)
+        return track_urls
 
     # Soundcloud and Youtube
-    elif (audio_content_type is AudioContentType.PLAYLIST or audio_content_type is AudioContentType.RADIO) and platform != Platform.SPOTIFY:        # Format YouTube playlist URLs to use proper playlist format
-        if platform is Platform.YOUTUBE:
-            parsed_url = urlparse(query)
-            query_params = parse_qs(parsed_url.query)
-            if 'list' in query_params:
-                playlist_id = query_params['list'][0]
-                query = f"https://www.youtube.com/playlist?list={playlist_id}"
-        
-        ydl_opts = {
-            'extract_flat': True,
-            'quiet': True,
-            'skip_download': True,
-        }
-
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                playlist_info = ydl.extract_info(query)
-                return [entry['url'] for entry in playlist_info['entries']]
-            
-        except yt_dlp.DownloadError as e:
-            error_message = str(e)
-            if "This playlist type is unviewable" in error_message:
-                raise YouTubeError("This playlist type is unviewable. This often happens with auto-generated YouTube topic playlists. Please try a different playlist or individual songs.")
-            else:
-                raise e
+    elif (audio_content_type is AudioContentType.PLAYLIST or audio_content_type is AudioContentType.RADIO) and platform != Platform.SPOTIFY:
+        playlist_urls = []
+        async for batch in _iter_playlist_urls(query, platform):
+            playlist_urls.extend(batch)
+        return playlist_urls
 
     # Anything else
     elif audio_content_type is AudioContentType.YT_DLP:
-        ydl_opts = {
-            'extract_flat': True,
-            'quiet': True,
-            'skip_download': True,
-        }
-
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            playlist_info = ydl.extract_info(query)
-            entries = playlist_info.get("entries", None)
-
-            if entries:
-                return [entry['url'] for entry in entries]
-            else:
-                return [query]    
+        playlist_info = await extraction_pool.extract_info(query, FLAT_YDL_OPTS)
+        entries = playlist_info.get("entries", None)
+
+        if entries:
+            return [entry['url'] for entry in entries]
+        else:
+            return [query]    
 
     else:
         raise NotImplementedError("This type of Audio Content is not implemented.")
@@ -0,0 +1,90 @@
+"""
+Cache of text search queries to the URL of the song they found, including searches that found nothing
+"""
+import json
+import logging
+import os
+import re
+import unicodedata
+
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger('PianoNicsMusic')
+
+# Search results of a song rarely change, a query that found nothing is retried sooner
+DEFAULT_TTL = 24 * 60 * 60
+NO_RESULTS_TTL = 10 * 60
+MAX_ENTRIES = 10000
+
+# Cached for queries that found nothing
+NO_RESULTS = ''
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+_cache = TTLCache(max_entries=MAX_ENTRIES, default_ttl=DEFAULT_TTL)
+
+def normalize_query(query: str) -> str:
+    """Make queries that only differ in case, width or spacing share one cache entry"""
+    return _WHITESPACE_PATTERN.sub(' ', unicodedata.normalize('NFKC', query)).strip().casefold()
+
+def get(query: str) -> str | None:
+    """Get the cached URL for a query, NO_RESULTS if the last search found nothing, or None if it is not cached"""
+    return _cache.get(normalize_query(query))
+
+def store(query: str, url: str | None):
+    """Cache the URL a query found, or None when it found nothing"""
+    if url:
+        _cache.set(normalize_query(query), url)
+    else:
+        _cache.set(normalize_query(query), NO_RESULTS, ttl=NO_RESULTS_TTL)
+
+def clear():
+    _cache.clear()
+
+def get_stats() -> dict:
+    return _cache.get_stats()
+
+def _is_valid_entry(entry) -> bool:
+    if not isinstance(entry, list) or len(entry) != 3:
+        return False
+    query, url, expires_at = entry
+    return isinstance(query, str) and isinstance(url, str) and isinstance(expires_at, (int, float)) and not isinstance(expires_at, bool)
+
+def load(path: str):
+    """Load entries saved by save(), skipping the ones that expired in the meantime"""
+    try:
+        with open(path, encoding='utf-8') as file:
+            entries = json.load(file)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        logger.error(f"Error loading query cache from {path}: {e}")
+        return
+    if not isinstance(entries, list):
+        logger.error(f"Error loading query cache from {path}: expected a list of entries")
+        return
+
+    # A damaged file must not keep the bot from starting, broken entries are left out
+    invalid_entries = 0
+    for entry in entries:
+        if not _is_valid_entry(entry):
+            invalid_entries += 1
+            continue
+        query, url, expires_at = entry
+        _cache.set(query, url, expires_at=expires_at)
+    if invalid_entries:
+        logger.warning(f"Skipped {invalid_entries} invalid entries in the query cache at {path}")
+    logger.info(f"Loaded {len(_cache)} cached search queries from {path}")
+
+def save(path: str):
+    """Write the live entries to a JSON file"""
+    entries = [[query, url, expires_at] for query, url, expires_at in _cache.items()]
+    temporary_path = f"{path}.tmp"
+    try:
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(entries, file, ensure_ascii=False)
+        # A crash while writing never leaves a truncated cache file behind
+        os.replace(temporary_path, path)
+        logger.info(f"Saved {len(entries)} cached search queries to {path}")
+    except OSError as e:
+        logger.error(f"Error saving query cache to {path}: {e}")
@@ -0,0 +1,66 @@
+"""
+Cache of resolved MusicInformation, keyed by canonical track ID
+"""
+import logging
+import re
+import time
+from urllib.parse import urlsplit, parse_qs
+
+from models.music_information import MusicInformation
+from platform_handlers.track_identity import get_canonical_track_id
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger('PianoNicsMusic')
+
+# Signed stream URLs are dropped this many seconds before they actually expire
+EXPIRY_SAFETY_MARGIN = 300
+# Used when the stream URL does not carry an expiry
+DEFAULT_TTL = 30 * 60
+MAX_ENTRIES = 5000
+MAX_BYTES = 16 * 1024 * 1024
+
+_EXPIRE_PATH_PATTERN = re.compile(r'/expire/(\d+)')
+
+def _size_of(music_information: MusicInformation) -> int:
+    # Rough footprint: the strings dominate, plus a fixed overhead for the dataclass and cache entry
+    return 256 + sum(len(value or "") for value in (
+        music_information.streaming_url,
+        music_information.song_name,
+        music_information.author,
+        music_information.image_url,
+    ))
+
+_cache = TTLCache(max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, default_ttl=DEFAULT_TTL, size_of=_size_of)
+
+def get_expiry(streaming_url: str) -> float:
+    """Get the epoch time after which a streaming URL should no longer be used"""
+    try:
+        split_url = urlsplit(streaming_url)
+        expire = parse_qs(split_url.query).get("expire", [None])[0]
+        if expire is None:
+            match = _EXPIRE_PATH_PATTERN.search(split_url.path)
+            expire = match.group(1) if match else None
+        if expire is not None:
+            return int(expire) - EXPIRY_SAFETY_MARGIN
+    except (ValueError, TypeError):
+        pass
+    return time.time() + DEFAULT_TTL
+
+def get(query_url: str) -> MusicInformation | None:
+    """Get the cached MusicInformation for a queue URL, if it has not expired"""
+    return _cache.get(get_canonical_track_id(query_url))
+
+def store(query_url: str, music_information: MusicInformation):
+    """Cache MusicInformation for a queue URL until its stream URL expires"""
+    if not isinstance(music_information, MusicInformation) or not music_information.streaming_url:
+        return
+    _cache.set(get_canonical_track_id(query_url), music_information, expires_at=get_expiry(music_information.streaming_url))
+
+def invalidate(query_url: str):
+    _cache.delete(get_canonical_track_id(query_url))
+
+def clear():
+    _cache.clear()
+
+def get_stats() -> dict:
+    return _cache.get_stats()
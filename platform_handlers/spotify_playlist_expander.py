@@ -0,0 +1,107 @@
+"""
+Expands Spotify playlists and albums into track URLs, page by page
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, AsyncIterator, List
+
+from enums.audio_content_type import AudioContentType
+from utils import extraction_pool
+
+logger = logging.getLogger('PianoNicsMusic')
+
+PLAYLIST_PAGE_SIZE = 100
+ALBUM_PAGE_SIZE = 50
+MAX_CONCURRENT_PAGES = 4
+# A page that fails is requested again before it is skipped
+PAGE_ATTEMPTS = 2
+
+_PLAYLIST_FIELDS = 'total,items(track(external_urls(spotify)))'
+
+if TYPE_CHECKING:
+    import spotipy
+
+_client: 'spotipy.Spotify | None' = None
+_client_lock = threading.Lock()
+
+def get_client() -> 'spotipy.Spotify':
+    """Get the shared Spotify client. The access token is cached in memory and refreshed by spotipy when it expires."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            # Imported on first use to keep spotipy out of startup
+            import spotipy
+            from spotipy import SpotifyClientCredentials
+            from spotipy.cache_handler import MemoryCacheHandler
+
+            client_credentials_manager = SpotifyClientCredentials(
+                client_id=os.getenv('SPOTIFY_CLIENT_ID'),
+                client_secret=os.getenv('SPOTIFY_CLIENT_SECRET'),
+                cache_handler=MemoryCacheHandler()
+            )
+            _client = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
+        return _client
+
+def _fetch_page_blocking(audio_content_type: AudioContentType, spotify_id: str, offset: int) -> dict:
+    # Runs on the extraction pool, which also keeps the first import of spotipy off the event loop
+    client = get_client()
+    if audio_content_type is AudioContentType.PLAYLIST:
+        return client.playlist_items(
+            spotify_id, fields=_PLAYLIST_FIELDS, limit=PLAYLIST_PAGE_SIZE, offset=offset, additional_types=('track',)
+        )
+    return client.album_tracks(spotify_id, limit=ALBUM_PAGE_SIZE, offset=offset)
+
+async def _fetch_page(audio_content_type: AudioContentType, spotify_id: str, offset: int) -> dict:
+    return await extraction_pool.run(_fetch_page_blocking, audio_content_type, spotify_id, offset)
+
+def _get_track_urls(audio_content_type: AudioContentType, page: dict) -> List[str]:
+    track_urls = []
+    for item in page.get('items') or []:
+        # Playlist items wrap the track, album items are the track
+        track = item.get('track') if audio_content_type is AudioContentType.PLAYLIST else item
+        # Removed and local tracks have no Spotify URL
+        url = ((track or {}).get('external_urls') or {}).get('spotify')
+        if url:
+            track_urls.append(url)
+    return track_urls
+
+async def iter_track_url_batches(audio_content_type: AudioContentType, spotify_id: str) -> AsyncIterator[List[str]]:
+    """Yield the track URLs of a playlist or album one page at a time, in playlist order.
+
+    The first page is yielded as soon as it arrives, the remaining pages are fetched concurrently. A later page that
+    fails PAGE_ATTEMPTS times is logged and skipped, so the pages after it are still added.
+    """
+    if audio_content_type not in (AudioContentType.PLAYLIST, AudioContentType.ALBUM):
+        raise NotImplementedError("This type of Spotify content is not implemented.")
+
+    page_size = PLAYLIST_PAGE_SIZE if audio_content_type is AudioContentType.PLAYLIST else ALBUM_PAGE_SIZE
+
+    first_page = await _fetch_page(audio_content_type, spotify_id, 0)
+    yield _get_track_urls(audio_content_type, first_page)
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_PAGES)
+
+    async def fetch_bounded(offset: int) -> dict | None:
+        async with semaphore:
+            for attempt in range(1, PAGE_ATTEMPTS + 1):
+                try:
+                    return await _fetch_page(audio_content_type, spotify_id, offset)
+                except Exception as e:
+                    if attempt == PAGE_ATTEMPTS:
+                        logger.error(f"Skipping tracks {offset} to {offset + page_size} of Spotify {audio_content_type.name.lower()} {spotify_id}: {e}")
+                        return None
+
+    total = first_page.get('total') or 0
+    page_tasks = [asyncio.create_task(fetch_bounded(offset)) for offset in range(page_size, total, page_size)]
+    try:
+        for page_task in page_tasks:
+            page = await page_task
+            if page is not None:
+                yield _get_track_urls(audio_content_type, page)
+    finally:
+        for page_task in page_tasks:
+            page_task.cancel()
+        # Collects the outcome of every task, so none is left with an exception that was never retrieved
+        await asyncio.gather(*page_tasks, return_exceptions=True)
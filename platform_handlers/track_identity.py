@@ -0,0 +1,32 @@
+from urllib.parse import urlsplit, parse_qs
+
+_YOUTUBE_PATH_PREFIXES = ('shorts', 'embed', 'live', 'v')
+
+def get_canonical_track_id(url: str) -> str:
+    """Get a stable identifier for a track, so different URLs of the same song share cache entries"""
+    split_url = urlsplit(url.strip())
+    hostname = (split_url.hostname or "").lower()
+    path_segments = [segment for segment in split_url.path.split("/") if segment]
+
+    if not hostname:
+        return url.strip()
+
+    if "youtu.be" in hostname and path_segments:
+        return f"youtube:{path_segments[0]}"
+
+    if "youtube" in hostname:
+        video_id = parse_qs(split_url.query).get("v", [None])[0]
+        if video_id:
+            return f"youtube:{video_id}"
+        if len(path_segments) >= 2 and path_segments[0] in _YOUTUBE_PATH_PREFIXES:
+            return f"youtube:{path_segments[1]}"
+
+    elif "spotify" in hostname and "track" in path_segments:
+        track_index = path_segments.index("track")
+        if track_index + 1 < len(path_segments):
+            return f"spotify:track:{path_segments[track_index + 1]}"
+
+    elif "soundcloud" in hostname and path_segments:
+        return f"soundcloud:{'/'.join(path_segments).lower()}"
+
+    return split_url._replace(fragment="").geturl()
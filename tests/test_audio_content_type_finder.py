@@ -0,0 +1,81 @@
+import unittest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+# db_utils has to be imported before the models, which platform_handlers imports
+import db_utils
+from platform_handlers import audio_content_type_finder
+from enums.audio_content_type import AudioContentType
+from enums.platform import Platform
+from utils import http_client
+
+class TestAudioContentTypeFinder(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        audio_content_type_finder._probe_cache.clear()
+        self.requests = []
+
+        async def song(request):
+            self.requests.append((request.method, request.path))
+            return web.Response(body=b'', content_type='audio/mpeg')
+
+        async def page(request):
+            self.requests.append((request.method, request.path))
+            return web.Response(text='<html></html>', content_type='text/html')
+
+        async def blob(request):
+            self.requests.append((request.method, request.path))
+            # Ignores the range and would send the whole file
+            return web.Response(body=b'ID3' + bytes(1024 * 1024), content_type='application/octet-stream')
+
+        async def no_head(request):
+            self.requests.append((request.method, request.path))
+            if request.method == 'HEAD':
+                raise web.HTTPMethodNotAllowed('HEAD', ['GET'])
+            return web.Response(body=b'OggS' + bytes(60), headers={'Content-Type': 'application/octet-stream'})
+
+        app = web.Application()
+        app.router.add_route('*', '/song', song)
+        app.router.add_route('*', '/page', page)
+        app.router.add_route('*', '/blob', blob)
+        app.router.add_route('*', '/no-head', no_head)
+        self.server = TestServer(app)
+        await self.server.start_server()
+
+    async def asyncTearDown(self):
+        await http_client.close()
+        await self.server.close()
+
+    async def get_type(self, path):
+        return await audio_content_type_finder.get_audio_content_type(str(self.server.make_url(path)), Platform.ANYTHING_ELSE)
+
+    async def test_head_content_type(self):
+        self.assertEqual(await self.get_type('/song'), AudioContentType.SINGLE_SONG)
+        self.assertEqual(await self.get_type('/page'), AudioContentType.YT_DLP)
+        self.assertEqual(self.requests, [('HEAD', '/song'), ('HEAD', '/page')])
+
+    async def test_sniffs_magic_bytes_for_generic_content_type(self):
+        self.assertEqual(await self.get_type('/blob'), AudioContentType.SINGLE_SONG)
+        self.assertEqual(self.requests, [('HEAD', '/blob'), ('GET', '/blob')])
+
+    async def test_falls_back_to_range_get_without_head(self):
+        self.assertEqual(await self.get_type('/no-head'), AudioContentType.SINGLE_SONG)
+
+    async def test_verdict_is_cached(self):
+        await self.get_type('/song')
+        await self.get_type('/song')
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_unreachable_url_is_not_cached(self):
+        url = 'http://127.0.0.1:1/song'
+        result = await audio_content_type_finder.get_audio_content_type(url, Platform.ANYTHING_ELSE)
+        self.assertEqual(result, AudioContentType.YT_DLP)
+        self.assertNotIn(url, audio_content_type_finder._probe_cache)
+
+    def test_is_media_file(self):
+        self.assertTrue(audio_content_type_finder._is_media_file(b'\x00\x00\x00\x20ftypM4A '))
+        self.assertTrue(audio_content_type_finder._is_media_file(b'RIFF\x00\x00\x00\x00WAVEfmt '))
+        self.assertTrue(audio_content_type_finder._is_media_file(b'\xff\xfb\x90\x00'))
+        self.assertFalse(audio_content_type_finder._is_media_file(b'\xff\xfe<\x00h\x00'))
+        self.assertFalse(audio_content_type_finder._is_media_file(b'<!DOCTYPE html>'))
+
+if __name__ == '__main__':
+    unittest.main()
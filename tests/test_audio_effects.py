@@ -0,0 +1,100 @@
+import unittest
+
+import discord
+import numpy as np
+
+# db_utils has to be imported before the models, which discord_utils imports
+import db_utils
+from discord_utils import audio_effects
+from discord_utils.dynamic_bass_boost import register_bass_boost, set_guild_bass_boost, unregister_bass_boost
+from discord_utils.dynamic_earrape import register_earrape, set_guild_earrape, unregister_earrape
+
+GUILD_ID = 1234
+
+def sine_frames(frequency: float, frames: int, amplitude: int = 8000) -> list[bytes]:
+    time = np.arange(audio_effects.FRAME_SAMPLES * frames) / audio_effects.SAMPLE_RATE
+    samples = np.repeat((np.sin(2 * np.pi * frequency * time) * amplitude)[:, None], audio_effects.CHANNELS, axis=1)
+    data = samples.astype(np.int16).tobytes()
+    frame_size = len(data) // frames
+    return [data[i:i + frame_size] for i in range(0, len(data), frame_size)]
+
+def peak(frame: bytes) -> int:
+    return int(np.abs(np.frombuffer(frame, dtype=np.int16)).max())
+
+class FakeSource(discord.AudioSource):
+    def __init__(self, frames: list[bytes]):
+        self.frames = list(frames)
+        self.cleaned_up = False
+
+    def read(self) -> bytes:
+        return self.frames.pop(0) if self.frames else b''
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+class TestAudioEffects(unittest.TestCase):
+    def setUp(self):
+        register_bass_boost(GUILD_ID, 1.0)
+        register_earrape(GUILD_ID, False)
+
+    def tearDown(self):
+        unregister_bass_boost(GUILD_ID)
+        unregister_earrape(GUILD_ID)
+
+    def test_neutral_settings_pass_frames_through(self):
+        frames = sine_frames(60, 3)
+        transformer = audio_effects.AudioEffectsTransformer(FakeSource(frames), GUILD_ID)
+        self.assertEqual([transformer.read() for _ in range(3)], frames)
+        self.assertEqual(transformer.read(), b'')
+
+    def test_bass_change_applies_on_next_frame(self):
+        transformer = audio_effects.AudioEffectsTransformer(FakeSource(sine_frames(60, 20)), GUILD_ID)
+        neutral = transformer.read()
+
+        set_guild_bass_boost(GUILD_ID, 2.0)
+        ramped = transformer.read()
+        self.assertEqual(len(ramped), len(neutral))
+        self.assertGreater(peak(ramped), peak(neutral))
+
+        boosted = [transformer.read() for _ in range(10)][-1]
+        # 60 Hz sits well below the shelf and gets most of the 12 dB boost
+        self.assertGreater(peak(boosted), peak(neutral) * 3)
+
+    def test_bass_leaves_high_frequencies(self):
+        set_guild_bass_boost(GUILD_ID, 2.0)
+        transformer = audio_effects.AudioEffectsTransformer(FakeSource(sine_frames(5000, 10)), GUILD_ID)
+        last_frame = [transformer.read() for _ in range(10)][-1]
+        self.assertAlmostEqual(peak(last_frame), 8000, delta=8000 * 0.05)
+
+    def test_filter_state_carries_across_frames(self):
+        set_guild_bass_boost(GUILD_ID, 0.0)
+        frames = sine_frames(80, 4)
+        transformer = audio_effects.AudioEffectsTransformer(FakeSource(frames), GUILD_ID)
+        # Starting at the cut avoids the ramp, so frame by frame must equal one long block
+        transformer._shelf_gain = audio_effects.bass_level_to_gain(0.0)
+        processed = b''.join(transformer.read() for _ in range(4))
+
+        low_pass = audio_effects._LowPass(frame_samples=audio_effects.FRAME_SAMPLES * 4)
+        samples = np.frombuffer(b''.join(frames), dtype=np.int16).reshape(-1, audio_effects.CHANNELS) / 32768.0
+        expected = samples + (audio_effects.bass_level_to_gain(0.0) - 1.0) * low_pass.process(samples)
+        expected = np.rint(expected * 32768.0).astype(np.int16)
+        np.testing.assert_allclose(np.frombuffer(processed, dtype=np.int16).reshape(-1, 2), expected, atol=1)
+
+    def test_earrape_applies_on_next_frame(self):
+        frames = sine_frames(440, 3, amplitude=2000)
+        transformer = audio_effects.AudioEffectsTransformer(FakeSource(frames), GUILD_ID)
+        self.assertEqual(transformer.read(), frames[0])
+
+        set_guild_earrape(GUILD_ID, True)
+        crushed = np.frombuffer(transformer.read(), dtype=np.int16)
+        self.assertEqual(int(np.abs(crushed).max()), 32767)
+        # Logarithmic 8 bit quantization leaves 128 levels per sign and zero
+        self.assertLessEqual(len(np.unique(crushed)), 2 * 128 + 1)
+
+    def test_cleanup_reaches_original(self):
+        source = FakeSource([])
+        audio_effects.AudioEffectsTransformer(source, GUILD_ID).cleanup()
+        self.assertTrue(source.cleaned_up)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+from unittest.mock import patch, AsyncMock
+import json
+import os
+import tempfile
+# db_utils has to be imported before the models, which platform_handlers imports
+import db_utils
+from models.music_information import MusicInformation
+from platform_handlers import audio_file_cache
+
+STREAMING_URL = 'https://rr3---sn-4g5e6nz7.googlevideo.com/videoplayback?itag=251&mime=audio%2Fwebm'
+
+def music_information(name: str, duration: float | None = 212.0) -> MusicInformation:
+    return MusicInformation(STREAMING_URL, name, 'Author', 'https://i.ytimg.com/vi/abc/hqdefault.jpg', duration)
+
+async def fake_download(streaming_url: str, output_path: str, is_opus: bool) -> bool:
+    with open(output_path, 'wb') as file:
+        file.write(b'OggS' + bytes(96))
+    return True
+
+@patch('platform_handlers.audio_file_cache._download', side_effect=fake_download)
+class TestAudioFileCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        audio_file_cache.configure(self.directory.name, max_bytes=1024 * 1024, min_plays=2)
+
+    def tearDown(self):
+        audio_file_cache.stop()
+        audio_file_cache.configure(None)
+        self.directory.cleanup()
+
+    async def play(self, url: str, name: str = 'Song', duration: float | None = 212.0):
+        audio_file_cache.record_play(url, music_information(name, duration), is_opus=True)
+        task = audio_file_cache._downloads.get(audio_file_cache.get_canonical_track_id(url))
+        if task:
+            await task
+
+    async def test_stored_after_enough_plays(self, mock_download):
+        await self.play('https://youtu.be/abc')
+        mock_download.assert_not_called()
+        self.assertIsNone(audio_file_cache.get('https://www.youtube.com/watch?v=abc'))
+
+        await self.play('https://www.youtube.com/watch?v=abc')
+        mock_download.assert_called_once()
+        self.assertTrue(mock_download.call_args.args[2])
+
+        cached = audio_file_cache.get('https://youtu.be/abc')
+        self.assertEqual(cached.song_name, 'Song')
+        self.assertEqual(cached.duration, 212.0)
+        self.assertTrue(audio_file_cache.is_cached_file(cached.streaming_url))
+        self.assertTrue(os.path.exists(cached.streaming_url))
+        with open(cached.streaming_url[:-len('.opus')] + '.json', encoding='utf-8') as file:
+            self.assertEqual(json.load(file)['track_id'], 'youtube:abc')
+
+    async def test_index_is_loaded_from_disk(self, mock_download):
+        for _ in range(2):
+            await self.play('https://youtu.be/abc')
+        # A download that was interrupted by a restart
+        with open(os.path.join(self.directory.name, 'partial.opus.tmp'), 'wb') as file:
+            file.write(b'OggS')
+
+        audio_file_cache.configure(self.directory.name, max_bytes=1024 * 1024, min_plays=2)
+
+        self.assertEqual(audio_file_cache.get('https://youtu.be/abc').song_name, 'Song')
+        self.assertEqual(audio_file_cache.get('https://youtu.be/abc').duration, 212.0)
+        self.assertEqual(audio_file_cache.get_stats()['tracks'], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, 'partial.opus.tmp')))
+
+    async def test_least_recently_played_is_evicted(self, mock_download):
+        # Room for two files of 100 bytes
+        audio_file_cache.configure(self.directory.name, max_bytes=250, min_plays=1)
+        await self.play('https://youtu.be/a')
+        await self.play('https://youtu.be/b')
+        audio_file_cache.get('https://youtu.be/a')
+
+        await self.play('https://youtu.be/c')
+
+        self.assertIsNotNone(audio_file_cache.get('https://youtu.be/a'))
+        self.assertIsNone(audio_file_cache.get('https://youtu.be/b'))
+        self.assertIsNotNone(audio_file_cache.get('https://youtu.be/c'))
+        self.assertEqual(len(os.listdir(self.directory.name)), 4)
+
+    async def test_pinned_files_are_not_evicted(self, mock_download):
+        audio_file_cache.configure(self.directory.name, max_bytes=250, min_plays=1)
+        await self.play('https://youtu.be/a')
+        await self.play('https://youtu.be/b')
+        # Prefetched, FFmpeg hasn't opened it yet
+        pinned = audio_file_cache.get('https://youtu.be/a')
+        audio_file_cache.pin(pinned.streaming_url)
+        audio_file_cache.get('https://youtu.be/b')
+
+        await self.play('https://youtu.be/c')
+        self.assertTrue(os.path.exists(pinned.streaming_url))
+        self.assertIsNone(audio_file_cache.get('https://youtu.be/b'))
+
+        await self.play('https://youtu.be/d')
+        self.assertTrue(os.path.exists(pinned.streaming_url))
+        self.assertIsNone(audio_file_cache.get('https://youtu.be/c'))
+
+        audio_file_cache.unpin(pinned.streaming_url)
+        await self.play('https://youtu.be/e')
+        self.assertFalse(os.path.exists(pinned.streaming_url))
+
+    async def test_live_and_long_tracks_are_not_stored(self, mock_download):
+        audio_file_cache.configure(self.directory.name, min_plays=1)
+        await self.play('https://youtu.be/live', duration=None)
+        await self.play('https://youtu.be/mix', duration=audio_file_cache.MAX_TRACK_SECONDS + 1)
+        mock_download.assert_not_called()
+
+    async def test_oversized_file_is_discarded(self, mock_download):
+        async def oversized_download(streaming_url: str, output_path: str, is_opus: bool) -> bool:
+            with open(output_path, 'wb') as file:
+                file.truncate(audio_file_cache.MAX_FILE_BYTES)
+            return True
+        mock_download.side_effect = oversized_download
+        audio_file_cache.configure(self.directory.name, min_plays=1)
+        await self.play('https://youtu.be/abc')
+        self.assertIsNone(audio_file_cache.get('https://youtu.be/abc'))
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    async def test_failed_download_leaves_nothing(self, mock_download):
+        mock_download.side_effect = None
+        mock_download.return_value = False
+        for _ in range(2):
+            await self.play('https://youtu.be/abc')
+        self.assertIsNone(audio_file_cache.get('https://youtu.be/abc'))
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    async def test_cached_files_are_not_counted(self, mock_download):
+        audio_file_cache.configure(self.directory.name, min_plays=1)
+        await self.play('https://youtu.be/abc')
+        cached = audio_file_cache.get('https://youtu.be/abc')
+        audio_file_cache.record_play('https://youtu.be/abc', cached)
+        mock_download.assert_called_once()
+
+    async def test_disabled(self, mock_download):
+        audio_file_cache.configure(None)
+        for _ in range(3):
+            await self.play('https://youtu.be/abc')
+        mock_download.assert_not_called()
+        self.assertIsNone(audio_file_cache.get('https://youtu.be/abc'))
+
+    @patch('platform_handlers.music_url_getter._resolve_streaming_url', new_callable=AsyncMock)
+    async def test_cached_track_is_not_resolved(self, mock_resolve, mock_download):
+        from platform_handlers import music_url_getter
+        for _ in range(2):
+            await self.play('https://youtu.be/abc')
+
+        music_information = await music_url_getter.get_streaming_url('https://www.youtube.com/watch?v=abc')
+
+        self.assertTrue(audio_file_cache.is_cached_file(music_information.streaming_url))
+        mock_resolve.assert_not_awaited()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
+import os
+import tempfile
 import unittest
-from db_utils.db import db, setup_db
+from db_utils.db import db, setup_db, _add_missing_columns, FILE_PRAGMAS
 from peewee import SqliteDatabase
 
 class TestDB(unittest.TestCase):
@@ -10,14 +12,23 @@ class TestDB(unittest.TestCase):
     def test_setup_db_runs(self):
         # Patch models and db methods
         import types
-        db.is_connection_usable = lambda: False
-        db.connect = lambda: None
-        db.create_tables = lambda tables, safe: None
+        from unittest.mock import patch
+        # Patched only for this test, later tests still use the real database
+        patches = [
+            patch.object(db, 'is_connection_usable', lambda: False),
+            patch.object(db, 'connect', lambda: None),
+            patch.object(db, 'create_tables', lambda tables, safe: None),
+        ]
+        for db_patch in patches:
+            db_patch.start()
+            self.addCleanup(db_patch.stop)
         # Patch import
         sys_modules_backup = dict(__import__('sys').modules)
         import sys
         sys.modules['models.guild_music_information'] = types.SimpleNamespace(Guild='Guild')
         sys.modules['models.queue_object'] = types.SimpleNamespace(QueueEntry='QueueEntry')
+        sys.modules['models.spotify_track_mapping'] = types.SimpleNamespace(SpotifyTrackMapping='SpotifyTrackMapping')
+        sys.modules['models.track_loudness'] = types.SimpleNamespace(TrackLoudness='TrackLoudness')
         try:
             import asyncio
             asyncio.run(setup_db())
@@ -25,5 +36,23 @@ class TestDB(unittest.TestCase):
             __import__('sys').modules.clear()
             __import__('sys').modules.update(sys_modules_backup)
 
+    def test_add_missing_columns(self):
+        from models.guild_music_information import Guild
+        with tempfile.TemporaryDirectory() as directory:
+            file_db = SqliteDatabase(os.path.join(directory, 'bot.db'), pragmas=FILE_PRAGMAS)
+            # A guilds table from before the newer columns existed
+            file_db.execute_sql('CREATE TABLE guilds (id INTEGER PRIMARY KEY, loop_queue INTEGER NOT NULL, shuffle_queue INTEGER NOT NULL, volume REAL NOT NULL)')
+            file_db.execute_sql('INSERT INTO guilds VALUES (1, 0, 1, 0.5)')
+
+            _add_missing_columns(file_db, [Guild])
+
+            columns = {column.name for column in file_db.get_columns('guilds')}
+            self.assertTrue({'bass_boost', 'earrape', 'voice_channel_id'} <= columns)
+            with file_db.bind_ctx([Guild]):
+                guild = Guild.get_by_id(1)
+            self.assertEqual((guild.shuffle_queue, guild.volume, guild.bass_boost), (True, 0.5, 0.0))
+            self.assertEqual(file_db.execute_sql('PRAGMA journal_mode').fetchone()[0], 'wal')
+            file_db.close()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import unittest
+import uuid
+from peewee import SqliteDatabase
+from db_utils import db_executor
+from models.guild_music_information import Guild
+from models.queue_object import QueueEntry
+
+class TestDBExecutor(unittest.IsolatedAsyncioTestCase):
+    async def test_write_runs_on_one_writer_thread(self):
+        loop_thread = threading.get_ident()
+        writer_threads = await asyncio.gather(*(db_executor.write(threading.get_ident) for _ in range(10)))
+        self.assertNotIn(loop_thread, writer_threads)
+        self.assertEqual(len(set(writer_threads)), 1)
+
+    async def test_write_propagates_errors(self):
+        def fail():
+            raise ValueError('fail')
+        with self.assertRaises(ValueError):
+            await db_executor.write(fail)
+
+    async def test_queued_writes_are_coalesced(self):
+        test_db = SqliteDatabase(f'file:test-{uuid.uuid4().hex}?mode=memory&cache=shared', uri=True)
+        with test_db.bind_ctx([Guild, QueueEntry]):
+            test_db.create_tables([Guild, QueueEntry])
+            release_writer = threading.Event()
+
+            def create_guild(guild_id: int):
+                Guild.create(id=guild_id, loop_queue=False, shuffle_queue=False, volume=1.0)
+
+            batches_before = db_executor.get_stats()['batches']
+            blocker = asyncio.ensure_future(db_executor.write(release_writer.wait))
+            await asyncio.sleep(0.05)
+            writes = [asyncio.ensure_future(db_executor.write(create_guild, guild_id)) for guild_id in (1, 2, 1, 3)]
+            await asyncio.sleep(0.05)
+            release_writer.set()
+            await blocker
+
+            results = await asyncio.gather(*writes, return_exceptions=True)
+            self.assertEqual(db_executor.get_stats()['batches'], batches_before + 1)
+            # The duplicate insert fails on its own, the other writes are committed
+            self.assertIsInstance(results[2], Exception)
+            self.assertEqual(sorted(guild.id for guild in Guild.select()), [1, 2, 3])
+
+    async def test_read_uses_reader_pool(self):
+        db_executor.configure(reader_threads=1)
+        try:
+            writer_thread = await db_executor.write(threading.get_ident)
+            reader_thread = await db_executor.read(threading.get_ident)
+            self.assertNotEqual(writer_thread, reader_thread)
+        finally:
+            db_executor.configure(reader_threads=0)
+
+if __name__ == '__main__':
+    unittest.main()
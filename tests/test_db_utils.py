@@ -1,10 +1,28 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import asyncio
+import random
+import uuid
 from db_utils import db_utils
 from models.dtos.QueueEntryDto import QueueEntryDto
+from models.dtos.GuildSettingsDto import GuildSettingsDto
+from models.dtos.ResumableGuildDto import ResumableGuildDto
+from models.guild_music_information import Guild
+from models.queue_object import QueueEntry
+from models.spotify_track_mapping import SpotifyTrackMapping
+from models.track_loudness import TrackLoudness
+from peewee import SqliteDatabase
+
+def create_test_db() -> SqliteDatabase:
+    # Shared cache, so the test thread and the database writer thread see the same in-memory database
+    return SqliteDatabase(f'file:test-{uuid.uuid4().hex}?mode=memory&cache=shared', uri=True)
 
 class TestDBUtils(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        db_utils._queue_counters.clear()
+        db_utils._guild_settings_cache.clear()
+        db_utils._track_gain_cache.clear()
+
     @patch('db_utils.db_utils.Guild')
     async def test_create_new_guild_success(self, mock_guild):
         mock_guild.create.return_value = None
@@ -33,6 +51,12 @@ class TestDBUtils(unittest.IsolatedAsyncioTestCase):
             self.assertEqual(result, 'dto')
             mock_map.assert_called_once()
 
+    @patch('db_utils.db_utils.Guild')
+    async def test_get_guild_settings(self, mock_guild):
+        mock_guild.get_or_none.return_value = MagicMock(id=123, loop_queue=True, shuffle_queue=False, volume=0.5, bass_boost=1.0, earrape=False)
+        result = await db_utils.get_guild_settings(123)
+        self.assertEqual(result, GuildSettingsDto(discord_guild_id=123, loop_queue=True, shuffle_queue=False, volume=0.5, bass_boost=1.0, earrape=False))
+
     @patch('db_utils.db_utils.Guild')
     async def test_get_guild_not_found(self, mock_guild):
         mock_guild.get_or_none.return_value = None
@@ -48,19 +72,30 @@ class TestDBUtils(unittest.IsolatedAsyncioTestCase):
 
     @patch('db_utils.db_utils.QueueEntry')
     async def test_add_to_queue_bulk(self, mock_queue):
-        await db_utils.add_to_queue(1, ['url1', 'url2'])
-        mock_queue.bulk_create.assert_called_once()
+        mock_queue.insert.return_value.sql.return_value = ('INSERT', [])
+        db_utils._queue_counters[1] = db_utils._QueueCounters(total=3, remaining=1, force_pending=0, next_position=3)
+        positions = await db_utils.add_to_queue(1, ['url1', 'url2'])
+        self.assertEqual(positions, [3, 4])
+        mock_queue._meta.database.cursor.return_value.executemany.assert_called_once()
+        self.assertEqual(db_utils._queue_counters[1], db_utils._QueueCounters(total=5, remaining=3, force_pending=0, next_position=5))
 
     @patch('db_utils.db_utils.QueueEntry')
-    async def test_add_to_queue_individual(self, mock_queue):
-        mock_queue.bulk_create.side_effect = Exception('fail')
-        await db_utils.add_to_queue(1, ['url1'])
-        mock_queue.create.assert_called_once()
+    async def test_add_to_queue_failure(self, mock_queue):
+        mock_queue.insert.return_value.sql.return_value = ('INSERT', [])
+        mock_queue._meta.database.cursor.return_value.executemany.side_effect = Exception('fail')
+        db_utils._queue_counters[1] = db_utils._QueueCounters(total=0, remaining=0, force_pending=0, next_position=0)
+        with self.assertRaises(Exception):
+            await db_utils.add_to_queue(1, ['url1'])
+        # The insert is not retried row by row, and the counters are rebuilt on next use
+        mock_queue.create.assert_not_called()
+        self.assertNotIn(1, db_utils._queue_counters)
 
     @patch('db_utils.db_utils.QueueEntry')
     async def test_add_force_next_play_to_queue(self, mock_queue):
+        db_utils._queue_counters[1] = db_utils._QueueCounters(total=5, remaining=2, force_pending=0, next_position=5)
         await db_utils.add_force_next_play_to_queue(1, 'url')
-        mock_queue.create.assert_called_once_with(guild=1, url='url', already_played=False, force_play=True)
+        mock_queue.create.assert_called_once_with(guild=1, url='url', already_played=False, force_play=True, position=5)
+        self.assertEqual(db_utils._queue_counters[1], db_utils._QueueCounters(total=6, remaining=3, force_pending=1, next_position=6))
 
     @patch('db_utils.db_utils.Guild')
     async def test_delete_guild(self, mock_guild):
@@ -70,9 +105,191 @@ class TestDBUtils(unittest.IsolatedAsyncioTestCase):
     @patch('db_utils.db_utils.QueueEntry')
     async def test_get_queue(self, mock_queue):
         mock_entry = MagicMock(url='url', already_played=False)
-        mock_queue.select.return_value.where.return_value = [mock_entry]
+        mock_queue.select.return_value.where.return_value.order_by.return_value = [mock_entry]
         result = await db_utils.get_queue(1)
         self.assertEqual(result, [QueueEntryDto(url='url', already_played=False)])
 
+    async def test_queue_counters_follow_queue(self):
+        test_db = create_test_db()
+        with test_db.bind_ctx([Guild, QueueEntry]):
+            test_db.create_tables([Guild, QueueEntry])
+            Guild.create(id=1, loop_queue=False, shuffle_queue=False, volume=1.0)
+            await db_utils.add_to_queue(1, ['url1', 'url2'])
+            await db_utils.add_force_next_play_to_queue(1, 'forced')
+            self.assertEqual(await db_utils.get_queue_total_entries(1), 3)
+
+            self.assertEqual(await db_utils.get_queue_entry(1), 'forced')
+            self.assertEqual(await db_utils.get_queue_entry(1), 'url1')
+            self.assertEqual(await db_utils.get_queue_remaining_entries(1), 1)
+            self.assertFalse(await db_utils.is_queue_empty(1))
+
+            # Rebuilding the counters from the table gives the same numbers
+            cached_counters = db_utils._queue_counters.pop(1)
+            self.assertEqual(db_utils._get_queue_counters(1), cached_counters)
+
+            self.assertEqual(await db_utils.get_queue_entry(1), 'url2')
+            self.assertTrue(await db_utils.is_queue_empty(1))
+
+    async def test_shuffle_order_is_stable_and_indexed(self):
+        test_db = create_test_db()
+        with test_db.bind_ctx([Guild, QueueEntry]):
+            test_db.create_tables([Guild, QueueEntry])
+            Guild.create(id=1, loop_queue=False, shuffle_queue=False, volume=1.0)
+            urls = [f'url{index}' for index in range(20)]
+            await db_utils.add_to_queue(1, urls)
+            self.assertTrue(await db_utils.shuffle_playlist(1))
+
+            upcoming = [entry.url for entry in await db_utils.get_upcoming_queue_entries(1, 20)]
+            self.assertCountEqual(upcoming, urls)
+
+            # The shown order is the play order, and peek agrees with it
+            self.assertEqual(await db_utils.peek_queue_entry(1), upcoming[0])
+            self.assertEqual(await db_utils.get_queue_entry(1), upcoming[0])
+            self.assertEqual(await db_utils.get_queue_entry(1), upcoming[1])
+
+            # New entries are spliced into the order without reshuffling the rest
+            await db_utils.add_to_queue(1, ['new'])
+            upcoming_after_add = [entry.url for entry in await db_utils.get_upcoming_queue_entries(1, 20)]
+            self.assertEqual([url for url in upcoming_after_add if url != 'new'], upcoming[2:])
+
+            # The order can be rebuilt from the stored seed
+            seed = Guild.get_by_id(1).shuffle_seed
+            self.assertEqual(QueueEntry.get(QueueEntry.position == 0).shuffle_key, random.Random(seed).random())
+
+    async def test_get_guild_queue_is_lazy(self):
+        test_db = create_test_db()
+        with test_db.bind_ctx([Guild, QueueEntry]):
+            test_db.create_tables([Guild, QueueEntry])
+            Guild.create(id=1, loop_queue=False, shuffle_queue=False, volume=1.0)
+            await db_utils.add_to_queue(1, [f'url{index}' for index in range(30)])
+            await db_utils.get_queue_entry(1)
+
+            with patch.object(QueueEntry, 'select', wraps=QueueEntry.select) as mock_select:
+                guild = await db_utils.get_guild(1)
+                mock_select.assert_not_called()
+
+            self.assertEqual(await guild.queue.count(), 30)
+            self.assertEqual(await guild.queue.remaining(), 29)
+            self.assertEqual([entry.url for entry in await guild.queue.page(offset=10, limit=3)], ['url10', 'url11', 'url12'])
+            self.assertEqual(await guild.queue.page(limit=5, already_played=True), [QueueEntryDto(url='url0', already_played=True)])
+
+    async def test_guild_settings_are_cached_and_written_through(self):
+        test_db = create_test_db()
+        with test_db.bind_ctx([Guild, QueueEntry]):
+            test_db.create_tables([Guild, QueueEntry])
+            await db_utils.create_new_guild(1)
+            self.assertEqual((await db_utils.get_guild_settings(1)).volume, 1.0)
+
+            self.assertTrue(await db_utils.set_volume(1, 0.4))
+            self.assertEqual(await db_utils.adjust_bass_boost(1, 0.2), 0.2)
+            self.assertTrue(await db_utils.toggle_earrape(1))
+            self.assertEqual(Guild.get_by_id(1).volume, 0.4)
+
+            with patch.object(Guild, 'get_or_none', wraps=Guild.get_or_none) as mock_get:
+                settings = await db_utils.get_guild_settings(1)
+                self.assertEqual(await db_utils.get_volume(1), 0.4)
+                mock_get.assert_not_called()
+            self.assertEqual((settings.volume, settings.bass_boost, settings.earrape), (0.4, 0.2, True))
+
+            await db_utils.delete_guild(1)
+            self.assertIsNone(await db_utils.get_guild_settings(1))
+
+    async def test_resume_replays_current_song(self):
+        test_db = create_test_db()
+        with test_db.bind_ctx([Guild, QueueEntry]):
+            test_db.create_tables([Guild, QueueEntry])
+            await db_utils.create_new_guild(1)
+            await db_utils.set_guild_channels(1, 10, 20)
+            await db_utils.add_to_queue(1, ['url1', 'url2'])
+            self.assertEqual(await db_utils.get_queue_entry(1), 'url1')
+
+            # After a restart nothing is cached, and the interrupted song plays first
+            db_utils._queue_counters.clear()
+            db_utils._guild_settings_cache.clear()
+            self.assertEqual(await db_utils.get_resumable_guilds(), [ResumableGuildDto(discord_guild_id=1, voice_channel_id=10, text_channel_id=20)])
+            await db_utils.requeue_current_entry(1)
+            self.assertEqual(await db_utils.get_queue_remaining_entries(1), 2)
+            self.assertEqual(await db_utils.get_queue_entry(1), 'url1')
+            self.assertEqual(await db_utils.get_queue_entry(1), 'url2')
+
+            await db_utils.delete_guild(1)
+            self.assertEqual(QueueEntry.select().count(), 0)
+
+    async def test_add_to_queue_chunks_and_deduplicates(self):
+        test_db = create_test_db()
+        with test_db.bind_ctx([Guild, QueueEntry]), patch.object(db_utils, 'ENQUEUE_CHUNK_SIZE', 3):
+            test_db.create_tables([Guild, QueueEntry])
+            await db_utils.create_new_guild(1)
+            self.assertEqual(await db_utils.add_to_queue(1, [f'url{index}' for index in range(7)]), list(range(7)))
+
+            positions = await db_utils.add_to_queue(1, ['url3', 'new1', 'new2', 'new1'], deduplicate=True)
+            self.assertEqual(positions, [7, 8])
+            self.assertEqual(await db_utils.add_to_queue(1, ['url0'], deduplicate=True), [])
+
+            queue = await db_utils.get_queue(1)
+            self.assertEqual([entry.url for entry in queue], [f'url{index}' for index in range(7)] + ['new1', 'new2'])
+            self.assertEqual(await db_utils.get_queue_total_entries(1), 9)
+
+    async def test_resolved_url_is_played_instead(self):
+        test_db = create_test_db()
+        with test_db.bind_ctx([Guild, QueueEntry]):
+            test_db.create_tables([Guild, QueueEntry])
+            await db_utils.create_new_guild(1)
+            await db_utils.add_to_queue(1, ['spotify0', 'spotify1', 'spotify2'])
+
+            unresolved = await db_utils.get_unresolved_upcoming_entries(1, 2)
+            self.assertEqual([url for _, url in unresolved], ['spotify0', 'spotify1'])
+
+            await db_utils.set_resolved_url(1, unresolved[0][0], 'youtube0')
+            self.assertEqual([url for _, url in await db_utils.get_unresolved_upcoming_entries(1, 2)], ['spotify1'])
+            self.assertEqual(await db_utils.peek_queue_entry(1), 'youtube0')
+            self.assertEqual(await db_utils.get_queue_entry(1), 'youtube0')
+            # The queue still lists the URL that was added
+            self.assertEqual((await db_utils.get_queue(1))[0].url, 'spotify0')
+            self.assertEqual(await db_utils.get_queue_entry(1), 'spotify1')
+        test_db.close()
+
+    async def test_spotify_mapping(self):
+        test_db = create_test_db()
+        with test_db.bind_ctx([SpotifyTrackMapping]):
+            test_db.create_tables([SpotifyTrackMapping])
+            self.assertIsNone(await db_utils.get_spotify_mapping('abc'))
+
+            await db_utils.store_spotify_mapping('abc', 'https://www.youtube.com/watch?v=1')
+            await db_utils.store_spotify_mapping('abc', 'https://music.youtube.com/watch?v=2')
+
+            self.assertEqual(await db_utils.get_spotify_mapping('abc'), 'https://music.youtube.com/watch?v=2')
+            self.assertEqual(SpotifyTrackMapping.select().count(), 1)
+        test_db.close()
+
+    async def test_track_gain(self):
+        test_db = create_test_db()
+        with test_db.bind_ctx([TrackLoudness]):
+            test_db.create_tables([TrackLoudness])
+            self.assertIsNone(await db_utils.get_track_gain('youtube:abc'))
+
+            await db_utils.store_track_gain('youtube:abc', -10.8)
+            await db_utils.store_track_gain('youtube:abc', -9.5)
+
+            self.assertEqual(await db_utils.get_track_gain('youtube:abc'), -9.5)
+            self.assertEqual(TrackLoudness.select().count(), 1)
+        test_db.close()
+
+    async def test_track_gain_served_from_memory(self):
+        test_db = create_test_db()
+        with test_db.bind_ctx([TrackLoudness]):
+            test_db.create_tables([TrackLoudness])
+            await db_utils.store_track_gain('youtube:abc', -7.0)
+            db_utils._track_gain_cache.clear()
+
+            self.assertEqual(await db_utils.get_track_gain('youtube:abc'), -7.0)
+            with patch('db_utils.db_utils.db_executor.read', new=AsyncMock()) as mock_read:
+                self.assertEqual(await db_utils.get_track_gain('youtube:abc'), -7.0)
+                mock_read.assert_not_called()
+
+            await db_utils.store_track_gain('youtube:abc', -4.5)
+            self.assertEqual(await db_utils.get_track_gain('youtube:abc'), -4.5)
+        test_db.close()
+
 if __name__ == '__main__':
     asyncio.run(unittest.main())
@@ -0,0 +1,82 @@
+import unittest
+
+import discord
+import numpy as np
+
+# db_utils has to be imported before the models, which discord_utils imports
+import db_utils
+from discord_utils import dynamic_volume
+from discord_utils.dynamic_volume import DynamicVolumeTransformer
+
+GUILD_ID = 1234
+
+FRAME = np.full((dynamic_volume.FRAME_SAMPLES, dynamic_volume.CHANNELS), 10000, dtype=np.int16).tobytes()
+
+class FakeSource(discord.AudioSource):
+    def __init__(self, frames: int = 10):
+        self.frames = frames
+
+    def read(self) -> bytes:
+        if not self.frames:
+            return b''
+        self.frames -= 1
+        return FRAME
+
+def samples(frame: bytes) -> np.ndarray:
+    return np.frombuffer(frame, dtype=np.int16).reshape(-1, dynamic_volume.CHANNELS)
+
+class TestDynamicVolumeTransformer(unittest.TestCase):
+    def tearDown(self):
+        dynamic_volume.unregister_audio_source(GUILD_ID)
+
+    def test_full_volume_passes_frames_through(self):
+        transformer = DynamicVolumeTransformer(FakeSource(), volume=1.0)
+        self.assertIs(transformer.read(), FRAME)
+
+    def test_steady_volume_scales_samples(self):
+        transformer = DynamicVolumeTransformer(FakeSource(), volume=0.5)
+        self.assertTrue((samples(transformer.read()) == 5000).all())
+
+    def test_mute_returns_silence(self):
+        transformer = DynamicVolumeTransformer(FakeSource(), volume=0.0)
+        self.assertEqual(transformer.read(), bytes(len(FRAME)))
+
+    def test_volume_change_ramps_over_one_frame(self):
+        transformer = DynamicVolumeTransformer(FakeSource(), volume=1.0)
+        transformer.read()
+
+        transformer.volume = 0.5
+        ramped = samples(transformer.read())
+        self.assertEqual(ramped[0, 0], 10000)
+        self.assertEqual(ramped[-1, 0], 5000)
+        self.assertTrue((np.diff(ramped[:, 0].astype(np.int32)) <= 0).all())
+        self.assertTrue((samples(transformer.read()) == 5000).all())
+
+    def test_volume_is_clamped(self):
+        transformer = DynamicVolumeTransformer(FakeSource(), volume=3.0)
+        self.assertEqual(transformer.volume, 1.0)
+        self.assertEqual(transformer.adjust_volume(-1.5), 0.0)
+
+    def test_end_of_stream(self):
+        transformer = DynamicVolumeTransformer(FakeSource(frames=0), volume=0.5)
+        self.assertEqual(transformer.read(), b'')
+
+    def test_rejects_opus_source(self):
+        source = FakeSource()
+        source.is_opus = lambda: True
+        with self.assertRaises(discord.ClientException):
+            DynamicVolumeTransformer(source)
+
+    def test_guild_registry(self):
+        transformer = DynamicVolumeTransformer(FakeSource(), volume=0.5)
+        dynamic_volume.register_audio_source(GUILD_ID, transformer)
+        self.assertTrue(dynamic_volume.set_guild_volume(GUILD_ID, 0.8))
+        self.assertAlmostEqual(dynamic_volume.adjust_guild_volume(GUILD_ID, 0.1), 0.9)
+        self.assertAlmostEqual(dynamic_volume.get_guild_current_volume(GUILD_ID), 0.9)
+
+        dynamic_volume.unregister_audio_source(GUILD_ID)
+        self.assertFalse(dynamic_volume.set_guild_volume(GUILD_ID, 0.8))
+        self.assertIsNone(dynamic_volume.get_guild_current_volume(GUILD_ID))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import unittest
+import threading
+import time
+from unittest.mock import patch, MagicMock
+import asyncio
+from utils import extraction_pool
+
+class TestExtractionPool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Clients created in other tests may be mocks, so every test starts without any
+        patcher = patch.object(extraction_pool, '_thread_clients', threading.local())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_run_returns_result(self):
+        result = await extraction_pool.run(lambda a, b: a + b, 1, 2)
+        self.assertEqual(result, 3)
+
+    async def test_run_does_not_use_event_loop_thread(self):
+        loop_thread = threading.get_ident()
+        worker_thread = await extraction_pool.run(threading.get_ident)
+        self.assertNotEqual(loop_thread, worker_thread)
+
+    async def test_run_propagates_errors(self):
+        def fail():
+            raise ValueError('fail')
+        with self.assertRaises(ValueError):
+            await extraction_pool.run(fail)
+
+    async def test_run_timeout(self):
+        before = extraction_pool.get_stats()['timed_out']
+        with self.assertRaises(extraction_pool.ExtractionTimeoutError):
+            await extraction_pool.run(time.sleep, 0.5, timeout=0.05)
+        self.assertEqual(extraction_pool.get_stats()['timed_out'], before + 1)
+
+    async def test_queue_depth(self):
+        extraction_pool.configure(max_workers=1)
+        release = threading.Event()
+        try:
+            blocker = asyncio.ensure_future(extraction_pool.run(release.wait))
+            waiter = asyncio.ensure_future(extraction_pool.run(lambda: 'done'))
+            await asyncio.sleep(0.05)
+            self.assertEqual(extraction_pool.get_queue_depth(), 1)
+            release.set()
+            self.assertEqual(await waiter, 'done')
+            await blocker
+            self.assertEqual(extraction_pool.get_queue_depth(), 0)
+        finally:
+            release.set()
+            extraction_pool.configure(max_workers=extraction_pool.DEFAULT_MAX_WORKERS)
+
+    @patch('utils.extraction_pool._extract_info')
+    async def test_extract_info(self, mock_extract):
+        mock_extract.return_value = {'title': 'song'}
+        result = await extraction_pool.extract_info('url', {'quiet': True})
+        self.assertEqual(result, {'title': 'song'})
+        mock_extract.assert_called_once_with('url', {'quiet': True})
+
+    async def _collect_entries(self, mock_ydl_class, info, batch_size=2):
+        ydl = MagicMock()
+        ydl.extract_info.return_value = info
+        mock_ydl_class.return_value = ydl
+        batches = []
+        async for batch in extraction_pool.iter_entries('url', {}, batch_size=batch_size):
+            batches.append(batch)
+        return batches
+
+    @patch('yt_dlp.YoutubeDL')
+    async def test_iter_entries_batches(self, mock_ydl_class):
+        entries = ({'url': f'url{i}'} for i in range(6))
+        batches = await self._collect_entries(mock_ydl_class, {'_type': 'playlist', 'entries': entries})
+        # The first entry comes on its own so playback can start immediately
+        self.assertEqual([len(batch) for batch in batches], [1, 2, 2, 1])
+
+    @patch('yt_dlp.YoutubeDL')
+    async def test_iter_entries_single_video(self, mock_ydl_class):
+        batches = await self._collect_entries(mock_ydl_class, {'_type': 'video', 'url': 'url'})
+        self.assertEqual(batches, [[{'_type': 'video', 'url': 'url'}]])
+
+    @patch('yt_dlp.YoutubeDL')
+    async def test_iter_entries_error(self, mock_ydl_class):
+        def entries():
+            yield {'url': 'url0'}
+            raise ValueError('page failed')
+        with self.assertRaises(ValueError):
+            await self._collect_entries(mock_ydl_class, {'entries': entries()})
+
+    @patch('yt_dlp.YoutubeDL')
+    async def test_listing_leaves_workers_free(self, mock_ydl_class):
+        release = threading.Event()
+
+        def entries():
+            yield {'url': 'url0'}
+            release.wait()
+            yield {'url': 'url1'}
+        mock_ydl_class.return_value.extract_info.return_value = {'_type': 'playlist', 'entries': entries()}
+        extraction_pool.configure(max_workers=1)
+        try:
+            listing = extraction_pool.iter_entries('url', {}, batch_size=2)
+            self.assertEqual(await anext(listing), [{'url': 'url0'}])
+            # The listing is still paging, songs can still be resolved
+            self.assertEqual(await asyncio.wait_for(extraction_pool.run(lambda: 'done'), 2), 'done')
+            release.set()
+            self.assertEqual([batch async for batch in listing], [[{'url': 'url1'}]])
+        finally:
+            release.set()
+            extraction_pool.configure(max_workers=extraction_pool.DEFAULT_MAX_WORKERS)
+
+    @patch('yt_dlp.YoutubeDL')
+    async def test_youtube_dl_reused_per_worker(self, mock_ydl_class):
+        def create_youtube_dl(ydl_opts):
+            # Like yt-dlp, fill in defaults in the given options
+            ydl_opts['outtmpl'] = 'default'
+            return MagicMock()
+        mock_ydl_class.side_effect = create_youtube_dl
+        ydl_opts = {'quiet': True}
+        extraction_pool.configure(max_workers=1)
+        try:
+            first = await extraction_pool.run(extraction_pool.get_youtube_dl, ydl_opts)
+            second = await extraction_pool.run(extraction_pool.get_youtube_dl, ydl_opts)
+            other_options = await extraction_pool.run(extraction_pool.get_youtube_dl, {'quiet': False})
+            self.assertIs(first, second)
+            self.assertIsNot(first, other_options)
+        finally:
+            extraction_pool.configure(max_workers=extraction_pool.DEFAULT_MAX_WORKERS)
+
+    @patch('ytmusicapi.YTMusic')
+    async def test_ytmusic_not_shared_between_threads(self, mock_ytmusic_class):
+        mock_ytmusic_class.side_effect = lambda: MagicMock()
+        results = []
+        thread = threading.Thread(target=lambda: results.append(extraction_pool.get_ytmusic()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(results[0], extraction_pool.get_ytmusic())
+        self.assertIs(extraction_pool.get_ytmusic(), extraction_pool.get_ytmusic())
+
+    @patch('ytmusicapi.YTMusic')
+    async def test_search_ytmusic(self, mock_ytmusic_class):
+        mock_ytmusic_class.return_value.search.return_value = [{'videoId': 'id'}]
+        result = await extraction_pool.search_ytmusic('query', filter='songs')
+        self.assertEqual(result, [{'videoId': 'id'}])
+        mock_ytmusic_class.return_value.search.assert_called_once_with('query', filter='songs')
+
+    @patch('ytmusicapi.YTMusic')
+    @patch('yt_dlp.YoutubeDL')
+    async def test_warm_up_workers(self, mock_ydl_class, mock_ytmusic_class):
+        extraction_pool.configure(max_workers=3)
+        try:
+            await extraction_pool.warm_up([{'quiet': True}])
+            # A worker that runs two warm-up jobs creates its clients once
+            self.assertIn(mock_ydl_class.call_count, range(1, 4))
+            self.assertEqual(mock_ytmusic_class.call_count, mock_ydl_class.call_count)
+            mock_ydl_class.return_value.get_info_extractor.assert_called_with('Youtube')
+        finally:
+            extraction_pool.configure(max_workers=extraction_pool.DEFAULT_MAX_WORKERS)
+
+    @patch('ytmusicapi.YTMusic')
+    @patch('yt_dlp.YoutubeDL')
+    async def test_warm_up_does_not_hold_workers(self, mock_ydl_class, mock_ytmusic_class):
+        extraction_pool.configure(max_workers=2)
+        release = threading.Event()
+        try:
+            # One worker is busy for the whole warm-up, the other warms up and stays free for requests
+            blocker = asyncio.ensure_future(extraction_pool.run(release.wait))
+            await asyncio.sleep(0.05)
+            warm_up = asyncio.ensure_future(extraction_pool.warm_up([{'quiet': True}]))
+            self.assertEqual(await asyncio.wait_for(extraction_pool.run(lambda: 'done'), 2), 'done')
+            release.set()
+            await blocker
+            await warm_up
+        finally:
+            release.set()
+            extraction_pool.configure(max_workers=extraction_pool.DEFAULT_MAX_WORKERS)
+
+if __name__ == '__main__':
+    unittest.main()
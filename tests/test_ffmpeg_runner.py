@@ -0,0 +1,22 @@
+import unittest
+import asyncio
+from utils import ffmpeg_runner
+
+class TestFFmpegRunner(unittest.TestCase):
+    def test_reconnect_options_only_for_streams(self):
+        self.assertEqual(ffmpeg_runner.get_reconnect_options('https://rr1---sn.googlevideo.com/videoplayback'), ffmpeg_runner.RECONNECT_OPTIONS)
+        self.assertEqual(ffmpeg_runner.get_reconnect_options('/data/audio_cache/abc.opus'), [])
+
+    def test_semaphore_per_loop(self):
+        semaphore = ffmpeg_runner.LoopSemaphore(1)
+
+        async def get_twice():
+            return semaphore.get(), semaphore.get()
+
+        first, second = asyncio.run(get_twice())
+        self.assertIs(first, second)
+        other_loop, _ = asyncio.run(get_twice())
+        self.assertIsNot(first, other_loop)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+from utils import http_client
+
+class TestHttpClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        await http_client.close()
+        http_client.configure(limit_per_host=http_client.DEFAULT_LIMIT_PER_HOST, timeout=http_client.DEFAULT_TIMEOUT)
+
+    async def test_session_is_shared(self):
+        self.assertIs(http_client.get_session(), http_client.get_session())
+
+    async def test_session_recreated_after_close(self):
+        session = http_client.get_session()
+        await http_client.close()
+        self.assertTrue(session.closed)
+        new_session = http_client.get_session()
+        self.assertIsNot(session, new_session)
+        self.assertFalse(new_session.closed)
+
+    async def test_session_settings(self):
+        http_client.configure(limit_per_host=3, timeout=7)
+        session = http_client.get_session()
+        self.assertEqual(session.connector.limit_per_host, 3)
+        self.assertEqual(session.connector.limit, http_client.DEFAULT_LIMIT)
+        self.assertEqual(session.timeout.total, 7)
+        self.assertEqual(session.timeout.connect, http_client.CONNECT_TIMEOUT)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+import unittest
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('spotdl', 'spotipy', 'yt_dlp', 'ytmusicapi', 'bs4')
+
+class TestLazyImports(unittest.TestCase):
+    def test_platform_modules_do_not_import_heavy_libraries(self):
+        # A fresh interpreter, the test process already has these libraries loaded
+        code = (
+            "import sys, db_utils, ddl_retrievers, platform_handlers.music_url_getter, discord_utils.player\n"
+            f"print(','.join(module for module in {HEAVY_MODULES!r} if module in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=REPOSITORY_ROOT, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '')
+
+    def test_retrievers_are_loaded_on_access(self):
+        # db_utils has to be imported before the models, which the retrievers import
+        import db_utils
+        import ddl_retrievers
+        self.assertTrue(callable(ddl_retrievers.tiktok_ddl_retriever.get_streaming_url))
+        with self.assertRaises(AttributeError):
+            ddl_retrievers.missing_retriever
+
+if __name__ == '__main__':
+    unittest.main()
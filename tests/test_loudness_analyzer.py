@@ -0,0 +1,122 @@
+import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+import asyncio
+# db_utils has to be imported before the models, which discord_utils imports
+import db_utils
+from discord_utils import loudness_analyzer
+
+FFMPEG_OUTPUT = '''Input #0, matroska,webm, from 'https://rr1---sn.googlevideo.com/videoplayback':
+[Parsed_loudnorm_0 @ 0x5581]
+{
+	"input_i" : "-14.20",
+	"input_tp" : "-0.30",
+	"input_lra" : "6.10",
+	"input_thresh" : "-24.45",
+	"output_i" : "-25.02",
+	"output_tp" : "-11.10",
+	"output_lra" : "5.90",
+	"output_thresh" : "-35.25",
+	"normalization_type" : "dynamic",
+	"target_offset" : "0.02"
+}
+'''
+
+def mock_process(returncode: int = 0, stderr: str = FFMPEG_OUTPUT) -> MagicMock:
+    process = MagicMock()
+    process.returncode = returncode
+    process.communicate = AsyncMock(return_value=(b'', stderr.encode()))
+    return process
+
+class TestLoudnessGain(unittest.TestCase):
+    def test_parse_measurement(self):
+        measurement = loudness_analyzer.parse_measurement(FFMPEG_OUTPUT)
+        self.assertEqual((measurement['input_i'], measurement['input_tp']), ('-14.20', '-0.30'))
+        self.assertIsNone(loudness_analyzer.parse_measurement('Invalid data found when processing input'))
+
+    def test_loud_track_is_turned_down(self):
+        self.assertEqual(loudness_analyzer.compute_gain({'input_i': '-14.20', 'input_tp': '-0.30'}), -10.8)
+
+    def test_quiet_track_is_limited_by_true_peak(self):
+        # Reaching -25 LUFS would need +7 dB, but the peaks only leave room for +3.5 dB
+        self.assertEqual(loudness_analyzer.compute_gain({'input_i': '-32.00', 'input_tp': '-5.00'}), 3.5)
+
+    def test_gain_is_capped(self):
+        self.assertEqual(loudness_analyzer.compute_gain({'input_i': '-70.00', 'input_tp': '-60.00'}), loudness_analyzer.MAX_GAIN_DB)
+
+    def test_silence_and_invalid_measurements(self):
+        self.assertEqual(loudness_analyzer.compute_gain({'input_i': '-inf', 'input_tp': '-inf'}), 0.0)
+        self.assertIsNone(loudness_analyzer.compute_gain({'input_i': 'nan?'}))
+
+    def test_filter(self):
+        self.assertEqual(loudness_analyzer.get_filter(None), 'loudnorm=I=-25:TP=-1.5:LRA=11')
+        self.assertEqual(loudness_analyzer.get_filter(-10.8), 'volume=-10.80dB')
+
+@patch('discord_utils.loudness_analyzer.db_utils.store_track_gain', new_callable=AsyncMock)
+@patch('discord_utils.loudness_analyzer.asyncio.create_subprocess_exec', new_callable=AsyncMock)
+class TestLoudnessAnalyzer(unittest.IsolatedAsyncioTestCase):
+    def tearDown(self):
+        loudness_analyzer.stop()
+
+    async def wait_for_analysis(self, track_id: str):
+        task = loudness_analyzer._analyses.get(track_id)
+        if task:
+            await task
+
+    async def test_stores_measured_gain(self, mock_exec, mock_store):
+        mock_exec.return_value = mock_process()
+        loudness_analyzer.schedule('youtube:abc', 'https://rr1---sn.googlevideo.com/videoplayback', 212.0)
+        await self.wait_for_analysis('youtube:abc')
+
+        mock_store.assert_awaited_once_with('youtube:abc', -10.8)
+        self.assertIn('https://rr1---sn.googlevideo.com/videoplayback', mock_exec.await_args.args)
+        self.assertNotIn('youtube:abc', loudness_analyzer._analyses)
+
+    async def test_failed_analysis_stores_nothing(self, mock_exec, mock_store):
+        mock_exec.return_value = mock_process(returncode=1, stderr='Server returned 403 Forbidden')
+        loudness_analyzer.schedule('youtube:abc', 'https://rr1---sn.googlevideo.com/videoplayback', 212.0)
+        await self.wait_for_analysis('youtube:abc')
+        mock_store.assert_not_awaited()
+
+    async def test_streams_of_unknown_length_are_not_measured(self, mock_exec, mock_store):
+        loudness_analyzer.schedule('https://radio.example.com/live', 'https://radio.example.com/live', None)
+        self.assertEqual(loudness_analyzer._analyses, {})
+        mock_exec.assert_not_awaited()
+
+    async def test_analysis_length_is_capped(self, mock_exec, mock_store):
+        mock_exec.return_value = mock_process()
+        loudness_analyzer.schedule('youtube:mix', 'https://a', 4 * 3600.0)
+        await self.wait_for_analysis('youtube:mix')
+        args = mock_exec.await_args.args
+        self.assertEqual(args[args.index('-t') + 1], str(loudness_analyzer.MAX_ANALYSIS_SECONDS))
+        mock_store.assert_awaited_once()
+
+    async def test_track_is_measured_once_at_a_time(self, mock_exec, mock_store):
+        mock_exec.return_value = mock_process()
+        loudness_analyzer.schedule('youtube:abc', 'https://a', 212.0)
+        loudness_analyzer.schedule('youtube:abc', 'https://b', 212.0)
+        await self.wait_for_analysis('youtube:abc')
+        mock_exec.assert_awaited_once()
+
+    async def test_stop_kills_ffmpeg(self, mock_exec, mock_store):
+        process = mock_process()
+        process.returncode = None
+        started = asyncio.Event()
+
+        async def communicate():
+            started.set()
+            await asyncio.Event().wait()
+        process.communicate = communicate
+        process.wait = AsyncMock()
+        mock_exec.return_value = process
+
+        loudness_analyzer.schedule('youtube:abc', 'https://a', 212.0)
+        task = loudness_analyzer._analyses['youtube:abc']
+        await started.wait()
+        loudness_analyzer.stop()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        process.kill.assert_called_once()
+        mock_store.assert_not_awaited()
+
+if __name__ == '__main__':
+    unittest.main()
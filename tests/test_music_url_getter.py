@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import patch, MagicMock, AsyncMock
 import asyncio
-from platform_handlers import music_url_getter
+from platform_handlers import music_url_getter, query_cache
 from enums.platform import Platform
 from enums.audio_content_type import AudioContentType
 
@@ -32,5 +32,51 @@ class TestMusicUrlGetter(unittest.IsolatedAsyncioTestCase):
         result = await music_url_getter.get_streaming_url('url')
         self.assertEqual(result, 'musicinfo')
 
+    @patch('platform_handlers.music_url_getter.find_platform', new_callable=AsyncMock)
+    @patch('platform_handlers.music_url_getter.get_audio_content_type', new_callable=AsyncMock)
+    async def test_is_playlist(self, mock_get_audio_type, mock_find):
+        for platform, audio_content_type, expected in (
+            (Platform.SPOTIFY, AudioContentType.ALBUM, True),
+            (Platform.SPOTIFY, AudioContentType.SINGLE_SONG, False),
+            (Platform.YOUTUBE, AudioContentType.PLAYLIST, True),
+            (Platform.YOUTUBE, AudioContentType.RADIO, True),
+            (Platform.YOUTUBE, AudioContentType.SINGLE_SONG, False),
+            (Platform.ANYTHING_ELSE, AudioContentType.QUERY, False),
+        ):
+            mock_find.return_value = platform
+            mock_get_audio_type.return_value = audio_content_type
+            self.assertEqual(await music_url_getter.is_playlist('url'), expected, (platform, audio_content_type))
+
+    @patch('platform_handlers.music_url_getter.extraction_pool.extract_info', new_callable=AsyncMock)
+    @patch('platform_handlers.music_url_getter.extraction_pool.search_ytmusic', new_callable=AsyncMock)
+    async def test_query_search_is_cached(self, mock_search, mock_extract):
+        query_cache.clear()
+        mock_search.return_value = [{'videoId': 'dQw4w9WgXcQ'}]
+        for query in ('Never Gonna Give You Up', 'never gonna give you up'):
+            result = await music_url_getter._get_urls(query, Platform.NO_URL, AudioContentType.QUERY)
+            self.assertEqual(result, ['https://music.youtube.com/watch?v=dQw4w9WgXcQ'])
+        mock_search.assert_awaited_once()
+        mock_extract.assert_not_awaited()
+
+    @patch('platform_handlers.music_url_getter.extraction_pool.extract_info', new_callable=AsyncMock)
+    @patch('platform_handlers.music_url_getter.extraction_pool.search_ytmusic', new_callable=AsyncMock)
+    async def test_query_without_results_is_cached(self, mock_search, mock_extract):
+        query_cache.clear()
+        mock_search.return_value = []
+        mock_extract.return_value = {'entries': []}
+        for _ in range(2):
+            self.assertEqual(await music_url_getter._get_urls('asdfghjkl', Platform.NO_URL, AudioContentType.QUERY), [])
+        mock_search.assert_awaited_once()
+        mock_extract.assert_awaited_once()
+
+    @patch('platform_handlers.music_url_getter.extraction_pool.extract_info', new_callable=AsyncMock)
+    @patch('platform_handlers.music_url_getter.extraction_pool.search_ytmusic', new_callable=AsyncMock)
+    async def test_failed_query_search_is_not_cached(self, mock_search, mock_extract):
+        query_cache.clear()
+        mock_search.side_effect = Exception('network')
+        mock_extract.return_value = {'entries': []}
+        self.assertEqual(await music_url_getter._get_urls('song', Platform.NO_URL, AudioContentType.QUERY), [])
+        self.assertIsNone(query_cache.get('song'))
+
 if __name__ == '__main__':
     unittest.main()
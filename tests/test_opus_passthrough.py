@@ -0,0 +1,198 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import time
+import discord
+# db_utils has to be imported before the models, which discord_utils imports
+import db_utils
+from discord_utils import opus_passthrough
+from discord_utils.dynamic_bass_boost import register_bass_boost, set_guild_bass_boost, unregister_bass_boost
+from discord_utils.dynamic_earrape import register_earrape, set_guild_earrape, unregister_earrape
+
+GUILD_ID = 1234
+OPUS_URL = 'https://rr3---sn-4g5e6nz7.googlevideo.com/videoplayback?itag=251&mime=audio%2Fwebm&dur=212.061'
+MP4_URL = 'https://rr3---sn-4g5e6nz7.googlevideo.com/videoplayback?itag=140&mime=audio%2Fmp4&dur=212.061'
+
+class FakePCMSource(discord.AudioSource):
+    def __init__(self, start_seconds: float):
+        self.start_seconds = start_seconds
+        self.volume = 1.0
+        self.frames_read = 0
+        self.cleaned_up = False
+
+    def read(self) -> bytes:
+        self.frames_read += 1
+        return b'pcm'
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+class FakeVoiceClient:
+    """Sends packets like VoiceClient.send_audio_packet, which encodes with the encoder of the client"""
+    def __init__(self):
+        self.encoder = discord.utils.MISSING
+        self.packets = []
+
+    def send_audio_packet(self, data: bytes, *, encode: bool = True):
+        self.packets.append(self.encoder.encode(data, self.encoder.SAMPLES_PER_FRAME) if encode else data)
+
+class TestCanPassThrough(unittest.TestCase):
+    def setUp(self):
+        opus_passthrough.configure(True)
+        register_bass_boost(GUILD_ID, 1.0)
+        register_earrape(GUILD_ID, False)
+
+    def tearDown(self):
+        opus_passthrough.configure(False)
+        unregister_bass_boost(GUILD_ID)
+        unregister_earrape(GUILD_ID)
+
+    def test_only_opus_streams(self):
+        self.assertTrue(opus_passthrough.is_opus_stream(OPUS_URL))
+        self.assertFalse(opus_passthrough.is_opus_stream(MP4_URL))
+        self.assertFalse(opus_passthrough.is_opus_stream('https://example.com/song.webm?mime=audio%2Fwebm'))
+
+    def test_needs_neutral_volume_and_effects(self):
+        self.assertTrue(opus_passthrough.can_pass_through(GUILD_ID, OPUS_URL, 1.0, 0.0))
+        self.assertFalse(opus_passthrough.can_pass_through(GUILD_ID, OPUS_URL, 0.8, 0.0))
+        self.assertFalse(opus_passthrough.can_pass_through(GUILD_ID, MP4_URL, 1.0, 0.0))
+
+        set_guild_bass_boost(GUILD_ID, 0.0)
+        self.assertFalse(opus_passthrough.can_pass_through(GUILD_ID, OPUS_URL, 1.0, 0.0))
+        set_guild_bass_boost(GUILD_ID, 1.0)
+        set_guild_earrape(GUILD_ID, True)
+        self.assertFalse(opus_passthrough.can_pass_through(GUILD_ID, OPUS_URL, 1.0, 0.0))
+
+    def test_needs_neutral_loudness(self):
+        self.assertTrue(opus_passthrough.can_pass_through(GUILD_ID, OPUS_URL, 1.0, -0.3))
+        # Not measured yet, plays with loudnorm
+        self.assertFalse(opus_passthrough.can_pass_through(GUILD_ID, OPUS_URL, 1.0, None))
+        self.assertFalse(opus_passthrough.can_pass_through(GUILD_ID, OPUS_URL, 1.0, -10.8))
+
+    def test_disabled(self):
+        opus_passthrough.configure(False)
+        self.assertFalse(opus_passthrough.can_pass_through(GUILD_ID, OPUS_URL, 1.0, 0.0))
+
+@patch('discord_utils.opus_passthrough.discord.FFmpegOpusAudio')
+class TestPassthroughSource(unittest.TestCase):
+    def setUp(self):
+        register_bass_boost(GUILD_ID, 1.0)
+        register_earrape(GUILD_ID, False)
+        self.pcm_sources = []
+
+    def tearDown(self):
+        unregister_bass_boost(GUILD_ID)
+        unregister_earrape(GUILD_ID)
+
+    def create_pcm_source(self, start_seconds: float) -> FakePCMSource:
+        pcm_source = FakePCMSource(start_seconds)
+        self.pcm_sources.append(pcm_source)
+        return pcm_source
+
+    def read_until_pcm(self, source: opus_passthrough.PassthroughSource) -> int:
+        """Read like the audio thread until the source switched, returning the number of Opus packets read"""
+        packets = 0
+        deadline = time.monotonic() + 5
+        while source.read() == b'opus':
+            packets += 1
+            self.assertTrue(source.is_opus())
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.001)
+        return packets
+
+    def test_passes_opus_packets_through(self, mock_opus_audio):
+        mock_opus_audio.return_value.read.return_value = b'opus'
+        source = opus_passthrough.PassthroughSource(OPUS_URL, GUILD_ID, self.create_pcm_source)
+        self.assertEqual([source.read() for _ in range(3)], [b'opus'] * 3)
+        self.assertTrue(source.is_opus())
+        self.assertEqual(mock_opus_audio.call_args.kwargs['codec'], 'opus')
+        self.assertEqual(self.pcm_sources, [])
+
+    def test_volume_change_continues_on_pcm_path(self, mock_opus_audio):
+        mock_opus_audio.return_value.read.return_value = b'opus'
+        source = opus_passthrough.PassthroughSource(OPUS_URL, GUILD_ID, self.create_pcm_source)
+        for _ in range(50):
+            source.read()
+
+        source.volume = 0.5
+        packets_during_switch = self.read_until_pcm(source)
+
+        self.assertFalse(source.is_opus())
+        pcm_source, = self.pcm_sources
+        self.assertAlmostEqual(pcm_source.start_seconds, 50 * opus_passthrough.FRAME_SECONDS)
+        # Frames played while FFmpeg started are skipped, plus the first frame read while preparing and the one returned
+        self.assertEqual(pcm_source.frames_read, packets_during_switch + 1)
+        self.assertEqual(pcm_source.volume, 0.5)
+        mock_opus_audio.return_value.cleanup.assert_called_once()
+
+        source.volume = 0.7
+        self.assertEqual(pcm_source.volume, 0.7)
+        self.assertEqual(source.volume, 0.7)
+
+    def test_effect_change_continues_on_pcm_path(self, mock_opus_audio):
+        mock_opus_audio.return_value.read.return_value = b'opus'
+        source = opus_passthrough.PassthroughSource(OPUS_URL, GUILD_ID, self.create_pcm_source)
+        source.read()
+
+        set_guild_earrape(GUILD_ID, True)
+        self.read_until_pcm(source)
+        self.assertEqual(self.pcm_sources[0].volume, 1.0)
+
+    def test_cleanup_releases_both_paths(self, mock_opus_audio):
+        mock_opus_audio.return_value.read.return_value = b'opus'
+        source = opus_passthrough.PassthroughSource(OPUS_URL, GUILD_ID, self.create_pcm_source)
+        source.volume = 0.5
+        self.read_until_pcm(source)
+
+        source.cleanup()
+        self.assertTrue(self.pcm_sources[0].cleaned_up)
+
+    def test_failed_switch_keeps_passing_through(self, mock_opus_audio):
+        mock_opus_audio.return_value.read.return_value = b'opus'
+        create_pcm_source = MagicMock(side_effect=discord.ClientException('ffmpeg was not found.'))
+        source = opus_passthrough.PassthroughSource(OPUS_URL, GUILD_ID, create_pcm_source)
+        source.volume = 0.5
+        for _ in range(20):
+            self.assertEqual(source.read(), b'opus')
+            time.sleep(0.001)
+        create_pcm_source.assert_called_once()
+
+@patch('discord_utils.opus_passthrough.discord.FFmpegOpusAudio')
+class TestSwitchOnVoiceClient(unittest.TestCase):
+    def setUp(self):
+        register_bass_boost(GUILD_ID, 1.0)
+        register_earrape(GUILD_ID, False)
+
+    def tearDown(self):
+        unregister_bass_boost(GUILD_ID)
+        unregister_earrape(GUILD_ID)
+
+    @patch('discord.opus.Encoder')
+    def test_switch_on_client_without_encoder(self, mock_encoder, mock_opus_audio):
+        mock_opus_audio.return_value.read.return_value = b'opus'
+        # A connection whose first source is passed through, pycord doesn't create the encoder for it
+        voice_client = FakeVoiceClient()
+        source = opus_passthrough.PassthroughSource(OPUS_URL, GUILD_ID, FakePCMSource)
+        opus_passthrough.ensure_encoder(voice_client)
+
+        source.volume = 0.5
+        deadline = time.monotonic() + 5
+        # What the audio player does for every frame
+        while source.is_opus():
+            data = source.read()
+            voice_client.send_audio_packet(data, encode=not source.is_opus())
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.001)
+
+        mock_encoder.return_value.encode.assert_called_with(b'pcm', mock_encoder.return_value.SAMPLES_PER_FRAME)
+        self.assertEqual(voice_client.packets[-1], mock_encoder.return_value.encode.return_value)
+
+    @patch('discord.opus.Encoder')
+    def test_existing_encoder_is_kept(self, mock_encoder, mock_opus_audio):
+        voice_client = FakeVoiceClient()
+        encoder = voice_client.encoder = MagicMock()
+        opus_passthrough.ensure_encoder(voice_client)
+        self.assertIs(voice_client.encoder, encoder)
+        mock_encoder.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+import asyncio
+import threading
+from discord_utils import player
+
+class TestPlaybackFuture(unittest.IsolatedAsyncioTestCase):
+    async def test_after_callback_from_audio_thread(self):
+        playback_finished = player._PlaybackFuture(asyncio.get_running_loop())
+        thread = threading.Thread(target=playback_finished.on_finished, args=(None,))
+        thread.start()
+        result = await asyncio.wait_for(playback_finished.future, 1)
+        thread.join()
+        self.assertIsNone(result)
+
+    async def test_error_is_passed_through(self):
+        playback_finished = player._PlaybackFuture(asyncio.get_running_loop())
+        error = Exception('ffmpeg died')
+        playback_finished.on_finished(error)
+        self.assertIs(await playback_finished.future, error)
+
+    async def test_second_callback_is_ignored(self):
+        playback_finished = player._PlaybackFuture(asyncio.get_running_loop())
+        playback_finished.on_finished(None)
+        playback_finished.on_finished(Exception('late'))
+        self.assertIsNone(await playback_finished.future)
+        await asyncio.sleep(0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import time
+import unittest
+from platform_handlers import query_cache
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        query_cache.clear()
+
+    def test_normalize_query(self):
+        self.assertEqual(query_cache.normalize_query('  Never  Gonna\tGive You UP '), 'never gonna give you up')
+        self.assertEqual(query_cache.normalize_query('ＡＢＣ'), 'abc')
+
+    def test_store_and_get_normalized(self):
+        query_cache.store('Never Gonna Give You Up', 'https://music.youtube.com/watch?v=dQw4w9WgXcQ')
+        self.assertEqual(query_cache.get('never gonna  give you up'), 'https://music.youtube.com/watch?v=dQw4w9WgXcQ')
+        self.assertIsNone(query_cache.get('never gonna let you down'))
+
+    def test_no_results_cached_shorter(self):
+        query_cache.store('asdfghjkl', None)
+        self.assertEqual(query_cache.get('asdfghjkl'), query_cache.NO_RESULTS)
+        (_, _, expires_at), = query_cache._cache.items()
+        self.assertAlmostEqual(expires_at, time.time() + query_cache.NO_RESULTS_TTL, delta=5)
+
+    def test_save_and_load(self):
+        query_cache.store('song', 'https://www.youtube.com/watch?v=abc')
+        query_cache.store('nothing', None)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'query_cache.json')
+            query_cache.save(path)
+            query_cache.clear()
+            query_cache.load(path)
+        self.assertEqual(query_cache.get('song'), 'https://www.youtube.com/watch?v=abc')
+        self.assertEqual(query_cache.get('nothing'), query_cache.NO_RESULTS)
+
+    def test_load_skips_expired_entries(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'query_cache.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(f'[["old", "https://youtu.be/old", {time.time() - 1}], ["new", "https://youtu.be/new", {time.time() + 60}]]')
+            query_cache.load(path)
+        self.assertIsNone(query_cache.get('old'))
+        self.assertEqual(query_cache.get('new'), 'https://youtu.be/new')
+
+    def test_load_malformed_file(self):
+        expires_at = time.time() + 60
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'query_cache.json')
+            for content in ('null', '{"song": "https://youtu.be/abc"}', '"text"', '[1, 2, 3]', '{broken'):
+                with open(path, 'w', encoding='utf-8') as file:
+                    file.write(content)
+                query_cache.load(path)
+                self.assertEqual(query_cache.get_stats()['entries'], 0)
+
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(f'[["short", "https://youtu.be/short"], ["long", "https://youtu.be/long", {expires_at}, 1], '
+                           f'["no expiry", "https://youtu.be/x", null], [null, "https://youtu.be/x", {expires_at}], '
+                           f'["good", "https://youtu.be/good", {expires_at}]]')
+            query_cache.load(path)
+        self.assertEqual(query_cache.get_stats()['entries'], 1)
+        self.assertEqual(query_cache.get('good'), 'https://youtu.be/good')
+
+    def test_load_missing_file(self):
+        query_cache.load('/nonexistent/query_cache.json')
+        self.assertEqual(query_cache.get_stats()['entries'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
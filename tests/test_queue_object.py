@@ -1,5 +1,6 @@
 import unittest
 from models.queue_object import QueueEntry
+from models.guild_music_information import Guild
 from peewee import SqliteDatabase
 from db_utils.db import db
 
@@ -10,10 +11,29 @@ class TestQueueEntryModel(unittest.TestCase):
         self.assertTrue(hasattr(QueueEntry, 'url'))
         self.assertTrue(hasattr(QueueEntry, 'already_played'))
         self.assertTrue(hasattr(QueueEntry, 'force_play'))
+        self.assertTrue(hasattr(QueueEntry, 'position'))
 
     def test_queue_entry_meta(self):
         self.assertEqual(QueueEntry._meta.table_name, 'queue_entry')
         self.assertIs(QueueEntry._meta.database, db)
 
+    def test_next_entry_query_uses_index(self):
+        test_db = SqliteDatabase(':memory:')
+        with test_db.bind_ctx([Guild, QueueEntry]):
+            test_db.create_tables([Guild, QueueEntry])
+            for order_key, index_name in (
+                (QueueEntry.position, 'queueentry_guild_id_already_played_force_play_position'),
+                (QueueEntry.shuffle_key, 'queueentry_guild_id_already_played_force_play_shuffle_key'),
+            ):
+                query = QueueEntry.select().where(
+                    (QueueEntry.guild == 1) &
+                    (QueueEntry.already_played == False) &
+                    (QueueEntry.force_play == False)
+                ).order_by(order_key, QueueEntry.id).limit(1)
+                sql, params = query.sql()
+                plan = ' '.join(str(row) for row in test_db.execute_sql(f'EXPLAIN QUERY PLAN {sql}', params).fetchall())
+                self.assertIn(index_name, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
 if __name__ == '__main__':
     unittest.main()
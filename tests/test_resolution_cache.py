@@ -0,0 +1,47 @@
+import unittest
+import time
+from models.music_information import MusicInformation
+from platform_handlers import resolution_cache
+from platform_handlers.track_identity import get_canonical_track_id
+
+class TestTrackIdentity(unittest.TestCase):
+    def test_youtube_urls_share_id(self):
+        urls = [
+            'https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123',
+            'https://youtu.be/dQw4w9WgXcQ?t=10',
+            'https://music.youtube.com/watch?v=dQw4w9WgXcQ',
+            'https://www.youtube.com/shorts/dQw4w9WgXcQ',
+        ]
+        self.assertEqual({get_canonical_track_id(url) for url in urls}, {'youtube:dQw4w9WgXcQ'})
+
+    def test_spotify_track(self):
+        self.assertEqual(get_canonical_track_id('https://open.spotify.com/intl-de/track/abc123?si=xyz'), 'spotify:track:abc123')
+
+    def test_other_url(self):
+        self.assertEqual(get_canonical_track_id('https://example.com/song.mp3#t=1'), 'https://example.com/song.mp3')
+
+class TestResolutionCache(unittest.TestCase):
+    def setUp(self):
+        resolution_cache.clear()
+
+    def test_expiry_from_googlevideo_url(self):
+        expire = int(time.time()) + 6 * 3600
+        url = f'https://rr1.googlevideo.com/videoplayback?expire={expire}&id=1'
+        self.assertEqual(resolution_cache.get_expiry(url), expire - resolution_cache.EXPIRY_SAFETY_MARGIN)
+
+    def test_expiry_default(self):
+        expiry = resolution_cache.get_expiry('https://example.com/song.mp3')
+        self.assertAlmostEqual(expiry, time.time() + resolution_cache.DEFAULT_TTL, delta=5)
+
+    def test_store_and_get_by_canonical_id(self):
+        info = MusicInformation('https://example.com/stream', 'song', 'author', 'image')
+        resolution_cache.store('https://www.youtube.com/watch?v=abc', info)
+        self.assertIs(resolution_cache.get('https://youtu.be/abc'), info)
+
+    def test_expired_stream_is_not_cached(self):
+        info = MusicInformation(f'https://rr1.googlevideo.com/videoplayback?expire={int(time.time())}', 'song', 'author', 'image')
+        resolution_cache.store('https://youtu.be/abc', info)
+        self.assertIsNone(resolution_cache.get('https://youtu.be/abc'))
+
+if __name__ == '__main__':
+    unittest.main()
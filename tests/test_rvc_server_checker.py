@@ -1,41 +1,47 @@
 import unittest
-from unittest.mock import patch, MagicMock
-import requests
+from unittest.mock import patch, MagicMock, AsyncMock
+import aiohttp
 from ai_server_utils import rvc_server_checker
 
-class TestRVCServerChecker(unittest.TestCase):
-    @patch('ai_server_utils.rvc_server_checker.requests.post')
-    def test_fetch_choices_success(self, mock_post):
+def mock_session_request(response=None, error=None):
+    request_context = MagicMock()
+    request_context.__aenter__ = AsyncMock(return_value=response, side_effect=error)
+    request_context.__aexit__ = AsyncMock(return_value=False)
+    return MagicMock(return_value=request_context)
+
+class TestRVCServerChecker(unittest.IsolatedAsyncioTestCase):
+    @patch('ai_server_utils.rvc_server_checker.http_client.get_session')
+    async def test_fetch_choices_success(self, mock_get_session):
         mock_response = MagicMock()
-        mock_response.json.return_value = {
+        mock_response.json = AsyncMock(return_value={
             "data": [
                 {"choices": ["model1", "model2"]},
                 {"choices": ["/path/to/index1", "/path/to/index2"]}
             ]
-        }
+        })
         mock_response.raise_for_status.return_value = None
-        mock_post.return_value = mock_response
-        models, indexes = rvc_server_checker.fetch_choices()
+        mock_get_session.return_value.post = mock_session_request(mock_response)
+        models, indexes = await rvc_server_checker.fetch_choices()
         self.assertEqual(models, ["model1", "model2"])
         self.assertEqual(indexes, ["index1", "index2"])
 
-    @patch('ai_server_utils.rvc_server_checker.requests.post')
-    def test_fetch_choices_error(self, mock_post):
-        mock_post.side_effect = requests.exceptions.RequestException("fail")
+    @patch('ai_server_utils.rvc_server_checker.http_client.get_session')
+    async def test_fetch_choices_error(self, mock_get_session):
+        mock_get_session.return_value.post = mock_session_request(error=aiohttp.ClientError("fail"))
         with self.assertRaises(RuntimeError):
-            rvc_server_checker.fetch_choices()
+            await rvc_server_checker.fetch_choices()
 
-    @patch('ai_server_utils.rvc_server_checker.requests.get')
-    def test_check_connection_success(self, mock_get):
+    @patch('ai_server_utils.rvc_server_checker.http_client.get_session')
+    async def test_check_connection_success(self, mock_get_session):
         mock_response = MagicMock()
         mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
-        self.assertTrue(rvc_server_checker.check_connection())
+        mock_get_session.return_value.get = mock_session_request(mock_response)
+        self.assertTrue(await rvc_server_checker.check_connection())
 
-    @patch('ai_server_utils.rvc_server_checker.requests.get')
-    def test_check_connection_fail(self, mock_get):
-        mock_get.side_effect = Exception("fail")
-        self.assertFalse(rvc_server_checker.check_connection())
+    @patch('ai_server_utils.rvc_server_checker.http_client.get_session')
+    async def test_check_connection_fail(self, mock_get_session):
+        mock_get_session.return_value.get = mock_session_request(error=Exception("fail"))
+        self.assertFalse(await rvc_server_checker.check_connection())
 
 if __name__ == '__main__':
     unittest.main()
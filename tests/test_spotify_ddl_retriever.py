@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch, MagicMock, AsyncMock
+# db_utils has to be imported before the models, which the retrievers import
+import db_utils
+from ddl_retrievers import spotify_ddl_retriever
+from ddl_retrievers.universal_ddl_retriever import YouTubeError
+
+TRACK_URL = 'https://open.spotify.com/track/abc123?si=xyz'
+
+@patch('ddl_retrievers.spotify_ddl_retriever.db_utils.store_spotify_mapping', new_callable=AsyncMock)
+@patch('ddl_retrievers.spotify_ddl_retriever.db_utils.get_spotify_mapping', new_callable=AsyncMock)
+@patch('ddl_retrievers.spotify_ddl_retriever.universal_ddl_retriever.get_streaming_url', new_callable=AsyncMock)
+@patch('ddl_retrievers.spotify_ddl_retriever._get_spotdl')
+class TestSpotifyDdlRetriever(unittest.IsolatedAsyncioTestCase):
+    async def test_mapped_track_skips_spotdl(self, mock_spotdl, mock_universal, mock_get_mapping, mock_store_mapping):
+        mock_get_mapping.return_value = 'https://www.youtube.com/watch?v=1'
+        mock_universal.return_value = 'musicinfo'
+        self.assertEqual(await spotify_ddl_retriever.get_streaming_url(TRACK_URL), 'musicinfo')
+        mock_get_mapping.assert_awaited_once_with('abc123')
+        mock_universal.assert_awaited_once_with('https://www.youtube.com/watch?v=1')
+        mock_spotdl.return_value.search.assert_not_called()
+        mock_store_mapping.assert_not_awaited()
+
+    async def test_unmapped_track_is_matched_and_stored(self, mock_spotdl, mock_universal, mock_get_mapping, mock_store_mapping):
+        mock_get_mapping.return_value = None
+        mock_spotdl.return_value.search.return_value = ['song']
+        mock_spotdl.return_value.get_download_urls.return_value = ['https://www.youtube.com/watch?v=1']
+        mock_universal.return_value = 'musicinfo'
+        self.assertEqual(await spotify_ddl_retriever.get_streaming_url(TRACK_URL), 'musicinfo')
+        mock_store_mapping.assert_awaited_once_with('abc123', 'https://www.youtube.com/watch?v=1')
+
+    async def test_broken_mapping_is_matched_again(self, mock_spotdl, mock_universal, mock_get_mapping, mock_store_mapping):
+        mock_get_mapping.return_value = 'https://www.youtube.com/watch?v=removed'
+        mock_spotdl.return_value.search.return_value = ['song']
+        mock_spotdl.return_value.get_download_urls.return_value = ['https://www.youtube.com/watch?v=2']
+        mock_universal.side_effect = [YouTubeError('removed'), 'musicinfo']
+        self.assertEqual(await spotify_ddl_retriever.get_streaming_url(TRACK_URL), 'musicinfo')
+        mock_store_mapping.assert_awaited_once_with('abc123', 'https://www.youtube.com/watch?v=2')
+
+    @patch('ddl_retrievers.spotify_ddl_retriever.extraction_pool.search_ytmusic', new_callable=AsyncMock)
+    async def test_fallback_reuses_spotify_search(self, mock_search_ytmusic, mock_spotdl, mock_universal, mock_get_mapping, mock_store_mapping):
+        mock_get_mapping.return_value = None
+        song = MagicMock()
+        song.name = 'Song'
+        song.artist = 'Artist'
+        mock_spotdl.return_value.search.return_value = [song]
+        mock_spotdl.return_value.get_download_urls.return_value = []
+        mock_search_ytmusic.return_value = [{'videoId': 'vid'}]
+        mock_universal.return_value = 'musicinfo'
+        self.assertEqual(await spotify_ddl_retriever.get_streaming_url(TRACK_URL), 'musicinfo')
+        mock_spotdl.return_value.search.assert_called_once()
+        mock_search_ytmusic.assert_awaited_once_with('Artist - Song', filter='songs')
+        mock_store_mapping.assert_awaited_once_with('abc123', 'https://music.youtube.com/watch?v=vid')
+
+    async def test_match_is_not_remembered(self, mock_spotdl, mock_universal, mock_get_mapping, mock_store_mapping):
+        mock_get_mapping.return_value = None
+        mock_spotdl.return_value.search.return_value = ['song']
+        mock_spotdl.return_value.get_download_urls.return_value = ['https://www.youtube.com/watch?v=1']
+        self.assertEqual(await spotify_ddl_retriever.match_youtube_url(TRACK_URL), 'https://www.youtube.com/watch?v=1')
+        mock_universal.assert_not_awaited()
+        mock_store_mapping.assert_not_awaited()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import asyncio
+from unittest.mock import patch
+from enums.audio_content_type import AudioContentType
+from platform_handlers import spotify_playlist_expander
+
+def _playlist_page(offset, total, page_size=spotify_playlist_expander.PLAYLIST_PAGE_SIZE):
+    items = [{'track': {'external_urls': {'spotify': f'https://open.spotify.com/track/{i}'}}} for i in range(offset, min(offset + page_size, total))]
+    return {'total': total, 'items': items}
+
+class TestSpotifyPlaylistExpander(unittest.IsolatedAsyncioTestCase):
+    async def _collect(self, content_type, spotify_id):
+        batches = []
+        async for batch in spotify_playlist_expander.iter_track_url_batches(content_type, spotify_id):
+            batches.append(batch)
+        return batches
+
+    @patch('platform_handlers.spotify_playlist_expander._fetch_page')
+    async def test_all_pages_in_order(self, mock_fetch):
+        async def fetch(content_type, spotify_id, offset):
+            return _playlist_page(offset, 250)
+        mock_fetch.side_effect = fetch
+        batches = await self._collect(AudioContentType.PLAYLIST, 'id')
+        self.assertEqual([len(batch) for batch in batches], [100, 100, 50])
+        urls = [url for batch in batches for url in batch]
+        self.assertEqual(urls, [f'https://open.spotify.com/track/{i}' for i in range(250)])
+
+    @patch('platform_handlers.spotify_playlist_expander._fetch_page')
+    async def test_failed_page_is_retried_then_skipped(self, mock_fetch):
+        attempts = {}
+        async def fetch(content_type, spotify_id, offset):
+            attempts[offset] = attempts.get(offset, 0) + 1
+            # The second page always fails, the third only on its first attempt
+            if offset == 100 or (offset == 200 and attempts[offset] == 1):
+                raise Exception('rate limited')
+            return _playlist_page(offset, 350)
+        mock_fetch.side_effect = fetch
+        with self.assertLogs('PianoNicsMusic', level='ERROR'):
+            batches = await self._collect(AudioContentType.PLAYLIST, 'id')
+        self.assertEqual([len(batch) for batch in batches], [100, 100, 50])
+        self.assertEqual(batches[1][0], 'https://open.spotify.com/track/200')
+        self.assertEqual(attempts[100], spotify_playlist_expander.PAGE_ATTEMPTS)
+
+    @patch('platform_handlers.spotify_playlist_expander._fetch_page')
+    async def test_closing_early_finishes_page_tasks(self, mock_fetch):
+        async def fetch(content_type, spotify_id, offset):
+            if offset == 200:
+                raise ValueError('page failed')
+            if offset:
+                await asyncio.Event().wait()
+            return _playlist_page(offset, 500)
+        mock_fetch.side_effect = fetch
+        batches = spotify_playlist_expander.iter_track_url_batches(AudioContentType.PLAYLIST, 'id')
+        await anext(batches)
+        await asyncio.sleep(0)
+        await batches.aclose()
+        self.assertEqual(asyncio.all_tasks(), {asyncio.current_task()})
+
+    @patch('platform_handlers.spotify_playlist_expander._fetch_page')
+    async def test_skips_removed_tracks(self, mock_fetch):
+        async def fetch(content_type, spotify_id, offset):
+            return {'total': 3, 'items': [{'track': None}, {'track': {'external_urls': {}}}, {'track': {'external_urls': {'spotify': 'url'}}}]}
+        mock_fetch.side_effect = fetch
+        self.assertEqual(await self._collect(AudioContentType.PLAYLIST, 'id'), [['url']])
+
+    @patch('platform_handlers.spotify_playlist_expander._fetch_page')
+    async def test_album(self, mock_fetch):
+        async def fetch(content_type, spotify_id, offset):
+            return {'total': 2, 'items': [{'external_urls': {'spotify': 'a'}}, {'external_urls': {'spotify': 'b'}}]}
+        mock_fetch.side_effect = fetch
+        self.assertEqual(await self._collect(AudioContentType.ALBUM, 'id'), [['a', 'b']])
+
+if __name__ == '__main__':
+    unittest.main()
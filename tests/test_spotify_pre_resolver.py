@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import patch, AsyncMock
+import asyncio
+# db_utils has to be imported before the models, which the retrievers import
+import db_utils
+from discord_utils import spotify_pre_resolver
+
+SPOTIFY_URL = 'https://open.spotify.com/track/{}'
+
+@patch('discord_utils.spotify_pre_resolver.db_utils.set_resolved_url', new_callable=AsyncMock)
+@patch('discord_utils.spotify_pre_resolver.db_utils.get_unresolved_upcoming_entries', new_callable=AsyncMock)
+@patch('discord_utils.spotify_pre_resolver.spotify_ddl_retriever.match_youtube_url', new_callable=AsyncMock)
+class TestSpotifyPreResolver(unittest.IsolatedAsyncioTestCase):
+    def tearDown(self):
+        spotify_pre_resolver.stop(1)
+
+    async def wait_for_pass(self):
+        task = spotify_pre_resolver._guild_tasks.get(1)
+        if task:
+            await task
+
+    async def test_resolves_only_spotify_entries(self, mock_match, mock_get_entries, mock_set_resolved):
+        mock_get_entries.return_value = [(1, SPOTIFY_URL.format('a')), (2, 'https://youtu.be/b'), (3, SPOTIFY_URL.format('c'))]
+        mock_match.side_effect = lambda url: f'https://www.youtube.com/watch?v={url[-1]}'
+        spotify_pre_resolver.schedule(1)
+        await self.wait_for_pass()
+        mock_get_entries.assert_awaited_once_with(1, spotify_pre_resolver.LOOKAHEAD)
+        self.assertEqual(sorted(call.args for call in mock_set_resolved.await_args_list), [
+            (1, 1, 'https://www.youtube.com/watch?v=a'),
+            (1, 3, 'https://www.youtube.com/watch?v=c'),
+        ])
+
+    async def test_concurrency_is_bounded(self, mock_match, mock_get_entries, mock_set_resolved):
+        mock_get_entries.return_value = [(entry_id, SPOTIFY_URL.format(entry_id)) for entry_id in range(8)]
+        running = 0
+        most_running = 0
+
+        async def match(url):
+            nonlocal running, most_running
+            running += 1
+            most_running = max(most_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return 'https://youtu.be/x'
+        mock_match.side_effect = match
+
+        spotify_pre_resolver.schedule(1)
+        await self.wait_for_pass()
+        self.assertEqual(most_running, spotify_pre_resolver.MAX_CONCURRENT_MATCHES)
+        self.assertEqual(mock_set_resolved.await_count, 8)
+
+    async def test_failed_entries_are_not_retried(self, mock_match, mock_get_entries, mock_set_resolved):
+        mock_get_entries.return_value = [(1, SPOTIFY_URL.format('a'))]
+        mock_match.side_effect = Exception('spotdl failed')
+        for _ in range(2):
+            spotify_pre_resolver.schedule(1)
+            await self.wait_for_pass()
+        mock_match.assert_awaited_once()
+        mock_set_resolved.assert_not_awaited()
+
+    @patch('discord_utils.track_prefetcher.refresh', new_callable=AsyncMock)
+    async def test_prefetch_is_refreshed(self, mock_refresh, mock_match, mock_get_entries, mock_set_resolved):
+        mock_get_entries.return_value = [(1, SPOTIFY_URL.format('a'))]
+        mock_match.return_value = 'https://www.youtube.com/watch?v=a'
+        spotify_pre_resolver.schedule(1)
+        await self.wait_for_pass()
+        mock_refresh.assert_awaited_once_with(1)
+
+    async def test_schedule_while_running_runs_again(self, mock_match, mock_get_entries, mock_set_resolved):
+        mock_get_entries.return_value = []
+        spotify_pre_resolver.schedule(1)
+        spotify_pre_resolver.schedule(1)
+        await self.wait_for_pass()
+        self.assertEqual(mock_get_entries.await_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import patch, AsyncMock
+import asyncio
+from discord_utils import track_prefetcher
+from models.music_information import MusicInformation
+
+class TestTrackPrefetcher(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        schedule_patcher = patch('discord_utils.track_prefetcher.spotify_pre_resolver.schedule')
+        self.mock_schedule = schedule_patcher.start()
+        self.addCleanup(schedule_patcher.stop)
+
+    def tearDown(self):
+        track_prefetcher.stop(1)
+
+    @patch('discord_utils.track_prefetcher.music_url_getter.get_streaming_url', new_callable=AsyncMock)
+    @patch('discord_utils.track_prefetcher.db_utils.peek_queue_entry', new_callable=AsyncMock)
+    async def test_prefetch_and_take(self, mock_peek, mock_resolve):
+        mock_peek.return_value = 'next_url'
+        music_information = MusicInformation('https://rr1---sn.googlevideo.com/videoplayback', 'Song', 'Author', 'image')
+        mock_resolve.return_value = music_information
+        track_prefetcher.start(1)
+        await track_prefetcher.prefetch_next(1)
+        self.assertIs(await track_prefetcher.take(1, 'next_url'), music_information)
+        mock_resolve.assert_awaited_once_with('next_url')
+        self.mock_schedule.assert_called_once_with(1)
+
+    @patch('discord_utils.track_prefetcher.music_url_getter.get_streaming_url', new_callable=AsyncMock)
+    @patch('discord_utils.track_prefetcher.db_utils.peek_queue_entry', new_callable=AsyncMock)
+    async def test_take_different_url(self, mock_peek, mock_resolve):
+        mock_peek.return_value = 'next_url'
+        track_prefetcher.start(1)
+        await track_prefetcher.prefetch_next(1)
+        self.assertIsNone(await track_prefetcher.take(1, 'other_url'))
+
+    @patch('discord_utils.track_prefetcher.music_url_getter.get_streaming_url', new_callable=AsyncMock)
+    @patch('discord_utils.track_prefetcher.db_utils.peek_queue_entry', new_callable=AsyncMock)
+    async def test_refresh_after_pre_resolving(self, mock_peek, mock_resolve):
+        mock_peek.return_value = 'spotify_url'
+        mock_resolve.side_effect = lambda url: MusicInformation(url, 'Song', 'Author', 'image')
+        track_prefetcher.start(1)
+        await track_prefetcher.prefetch_next(1)
+
+        # The Spotify pre-resolver stored the YouTube URL of the entry
+        mock_peek.return_value = 'youtube_url'
+        await track_prefetcher.refresh(1)
+
+        self.assertEqual((await track_prefetcher.take(1, 'youtube_url')).streaming_url, 'youtube_url')
+
+    @patch('discord_utils.track_prefetcher.audio_file_cache.unpin')
+    @patch('discord_utils.track_prefetcher.audio_file_cache.pin')
+    @patch('discord_utils.track_prefetcher.music_url_getter.get_streaming_url', new_callable=AsyncMock)
+    @patch('discord_utils.track_prefetcher.db_utils.peek_queue_entry', new_callable=AsyncMock)
+    async def test_discarded_prefetch_is_unpinned(self, mock_peek, mock_resolve, mock_pin, mock_unpin):
+        mock_peek.return_value = 'next_url'
+        mock_resolve.return_value = MusicInformation('/cache/abc.opus', 'Song', 'Author', 'image')
+        track_prefetcher.start(1)
+        await track_prefetcher.prefetch_next(1)
+        await track_prefetcher._guild_prefetches[1][1]
+        mock_pin.assert_called_once_with('/cache/abc.opus')
+
+        self.assertIsNone(await track_prefetcher.take(1, 'other_url'))
+        mock_unpin.assert_called_once_with('/cache/abc.opus')
+
+    @patch('discord_utils.track_prefetcher.db_utils.peek_queue_entry', new_callable=AsyncMock)
+    async def test_inactive_guild_is_not_prefetched(self, mock_peek):
+        await track_prefetcher.refresh(1)
+        mock_peek.assert_not_awaited()
+        self.assertIsNone(await track_prefetcher.take(1, 'next_url'))
+
+    @patch('discord_utils.track_prefetcher.music_url_getter.get_streaming_url', new_callable=AsyncMock)
+    @patch('discord_utils.track_prefetcher.db_utils.peek_queue_entry', new_callable=AsyncMock)
+    async def test_failed_prefetch_returns_none(self, mock_peek, mock_resolve):
+        mock_peek.return_value = 'next_url'
+        mock_resolve.side_effect = Exception('fail')
+        track_prefetcher.start(1)
+        await track_prefetcher.prefetch_next(1)
+        self.assertIsNone(await track_prefetcher.take(1, 'next_url'))
+
+if __name__ == '__main__':
+    unittest.main()
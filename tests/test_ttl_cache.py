@@ -0,0 +1,47 @@
+import unittest
+from unittest.mock import patch
+from utils.ttl_cache import TTLCache
+
+class TestTTLCache(unittest.TestCase):
+    def test_get_and_set(self):
+        cache = TTLCache()
+        cache.set('key', 'value')
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertIsNone(cache.get('missing'))
+        stats = cache.get_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    @patch('utils.ttl_cache.time.time')
+    def test_expiry(self, mock_time):
+        mock_time.return_value = 1000.0
+        cache = TTLCache(default_ttl=10)
+        cache.set('key', 'value')
+        mock_time.return_value = 1011.0
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(len(cache), 0)
+
+    def test_already_expired_is_not_stored(self):
+        cache = TTLCache()
+        cache.set('key', 'value', expires_at=1.0)
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction_by_count(self):
+        cache = TTLCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+
+    def test_eviction_by_memory(self):
+        cache = TTLCache(max_bytes=10, size_of=lambda value: 4)
+        for key in range(5):
+            cache.set(key, key)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get_stats()['bytes'], 8)
+
+if __name__ == '__main__':
+    unittest.main()
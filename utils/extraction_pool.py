@@ -0,0 +1,290 @@
+"""
+Bounded worker pool for blocking extraction calls (yt-dlp, spotdl, ytmusicapi)
+"""
+import asyncio
+import copy
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable
+
+logger = logging.getLogger('PianoNicsMusic')
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TIMEOUT = 60.0
+# Most YoutubeDL instances with different options each worker keeps
+MAX_CLIENTS_PER_WORKER = 8
+WARM_UP_TIMEOUT = 30.0
+# Playlist listings run on their own workers, since paging through a large playlist keeps a worker busy for tens of
+# seconds and would otherwise leave no worker for resolving the songs that play
+MAX_CONCURRENT_LISTINGS = 2
+
+_executor: ThreadPoolExecutor | None = None
+_listing_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_max_workers = DEFAULT_MAX_WORKERS
+_default_timeout = DEFAULT_TIMEOUT
+
+_stats_lock = threading.Lock()
+_queued = 0
+_running = 0
+_completed = 0
+_failed = 0
+_timed_out = 0
+_clients_created = 0
+_clients_reused = 0
+
+# YoutubeDL and YTMusic are not thread-safe, so every worker thread keeps its own instances
+_thread_clients = threading.local()
+
+class ExtractionTimeoutError(Exception):
+    """Raised when an extraction call does not finish within its timeout"""
+    pass
+
+def configure(max_workers: int | None = None, timeout: float | None = None):
+    """Set the pool size and the default per-call timeout (in seconds)"""
+    global _executor, _max_workers, _default_timeout
+
+    if timeout is not None:
+        _default_timeout = max(1.0, float(timeout))
+
+    if max_workers is not None:
+        max_workers = max(1, int(max_workers))
+        with _executor_lock:
+            if max_workers != _max_workers and _executor is not None:
+                # Running jobs finish on the old executor, new jobs use the new size
+                _executor.shutdown(wait=False)
+                _executor = None
+            _max_workers = max_workers
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix='extraction')
+        return _executor
+
+def _get_listing_executor() -> ThreadPoolExecutor:
+    global _listing_executor
+    with _executor_lock:
+        if _listing_executor is None:
+            _listing_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LISTINGS, thread_name_prefix='playlist-listing')
+        return _listing_executor
+
+def _on_job_done(future: Future):
+    global _queued
+    # Jobs cancelled before a worker picked them up never ran, so they are still counted as queued
+    if future.cancelled():
+        with _stats_lock:
+            _queued -= 1
+
+def _submit(func: Callable[..., Any], *args, **kwargs) -> Future:
+    return _submit_to(_get_executor(), func, *args, **kwargs)
+
+def _submit_to(executor: ThreadPoolExecutor, func: Callable[..., Any], *args, **kwargs) -> Future:
+    global _queued
+
+    def _job():
+        global _queued, _running, _completed, _failed
+        with _stats_lock:
+            _queued -= 1
+            _running += 1
+        try:
+            result = func(*args, **kwargs)
+            with _stats_lock:
+                _completed += 1
+            return result
+        except Exception:
+            with _stats_lock:
+                _failed += 1
+            raise
+        finally:
+            with _stats_lock:
+                _running -= 1
+
+    with _stats_lock:
+        _queued += 1
+    concurrent_future = executor.submit(_job)
+    concurrent_future.add_done_callback(_on_job_done)
+    return concurrent_future
+
+def _on_timeout(description: str, call_timeout: float) -> ExtractionTimeoutError:
+    global _timed_out
+    with _stats_lock:
+        _timed_out += 1
+    # A worker that already started cannot be interrupted; it finishes in the background
+    logger.warning(f"Extraction call {description} timed out after {call_timeout}s")
+    return ExtractionTimeoutError(f"Extraction timed out after {call_timeout} seconds")
+
+async def run(func: Callable[..., Any], *args, timeout: float | None = None, **kwargs) -> Any:
+    """Run a blocking callable on the extraction pool without blocking the event loop"""
+    concurrent_future = _submit(func, *args, **kwargs)
+
+    call_timeout = _default_timeout if timeout is None else timeout
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(concurrent_future), call_timeout)
+    except asyncio.TimeoutError:
+        raise _on_timeout(getattr(func, '__name__', str(func)), call_timeout)
+
+def _get_thread_clients() -> dict:
+    clients = getattr(_thread_clients, 'clients', None)
+    if clients is None:
+        clients = _thread_clients.clients = {}
+    return clients
+
+def _get_client(key: str, create: Callable[[], Any]) -> Any:
+    global _clients_created, _clients_reused
+    clients = _get_thread_clients()
+    client = clients.get(key)
+    if client is not None:
+        with _stats_lock:
+            _clients_reused += 1
+        return client
+
+    if len(clients) >= MAX_CLIENTS_PER_WORKER:
+        clients.pop(next(iter(clients)))
+    client = clients[key] = create()
+    with _stats_lock:
+        _clients_created += 1
+    return client
+
+def get_youtube_dl(ydl_opts: dict):
+    """Get the calling worker's YoutubeDL for these options. Only call this on the extraction pool."""
+    import yt_dlp
+
+    options_key = json.dumps(ydl_opts, sort_keys=True, default=repr)
+    # YoutubeDL adds its defaults to the options dict it is given, which would change the key of shared options
+    return _get_client(f'yt_dlp:{options_key}', lambda: yt_dlp.YoutubeDL(copy.deepcopy(ydl_opts)))
+
+def get_ytmusic():
+    """Get the calling worker's YTMusic client. Only call this on the extraction pool."""
+    import ytmusicapi
+
+    return _get_client('ytmusic', ytmusicapi.YTMusic)
+
+def _extract_info(url: str, ydl_opts: dict, **extract_kwargs) -> dict:
+    return get_youtube_dl(ydl_opts).extract_info(url, download=False, **extract_kwargs)
+
+async def extract_info(url: str, ydl_opts: dict, timeout: float | None = None, **extract_kwargs) -> dict:
+    """Run yt-dlp's extract_info for a URL on the extraction pool"""
+    return await run(_extract_info, url, ydl_opts, timeout=timeout, **extract_kwargs)
+
+def _search_ytmusic(query: str, **search_kwargs) -> list:
+    return get_ytmusic().search(query, **search_kwargs)
+
+async def search_ytmusic(query: str, timeout: float | None = None, **search_kwargs) -> list:
+    """Run a YouTube Music search on the extraction pool"""
+    return await run(_search_ytmusic, query, timeout=timeout, **search_kwargs)
+
+def _warm_up_worker(ydl_opts_list: list[dict]):
+    for ydl_opts in ydl_opts_list:
+        # Creating the YouTube extractor is the slow part of the first extraction
+        get_youtube_dl(ydl_opts).get_info_extractor('Youtube')
+    get_ytmusic()
+
+async def warm_up(ydl_opts_list: list[dict]):
+    """
+    Create the clients on the workers ahead of the first request, with one independent job per worker.
+    A worker that picks up a second job finds its clients already there, so the other jobs and requests never wait
+    for the warm-up of all workers. A worker that missed it creates its clients on its first request.
+    """
+    start = time.perf_counter()
+    max_workers = _max_workers
+    results = await asyncio.gather(
+        *(run(_warm_up_worker, ydl_opts_list, timeout=WARM_UP_TIMEOUT) for _ in range(max_workers)),
+        return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        logger.warning(f"Extraction warm-up failed on {len(errors)} of {max_workers} workers: {errors[0]}")
+    logger.info(f"Ran {max_workers - len(errors)} extraction warm-up jobs in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+_END_OF_ENTRIES = object()
+
+def _follow_redirects(ydl, info: dict) -> dict:
+    # With process=False yt-dlp returns a 'url' result when another extractor handles the link
+    for _ in range(3):
+        if info.get('_type') not in ('url', 'url_transparent'):
+            break
+        info = ydl.extract_info(info['url'], download=False, process=False)
+    return info
+
+async def iter_entries(url: str, ydl_opts: dict, batch_size: int = 50, timeout: float | None = None) -> AsyncIterator[list[dict]]:
+    """Yield the flat entries of a playlist in batches while yt-dlp is still listing it.
+
+    The first entry is yielded on its own so playback can start right away. The timeout applies
+    to the wait for each batch, not to the whole listing. Listings run on their own workers, at most
+    MAX_CONCURRENT_LISTINGS at a time, so they never hold the workers other extraction calls need.
+    """
+    loop = asyncio.get_running_loop()
+    batches: asyncio.Queue = asyncio.Queue()
+    stop_listing = threading.Event()
+
+    def _publish(item):
+        try:
+            loop.call_soon_threadsafe(batches.put_nowait, item)
+        except RuntimeError:
+            stop_listing.set()  # Event loop closed
+
+    def _list_entries():
+        ydl = get_youtube_dl(ydl_opts)
+        info = _follow_redirects(ydl, ydl.extract_info(url, download=False, process=False))
+        entries = info.get('entries')
+        if entries is None:
+            _publish([info])
+            return
+
+        batch = []
+        first_entry_sent = False
+        for entry in entries:
+            if stop_listing.is_set():
+                return
+            if not entry:
+                continue
+            batch.append(entry)
+            if not first_entry_sent or len(batch) >= batch_size:
+                _publish(batch)
+                batch = []
+                first_entry_sent = True
+        if batch:
+            _publish(batch)
+
+    concurrent_future = _submit_to(_get_listing_executor(), _list_entries)
+    concurrent_future.add_done_callback(lambda _: _publish(_END_OF_ENTRIES))
+
+    call_timeout = _default_timeout if timeout is None else timeout
+    try:
+        while True:
+            try:
+                batch = await asyncio.wait_for(batches.get(), call_timeout)
+            except asyncio.TimeoutError:
+                raise _on_timeout(f"listing {url}", call_timeout)
+
+            if batch is _END_OF_ENTRIES:
+                if not concurrent_future.cancelled() and concurrent_future.exception():
+                    raise concurrent_future.exception()
+                return
+            yield batch
+    finally:
+        stop_listing.set()
+
+def get_queue_depth() -> int:
+    """Number of extraction calls waiting for a free worker"""
+    with _stats_lock:
+        return _queued
+
+def get_stats() -> dict:
+    """Get a snapshot of the pool counters"""
+    with _stats_lock:
+        return {
+            "max_workers": _max_workers,
+            "queued": _queued,
+            "running": _running,
+            "completed": _completed,
+            "failed": _failed,
+            "timed_out": _timed_out,
+            "clients_created": _clients_created,
+            "clients_reused": _clients_reused,
+        }
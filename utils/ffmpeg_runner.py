@@ -0,0 +1,50 @@
+"""
+Shared pieces for running FFmpeg: reconnect options for streams, and background FFmpeg jobs that are killed on timeout
+"""
+import asyncio
+
+# Reconnects dropped HTTP streams, FFmpeg rejects these options for local files
+RECONNECT_OPTIONS = ['-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5']
+
+def is_stream(input_url: str) -> bool:
+    return input_url.startswith(('http://', 'https://'))
+
+def get_reconnect_options(input_url: str) -> list[str]:
+    """The reconnect options for an HTTP input, none for a local file"""
+    return list(RECONNECT_OPTIONS) if is_stream(input_url) else []
+
+class LoopSemaphore:
+    """Limits concurrent background jobs of one kind. A semaphore is bound to the loop it is first used on, so every loop gets its own."""
+
+    def __init__(self, value: int):
+        self.value = value
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def get(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.value)
+            self._loop = loop
+        return self._semaphore
+
+async def run(args: list[str], timeout: float) -> tuple[int, str]:
+    """
+    Run ffmpeg with the given arguments, returning its exit code and what it wrote to stderr.
+    Raises asyncio.TimeoutError when it runs longer than the timeout.
+    """
+    process = await asyncio.create_subprocess_exec(
+        'ffmpeg', *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except BaseException:
+        # Timed out or cancelled, don't leave FFmpeg running
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+    return process.returncode, stderr.decode(errors='replace')
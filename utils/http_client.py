@@ -0,0 +1,60 @@
+"""
+Shared aiohttp session for scrapers and probes, so connections and DNS lookups are reused between requests
+"""
+import asyncio
+import logging
+
+import aiohttp
+
+logger = logging.getLogger('PianoNicsMusic')
+
+DEFAULT_LIMIT = 64
+DEFAULT_LIMIT_PER_HOST = 8
+DEFAULT_TIMEOUT = 20.0
+CONNECT_TIMEOUT = 5.0
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 30.0
+
+_session: aiohttp.ClientSession | None = None
+_session_loop: asyncio.AbstractEventLoop | None = None
+_limit_per_host = DEFAULT_LIMIT_PER_HOST
+_timeout = DEFAULT_TIMEOUT
+
+def configure(limit_per_host: int | None = None, timeout: float | None = None):
+    """Set the connections per host and the default request timeout (in seconds). Applies to sessions created afterwards."""
+    global _limit_per_host, _timeout
+    if limit_per_host is not None:
+        _limit_per_host = max(1, int(limit_per_host))
+    if timeout is not None:
+        _timeout = max(1.0, float(timeout))
+
+def _create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=DEFAULT_LIMIT,
+        limit_per_host=_limit_per_host,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    timeout = aiohttp.ClientTimeout(total=_timeout, connect=CONNECT_TIMEOUT)
+    # Cookies are not kept between requests, scrapers that need one send it themselves
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, cookie_jar=aiohttp.DummyCookieJar())
+
+def get_session() -> aiohttp.ClientSession:
+    """Get the shared session of the running event loop, creating it on first use"""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    # A session is bound to the loop it was created on
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = _create_session()
+        _session_loop = loop
+        logger.debug(f"Created HTTP session ({_limit_per_host} connections per host, {_timeout}s timeout)")
+    return _session
+
+async def close():
+    """Close the shared session and its pooled connections"""
+    global _session, _session_loop
+    session = _session
+    _session = None
+    _session_loop = None
+    if session and not session.closed:
+        await session.close()